@@ -5,20 +5,56 @@ Key behaviours:
   - Multi-turn: reuses the original component slug for follow-up filenames
   - Clean output: only shows files written THIS run, not entire output dir
   - Self-correction: up to MAX_ITERATIONS attempts
+  - Streaming (optional): blocks are validated as they arrive and a failing
+    generation is cancelled mid-stream so the next iteration starts at once
+    (with auto-fix on, only for errors the auto-fixer can't repair)
+  - Repair mode (optional): self-correction resends only the failing block(s)
+    and merges the answer with the blocks that already passed
+  - Auto-fix: off-token colors and radii are snapped to the nearest design
+    token locally; an LLM round-trip only happens if errors remain
+  - Best-of-N (optional): several candidates sampled concurrently per
+    iteration; the first to pass wins and the rest are cancelled
+  - Sync and async: run_agent() and arun_agent() drive the same loop; only the
+    LLM call differs (generate_component vs agenerate_component)
+  - Run history: every finished run, with per-iteration errors, timings and
+    token usage, is appended to a SQLite store (runstore.py);
+    set_run_store(None) turns it off
 """
 
 from __future__ import annotations
 
+import asyncio
+import sqlite3
 import time
 import re
 from pathlib import Path
-from typing import Any
-
-from validator import validate_component
-from generator import generate_component, parse_code_blocks
+from typing import Any, Callable, NamedTuple
+
+import fsutil
+import manifest
+from fixer import fix_blocks
+from runstore import RunStore
+from tracing import span
+from validator import error_block, validate_block, validate_component
+from generator import (
+    aclose_async_client,
+    agenerate_component,
+    format_code_blocks,
+    generate_component,
+    parse_code_blocks,
+)
 
 
 MAX_ITERATIONS = 3
+_BLOCK_KEYS = ("ts", "html", "scss")
+
+_RUN_STORE: RunStore | None = RunStore()
+
+
+def set_run_store(store: RunStore | None) -> None:
+    """Replace the run history store; None stops recording runs (e.g. --no-history)."""
+    global _RUN_STORE
+    _RUN_STORE = store
 
 
 def _slugify(text: str, max_len: int = 45) -> str:
@@ -26,117 +62,244 @@ def _slugify(text: str, max_len: int = 45) -> str:
     return slug[:max_len].rstrip("-")
 
 
-def _write_files(blocks: dict, output_dir: str, slug: str) -> dict[str, str]:
+def _write_files(blocks: dict, output_dir: str, slug: str, passed: bool | None = None,
+                 errors: int | None = None) -> dict[str, str]:
+    """Write the component's files in one atomic step; unchanged files are left alone."""
     out = Path(output_dir)
     out.mkdir(parents=True, exist_ok=True)
     written = {}
+    hashes = {}
+    contents = {}
     for key, ext in [("ts", "ts"), ("html", "html"), ("scss", "scss")]:
         content = blocks.get(key, "").strip()
         if content:
             path = out / (slug + ".component." + ext)
-            path.write_text(content, encoding="utf-8")
+            contents[path] = content
             written[ext] = str(path)
+            hashes[ext] = fsutil.content_hash(content)
+    fsutil.write_many(contents)
+    manifest.record(output_dir, slug, written, hashes, passed, errors)
     return written
 
 
-def _print_header(text: str) -> None:
-    print("\n" + "=" * 60)
-    print("  " + text)
-    print("=" * 60)
+def _repair_targets(blocks: dict, errors: list[str]) -> dict[str, str] | None:
+    """Failing blocks (key -> code) when errors are confined to some blocks, else None."""
+    keys = {error_block(e) for e in errors}
+    if None in keys or len(keys) == len(_BLOCK_KEYS):
+        return None     # unattributable or everything failed: regenerate in full
+    return {key: blocks.get(key, "") for key in _BLOCK_KEYS if key in keys}
 
 
-def _print_divider() -> None:
-    print("-" * 60)
+def _merge_repair(base: dict, repaired: dict, targets: dict[str, str]) -> dict:
+    """Passing blocks from ``base`` plus whichever targets the repair call returned."""
+    merged = {key: base.get(key, "") for key in _BLOCK_KEYS}
+    for key in targets:
+        if repaired.get(key):
+            merged[key] = repaired[key]
+    merged["raw_response"] = format_code_blocks(merged)
+    if "aborted" in repaired:
+        merged["aborted"] = repaired["aborted"]
+    return merged
 
 
-def run_agent(
+class _Blocking(NamedTuple):
+    """Blocking I/O the loop hands to its driver: run inline by run_agent, on a worker thread by arun_agent."""
+    fn: Callable
+    args: tuple
+
+
+def _quiet(*args: Any, **kwargs: Any) -> None:
+    pass
+
+
+def _print_header(text: str, say=print) -> None:
+    say("\n" + "=" * 60)
+    say("  " + text)
+    say("=" * 60)
+
+
+def _print_divider(say=print) -> None:
+    say("-" * 60)
+
+
+def _agent_loop(
     user_description: str,
-    output_dir: str = "output",
-    conversation_history: list[dict] | None = None,
-    component_slug: str | None = None,
-) -> dict[str, Any]:
+    output_dir: str,
+    conversation_history: list[dict] | None,
+    component_slug: str | None,
+    *,
+    stream: bool,
+    verbose: bool,
+    repair: bool,
+    autofix: bool,
+    candidates: int,
+    on_event: Callable[[dict], None] | None,
+):
     """
-    Full agentic loop. Returns result dict with metadata.
-
-    Parameters
-    ----------
-    user_description    : What to generate or edit.
-    output_dir          : Where to write output files.
-    conversation_history: Prior turns for multi-turn editing.
-    component_slug      : Override slug (used by interactive mode to keep
-                          follow-up files named after the original component).
+    The generate -> validate -> self-correct loop, independent of how the LLM
+    is called. Yields generate_component() keyword arguments, expects the
+    resulting blocks to be sent back, and returns the run_agent result dict.
+    File writes and run recording are yielded as _Blocking steps, whose
+    result (or exception) the driver sends back.
     """
     # Use provided slug (follow-up) or derive from prompt (first generation)
     slug = component_slug or _slugify(user_description)
     is_followup = component_slug is not None
 
+    say = print if verbose else _quiet
+    emit = on_event or _quiet
     start = time.time()
     best_blocks: dict = {}
     best_errors: list = []
+    best_aborted = False
     current_errors: list[str] | None = None
+    repair_targets: dict[str, str] | None = None
+    repair_base: dict = {}
+    fixes: list[str] = []
     raw_response = ""
+    tokens_sent = 0
+    tokens_received = 0
+    system_hash = None
+    iteration_log: list[dict] = []
 
-    _print_header("Guided Component Architect" + (" — Follow-up Edit" if is_followup else ""))
-    print("  Prompt    :", user_description[:70])
-    print("  Component :", slug)
-    print("  Model     : llama-3.3-70b-versatile (Groq)")
+    _print_header("Guided Component Architect" + (" — Follow-up Edit" if is_followup else ""), say)
+    say("  Prompt    :", user_description[:70])
+    say("  Component :", slug)
+    say("  Model     : llama-3.3-70b-versatile (Groq)")
 
     for iteration in range(1, MAX_ITERATIONS + 1):
-        print("\n" + "·" * 60)
-        print("  Iteration " + str(iteration) + "/" + str(MAX_ITERATIONS) +
-              (" [self-correction]" if iteration > 1 else " [initial generation]"))
-        print("·" * 60)
-
-        print("  ⚙  Calling LLM...")
-        blocks = generate_component(
-            user_description=user_description,
-            previous_errors=current_errors,
-            conversation_history=conversation_history,
-        )
-        raw_response = blocks.get("raw_response", "")
-
-        print("  🔍 Running Linter-Agent...")
-        errors, warnings = validate_component(blocks)
-        passed = len(errors) == 0
-
-        # Print validation result
-        status_icon = "✅" if passed else "❌"
-        print("  " + status_icon + " Validation " + ("PASSED" if passed else "FAILED") +
-              " — " + str(len(errors)) + " error(s), " + str(len(warnings)) + " warning(s)")
-        for e in errors:
-            print("    ✖ " + e)
-        for w in warnings:
-            print("    ⚠ " + w)
-
-        # Track best result
-        if not best_blocks or len(errors) < len(best_errors):
-            best_blocks = blocks
-            best_errors = errors
-
-        if passed:
-            print("\n  ✅ Validation passed on iteration " + str(iteration) + "!")
-            break
-
-        if iteration < MAX_ITERATIONS:
-            print("\n  ↻  Self-correcting with " + str(len(errors)) + " error(s) to fix...")
-            current_errors = errors
-        else:
-            print("\n  ⚠  Max iterations reached. Using best result (" +
-                  str(len(best_errors)) + " error(s) remaining).")
+        with span("iteration", iteration=iteration):
+            say("\n" + "·" * 60)
+            say("  Iteration " + str(iteration) + "/" + str(MAX_ITERATIONS) +
+                (" [self-correction]" if iteration > 1 else " [initial generation]"))
+            say("·" * 60)
+            emit({"event": "iteration", "iteration": iteration, "max_iterations": MAX_ITERATIONS})
+
+            stream_errors: list[str] = []
+
+            def on_block(key: str, content: str) -> bool:
+                emit({"event": "block", "iteration": iteration, "key": key, "content": content})
+                found = validate_block(key, content).errors
+                stream_errors.extend(found)
+                if found and autofix:
+                    # Only cancel for errors the auto-fixer can't snap away after the stream
+                    fixed, changes = fix_blocks({key: content})
+                    if changes:
+                        found = validate_block(key, fixed[key]).errors
+                return bool(found) and iteration < MAX_ITERATIONS
+
+            if candidates > 1:
+                say("  ⚙  Sampling " + str(candidates) + " candidates concurrently...")
+            else:
+                say("  ⚙  Calling LLM..." + (" (streaming)" if stream else ""))
+            llm_start = time.perf_counter()
+            blocks = yield {
+                "user_description": user_description,
+                "previous_errors": current_errors,
+                "conversation_history": conversation_history,
+                "stream": stream,
+                "on_block": on_block if stream else None,
+                "verbose": verbose,
+                "repair_blocks": repair_targets,
+                "candidates": candidates,
+            }
+            llm_s = time.perf_counter() - llm_start
+            tokens_sent += blocks.get("prompt_tokens", 0)
+            tokens_received += blocks.get("completion_tokens", 0)
+            system_hash = system_hash or blocks.get("system_hash")
+            step = {"iteration": iteration, "llm_s": round(llm_s, 4), "cached": bool(blocks.get("cached")),
+                    "prompt_tokens": blocks.get("prompt_tokens", 0),
+                    "completion_tokens": blocks.get("completion_tokens", 0)}
+            if repair_targets:
+                blocks = _merge_repair(repair_base, blocks, repair_targets)
+            raw_response = blocks.get("raw_response", "")
+            aborted = bool(blocks.get("aborted"))
+
+            validate_start = time.perf_counter()
+            if aborted:
+                # Only finished blocks were checked; the rest was never generated.
+                say("  ⛔ Stream cancelled after a failing block — skipping the remaining output.")
+                errors, warnings = stream_errors, []
+            else:
+                say("  🔍 Running Linter-Agent...")
+                with span("validate"):
+                    errors, warnings = validate_component(blocks)
+            passed = len(errors) == 0
+            step.update(validate_s=round(time.perf_counter() - validate_start, 4), errors=errors,
+                        aborted=aborted, autofixed=0)
+            iteration_log.append(step)
+            emit({"event": "validation", "iteration": iteration, "passed": passed, "aborted": aborted,
+                  "errors": errors, "warnings": warnings})
+
+            # Print validation result
+            status_icon = "✅" if passed else "❌"
+            say("  " + status_icon + " Validation " + ("PASSED" if passed else "FAILED") +
+                " — " + str(len(errors)) + " error(s), " + str(len(warnings)) + " warning(s)")
+            for e in errors:
+                say("    ✖ " + e)
+            for w in warnings:
+                say("    ⚠ " + w)
+
+            # Snap off-token colors/radii locally before paying for another LLM call
+            if autofix and not passed and not aborted:
+                with span("autofix") as fix_span:
+                    fixed, changes = fix_blocks(blocks)
+                    fixed_errors, fixed_warnings = validate_component(fixed) if changes else (errors, [])
+                    fix_span.set(changes=len(changes), errors_before=len(errors), errors_after=len(fixed_errors))
+                if changes:
+                    if len(fixed_errors) < len(errors):
+                        fixed["raw_response"] = format_code_blocks(fixed)
+                        blocks, errors, warnings = fixed, fixed_errors, fixed_warnings
+                        raw_response = fixed["raw_response"]
+                        passed = len(errors) == 0
+                        fixes.extend(changes)
+                        step["autofixed"] = len(changes)
+                        emit({"event": "autofix", "iteration": iteration, "changes": changes,
+                              "errors": errors})
+                        say("  🔧 Auto-fixed " + str(len(changes)) + " token violation(s) — " +
+                            str(len(errors)) + " error(s) remaining")
+                        for c in changes:
+                            say("    ↳ " + c)
+
+            # Track best result; a cancelled (partial) generation never beats a complete one
+            if (not best_blocks
+                    or (best_aborted and not aborted)
+                    or (aborted == best_aborted and len(errors) < len(best_errors))):
+                best_blocks = blocks
+                best_errors = errors
+                best_aborted = aborted
+
+            if passed:
+                say("\n  ✅ Validation passed on iteration " + str(iteration) + "!")
+                break
+
+            if iteration < MAX_ITERATIONS:
+                current_errors = errors
+                repair_targets = _repair_targets(blocks, errors) if repair and not aborted else None
+                if repair_targets:
+                    repair_base = blocks
+                    say("\n  ↻  Repairing " + ", ".join(k.upper() for k in repair_targets) +
+                        " with " + str(len(errors)) + " error(s) to fix...")
+                else:
+                    say("\n  ↻  Self-correcting with " + str(len(errors)) + " error(s) to fix...")
+            else:
+                say("\n  ⚠  Max iterations reached. Using best result (" +
+                    str(len(best_errors)) + " error(s) remaining).")
 
     # Write files
-    written = _write_files(best_blocks, output_dir, slug)
-    elapsed = time.time() - start
     final_passed = len(best_errors) == 0
+    with span("write"):
+        written = yield _Blocking(_write_files, (best_blocks, output_dir, slug, final_passed, len(best_errors)))
+    elapsed = time.time() - start
 
     # Clean summary output
-    _print_divider()
-    print("  Files written:")
+    _print_divider(say)
+    say("  Files written:")
     for ext, path in written.items():
-        print("  " + ext.upper().ljust(5) + "→ " + path)
-    _print_divider()
+        say("  " + ext.upper().ljust(5) + "→ " + path)
+    _print_divider(say)
 
-    _print_header("RESULT SUMMARY")
+    _print_header("RESULT SUMMARY", say)
     if final_passed:
         status_str = "✅ SUCCESS"
     elif len(best_errors) <= 2:
@@ -144,24 +307,26 @@ def run_agent(
     else:
         status_str = "❌ FAILED"
 
-    print("  Status     : " + status_str)
-    print("  Iterations : " + str(iteration))
-    print("  Elapsed    : " + str(round(elapsed, 1)) + "s")
-    print("  Errors     : " + str(len(best_errors)))
-    print("  Warnings   : 0")
+    say("  Status     : " + status_str)
+    say("  Iterations : " + str(iteration))
+    say("  Elapsed    : " + str(round(elapsed, 1)) + "s")
+    say("  Prompt tok : " + str(tokens_sent))
+    say("  Output tok : " + str(tokens_received))
+    say("  Errors     : " + str(len(best_errors)))
+    say("  Warnings   : 0")
 
     if best_errors:
-        print("\n  Remaining errors:")
+        say("\n  Remaining errors:")
         for e in best_errors:
-            print("    ✖ " + e)
+            say("    ✖ " + e)
 
-    print("\n  Output → " + output_dir + "/")
+    say("\n  Output → " + output_dir + "/")
     for ext in ["ts", "html", "scss"]:
         if ext in written:
-            print("    " + slug + ".component." + ext)
-    print("=" * 60)
+            say("    " + slug + ".component." + ext)
+    say("=" * 60)
 
-    return {
+    result = {
         "passed": final_passed,
         "iterations": iteration,
         "elapsed": elapsed,
@@ -171,4 +336,203 @@ def run_agent(
         "raw_response": raw_response,
         "blocks": best_blocks,
         "slug": slug,
-    }
\ No newline at end of file
+        "fixes": fixes,
+        "tokens_sent": tokens_sent,
+        "completion_tokens": tokens_received,
+        "system_hash": system_hash,
+        "iteration_log": iteration_log,
+    }
+    if _RUN_STORE is not None:
+        options = {"stream": stream, "repair": repair, "autofix": autofix, "candidates": candidates,
+                   "followup": is_followup}
+        try:
+            yield _Blocking(_RUN_STORE.record, (user_description, result, options))
+        except (sqlite3.Error, OSError) as exc:   # history is best effort; the run itself succeeded
+            say("  ⚠  Run not recorded in history: " + str(exc))
+    return result
+
+
+def _agent_steps(user_description: str, *args: Any, **kwargs: Any):
+    """_agent_loop inside a "run" trace span (a no-op unless tracing is enabled)."""
+    with span("run", prompt=user_description[:80]) as run:
+        result = yield from _agent_loop(user_description, *args, **kwargs)
+        run.set(slug=result["slug"], passed=result["passed"], iterations=result["iterations"],
+                tokens_sent=result["tokens_sent"])
+    return result
+
+
+def _candidate_temperatures(n: int) -> list[float]:
+    """n sampling temperatures spread evenly over 0.2 .. 0.8."""
+    if n <= 1:
+        return [0.2]
+    return [round(0.2 + 0.6 * i / (n - 1), 3) for i in range(n)]
+
+
+async def _asample_best(request: dict, n: int) -> dict:
+    """
+    Fire ``n`` generations at different temperatures and validate each as it
+    lands. The first one that passes wins and the rest are cancelled;
+    otherwise the one with the fewest errors is returned.
+    """
+    verbose = request["verbose"]
+    request = dict(request, stream=False, on_block=None, verbose=False)
+
+    async def sample(temperature: float) -> tuple[float, dict]:
+        return temperature, await agenerate_component(temperature=temperature, **request)
+
+    tasks = [asyncio.ensure_future(sample(t)) for t in _candidate_temperatures(n)]
+    best: dict | None = None
+    best_count = 0
+    best_temp = 0.0
+    sent = received = 0
+    failure: BaseException | None = None
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                temperature, blocks = await next_done
+            except Exception as exc:   # one failed sample must not sink the others
+                failure = exc
+                continue
+            sent += blocks.get("prompt_tokens", 0)
+            received += blocks.get("completion_tokens", 0)
+            count = len(validate_component(blocks)[0])
+            if best is None or count < best_count:
+                best, best_count, best_temp = blocks, count, temperature
+            if count == 0:
+                break
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    if best is None:
+        raise failure if failure is not None else RuntimeError("no candidate completed")
+    # Cancelled candidates had already sent the same prompt
+    best = dict(best, prompt_tokens=sent + len(pending) * best.get("prompt_tokens", 0),
+                completion_tokens=received)
+    if verbose:
+        print("  🎲 Picked candidate T=" + str(best_temp) + " (" + str(best_count) + " error(s)); " +
+              str(len(pending)) + " cancelled")
+    return best
+
+
+def run_agent(
+    user_description: str,
+    output_dir: str = "output",
+    conversation_history: list[dict] | None = None,
+    component_slug: str | None = None,
+    stream: bool = False,
+    verbose: bool = True,
+    repair: bool = False,
+    autofix: bool = True,
+    candidates: int = 1,
+    on_event: Callable[[dict], None] | None = None,
+) -> dict[str, Any]:
+    """
+    Full agentic loop. Returns result dict with metadata.
+
+    Parameters
+    ----------
+    user_description    : What to generate or edit.
+    output_dir          : Where to write output files.
+    conversation_history: Prior turns for multi-turn editing.
+    component_slug      : Override slug (used by interactive mode to keep
+                          follow-up files named after the original component).
+    stream              : Stream generations and validate each block as it
+                          closes; a block with errors cancels the stream
+                          (except on the last iteration, which always runs
+                          to completion so there is a full result to keep).
+    verbose             : Print progress and the result summary.
+    repair              : On self-correction, resend only the failing
+                          block(s) with their errors and merge the reply with
+                          the blocks that already passed.
+    autofix             : Before another LLM iteration, snap unauthorized
+                          colors/radii to the nearest tokens (fixer.py) and
+                          re-validate; a clean result ends the loop early.
+    candidates          : Best-of-N. Each iteration fires this many
+                          generations at once (temperatures 0.2 .. 0.8) and
+                          keeps the first that passes, cancelling the rest,
+                          or else the one with the fewest errors. Streaming
+                          early-abort does not apply to sampled candidates.
+    on_event            : Progress callback, called with a dict per event:
+                          "iteration", "block" (streaming only: a finished
+                          block), "validation" and "autofix".
+    """
+    if candidates > 1:
+        async def sample() -> dict[str, Any]:
+            try:
+                return await arun_agent(
+                    user_description, output_dir, conversation_history, component_slug,
+                    stream=stream, verbose=verbose, repair=repair, autofix=autofix,
+                    candidates=candidates, on_event=on_event,
+                )
+            finally:
+                await aclose_async_client()
+        return asyncio.run(sample())
+
+    steps = _agent_steps(
+        user_description, output_dir, conversation_history, component_slug,
+        stream=stream, verbose=verbose, repair=repair, autofix=autofix, candidates=1,
+        on_event=on_event,
+    )
+    try:
+        request = next(steps)
+        while True:
+            if isinstance(request, _Blocking):
+                try:
+                    value = request.fn(*request.args)
+                except Exception as exc:
+                    request = steps.throw(exc)
+                else:
+                    request = steps.send(value)
+                continue
+            request.pop("candidates")
+            request = steps.send(generate_component(**request))
+    except StopIteration as done:
+        return done.value
+
+
+async def arun_agent(
+    user_description: str,
+    output_dir: str = "output",
+    conversation_history: list[dict] | None = None,
+    component_slug: str | None = None,
+    stream: bool = False,
+    verbose: bool = True,
+    repair: bool = False,
+    autofix: bool = True,
+    candidates: int = 1,
+    on_event: Callable[[dict], None] | None = None,
+) -> dict[str, Any]:
+    """
+    Async run_agent: same loop and result, LLM calls via agenerate_component.
+
+    Many arun_agent() calls can be awaited together (e.g. asyncio.gather);
+    generator.set_max_concurrency() bounds how many requests are in flight.
+    Pass verbose=False when running several at once to keep output readable.
+    """
+    steps = _agent_steps(
+        user_description, output_dir, conversation_history, component_slug,
+        stream=stream, verbose=verbose, repair=repair, autofix=autofix, candidates=candidates,
+        on_event=on_event,
+    )
+    try:
+        request = next(steps)
+        while True:
+            if isinstance(request, _Blocking):
+                # SQLite commits and fsyncs would stall every other run on the loop
+                try:
+                    value = await asyncio.to_thread(request.fn, *request.args)
+                except Exception as exc:
+                    request = steps.throw(exc)
+                else:
+                    request = steps.send(value)
+                continue
+            n = request.pop("candidates")
+            if n > 1:
+                blocks = await _asample_best(request, n)
+            else:
+                blocks = await agenerate_component(**request)
+            request = steps.send(blocks)
+    except StopIteration as done:
+        return done.value
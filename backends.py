@@ -0,0 +1,239 @@
+"""
+backends.py
+-----------
+Pluggable LLM backends for the generator.
+
+A backend hands the generator OpenAI-style chat clients: ``client()`` for
+blocking calls and ``async_client(max_connections)`` for the asyncio pool.
+Both expose ``chat.completions.create(**request)``, with or without
+``stream=True``.
+
+  GroqBackend  -- the real thing; the groq SDK is imported and the client
+                  created on first use.
+  FakeBackend  -- offline stand-in that replays recorded raw responses with
+                  configurable latency; for benchmarks and CI (no network,
+                  no API key). Its results are never written to the
+                  response cache.
+
+Public API:
+  GroqBackend()
+  FakeBackend(responses, latency=0.0, chunk_size=64, chunk_delay=0.0)
+  FakeBackend.from_path(path, **options)
+  load_recorded_responses(path)  -> list[str]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+
+# The SDK (and httpx under it) is most of the pipeline's import time, so it
+# is imported on first LLM use; validate/export/list paths never load it.
+if TYPE_CHECKING:
+    from groq import AsyncGroq, Groq
+
+
+# ---------------------------------------------------------------------------
+# Groq
+# ---------------------------------------------------------------------------
+
+class GroqBackend:
+    """Groq cloud API. The blocking client is built lazily and then reused."""
+
+    name = "groq"
+    cacheable = True
+    rpm = 30          # requests/minute of our tier; GROQ_RPM overrides (see scheduler.py)
+
+    def __init__(self, api_key: str | None = None) -> None:
+        self._api_key = api_key
+        self._client: Groq | None = None
+        self._lock = threading.Lock()
+
+    def client(self) -> Groq:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from groq import Groq
+                    # Retries are the scheduler's job, not the SDK's
+                    self._client = Groq(api_key=self._api_key or os.environ.get("GROQ_API_KEY"),
+                                        max_retries=0)
+        return self._client
+
+    def async_client(self, max_connections: int) -> AsyncGroq:
+        import httpx
+        from groq import AsyncGroq, DefaultAsyncHttpxClient
+
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        return AsyncGroq(
+            api_key=self._api_key or os.environ.get("GROQ_API_KEY"),
+            http_client=DefaultAsyncHttpxClient(limits=limits),
+            max_retries=0,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Offline fake
+# ---------------------------------------------------------------------------
+
+def load_recorded_responses(path: str | Path) -> list[str]:
+    """
+    Raw responses from ``path``: a directory of *.txt files (sorted by name),
+    a .jsonl file with a "raw" field per line, or a single text file.
+    """
+    path = Path(path)
+    if path.is_dir():
+        return [p.read_text(encoding="utf-8") for p in sorted(path.glob("*.txt"))]
+    if path.suffix == ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line)["raw"] for line in f if line.strip()]
+    return [path.read_text(encoding="utf-8")]
+
+
+def _usage(request: dict, text: str) -> SimpleNamespace:
+    prompt = sum(len(m.get("content") or "") for m in request.get("messages", [])) // 4
+    completion = len(text) // 4
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion,
+                           total_tokens=prompt + completion)
+
+
+def _chunk(content: str | None, finish: str | None = None, usage: Any = None) -> SimpleNamespace:
+    delta = SimpleNamespace(content=content, role="assistant")
+    chunk = SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish, index=0)])
+    if usage is not None:
+        chunk.x_groq = SimpleNamespace(usage=usage)
+    return chunk
+
+
+def _completion(text: str, usage: Any) -> SimpleNamespace:
+    message = SimpleNamespace(content=text, role="assistant")
+    return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop", index=0)],
+                           usage=usage)
+
+
+class _FakeStream:
+    def __init__(self, backend: "FakeBackend", text: str, usage: Any) -> None:
+        self._backend = backend
+        self._text = text
+        self._usage = usage
+        self.closed = False
+
+    def _chunks(self):
+        size = self._backend.chunk_size
+        for i in range(0, len(self._text), size):
+            yield _chunk(self._text[i:i + size])
+        yield _chunk(None, "stop", self._usage)
+
+    def __iter__(self):
+        for n, chunk in enumerate(self._chunks()):
+            if self.closed:
+                return
+            if n and self._backend.chunk_delay:
+                time.sleep(self._backend.chunk_delay)
+            yield chunk
+
+    async def __aiter__(self):
+        for n, chunk in enumerate(self._chunks()):
+            if self.closed:
+                return
+            if n and self._backend.chunk_delay:
+                await asyncio.sleep(self._backend.chunk_delay)
+            yield chunk
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class _AsyncFakeStream(_FakeStream):
+    async def close(self) -> None:
+        self.closed = True
+
+
+class _FakeCompletions:
+    def __init__(self, backend: "FakeBackend") -> None:
+        self._backend = backend
+
+    def create(self, stream: bool = False, **request: Any) -> Any:
+        text = self._backend._next()
+        usage = _usage(request, text)
+        if self._backend.latency:
+            time.sleep(self._backend.latency)
+        return _FakeStream(self._backend, text, usage) if stream else _completion(text, usage)
+
+
+class _AsyncFakeCompletions(_FakeCompletions):
+    async def create(self, stream: bool = False, **request: Any) -> Any:
+        text = self._backend._next()
+        usage = _usage(request, text)
+        if self._backend.latency:
+            await asyncio.sleep(self._backend.latency)
+        return _AsyncFakeStream(self._backend, text, usage) if stream else _completion(text, usage)
+
+
+class _FakeClient:
+    def __init__(self, completions: _FakeCompletions) -> None:
+        self.chat = SimpleNamespace(completions=completions)
+
+    def close(self) -> None:
+        pass
+
+
+class _AsyncFakeClient(_FakeClient):
+    async def close(self) -> None:
+        pass
+
+
+class FakeBackend:
+    """
+    Replays ``responses`` round-robin, so the order of recorded passing and
+    failing outputs decides how often the agent has to self-correct.
+
+    latency      : seconds before a response (or its first streamed chunk).
+    chunk_size   : characters per streamed chunk.
+    chunk_delay  : seconds between streamed chunks.
+    """
+
+    name = "fake"
+    cacheable = False
+    rpm = None        # never rate limited
+
+    def __init__(
+        self,
+        responses: list[str],
+        latency: float = 0.0,
+        chunk_size: int = 64,
+        chunk_delay: float = 0.0,
+    ) -> None:
+        if not responses:
+            raise ValueError("FakeBackend needs at least one recorded response")
+        self.responses = list(responses)
+        self.latency = latency
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self._cycle = itertools.cycle(self.responses)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_path(cls, path: str | Path, **options: Any) -> "FakeBackend":
+        return cls(load_recorded_responses(path), **options)
+
+    def _next(self) -> str:
+        with self._lock:
+            self.calls += 1
+            return next(self._cycle)
+
+    def client(self) -> _FakeClient:
+        return _FakeClient(_FakeCompletions(self))
+
+    def async_client(self, max_connections: int) -> _AsyncFakeClient:
+        return _AsyncFakeClient(_AsyncFakeCompletions(self))
@@ -0,0 +1,320 @@
+"""
+benchmarks/bench.py
+-------------------
+Offline benchmark harness. LLM calls go to backends.FakeBackend, which
+replays the recorded responses in benchmarks/fixtures/responses/ (a mix of
+passing and failing outputs), so no network access or API key is needed.
+
+Benchmarks:
+  prompt_tokens   estimated input tokens of a first request,
+                  and of a repair of one SCSS / HTML block    (tokens, lower is better)
+  parse           parse_code_blocks, per response            (us/call, lower is better)
+  validate        validate_component, per component          (us/call, lower is better)
+  validate_many   validate_many over the whole batch,
+                  per component                               (us/call, lower is better)
+  run_agent       full sync agent loop, zero LLM latency      (runs/s, higher is better)
+  batch_c<N>      arun_agent batch at concurrency N with
+                  simulated LLM latency                       (runs/s, higher is better)
+  import_<mod>    cumulative import time of main / relint /
+                  agent per ``python -X importtime``          (ms, lower is better)
+
+Usage (from the repo root):
+  python benchmarks/bench.py                              # run all, print a table
+  python benchmarks/bench.py --save benchmarks/results/local.json
+  python benchmarks/bench.py --compare benchmarks/results/baseline.json
+  python benchmarks/bench.py --only parse,validate --quick
+
+--compare exits with status 1 if any metric regressed by more than
+--tolerance (default 25%). Independently, the run exits with status 1 when
+an import time exceeds STARTUP_BUDGET_MS: the CLI, validate-dir and export
+paths must not pull in the LLM SDK.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "responses"
+
+sys.path.insert(0, str(REPO_ROOT))
+os.chdir(REPO_ROOT)   # the pipeline resolves design_system.json relative to the cwd
+
+import generator  # noqa: E402
+from agent import arun_agent, run_agent, set_run_store  # noqa: E402
+from backends import FakeBackend, load_recorded_responses  # noqa: E402
+from generator import parse_code_blocks  # noqa: E402
+from runstore import RunStore  # noqa: E402
+import validator  # noqa: E402
+from validator import validate_component, validate_many  # noqa: E402
+
+
+_PROMPTS = [
+    "A login card with email and password",
+    "A three-tier pricing table",
+    "A responsive navbar",
+    "A confirm-delete modal",
+    "A sortable user table",
+    "A profile card with follow button",
+]
+
+
+# ---------------------------------------------------------------------------
+# Timing helpers
+# ---------------------------------------------------------------------------
+
+def _per_call_us(fn: Callable[[], None], number: int, repeat: int) -> float:
+    """Median over ``repeat`` rounds of the mean time per call, in microseconds."""
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number * 1e6)
+    return statistics.median(rounds)
+
+
+def _metric(value: float, unit: str, higher_is_better: bool) -> dict:
+    return {"value": round(value, 3), "unit": unit, "higher_is_better": higher_is_better}
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+def bench_prompt(responses: list[str], quick: bool) -> dict:
+    from tokencount import count_message_tokens
+
+    def tokens(repair_blocks: dict | None) -> float:
+        errors = ["[SCSS] example error"] if repair_blocks else None
+        request = generator._build_request(_PROMPTS[0], "design_system.json", errors, 0.2, None, repair_blocks)
+        return count_message_tokens(request["messages"])
+    blocks = parse_code_blocks(responses[0])
+    return {
+        "prompt_tokens": _metric(tokens(None), "tokens", False),
+        "repair_scss": _metric(tokens({"scss": blocks["scss"]}), "tokens", False),
+        "repair_html": _metric(tokens({"html": blocks["html"]}), "tokens", False),
+    }
+
+
+def bench_parse(responses: list[str], quick: bool) -> dict:
+    def run() -> None:
+        for raw in responses:
+            parse_code_blocks(raw)
+    us = _per_call_us(run, 50 if quick else 500, 5) / len(responses)
+    return {"parse": _metric(us, "us/call", False)}
+
+
+def bench_validate(responses: list[str], quick: bool) -> dict:
+    blocks = [parse_code_blocks(raw) for raw in responses]
+
+    # The in-process memo would answer every repeat; measure the checks.
+    def run() -> None:
+        for b in blocks:
+            validator._MEMO.clear()
+            validate_component(b)
+
+    def run_many() -> None:
+        validator._MEMO.clear()
+        validate_many(blocks)
+    number = 20 if quick else 200
+    return {
+        "validate": _metric(_per_call_us(run, number, 5) / len(blocks), "us/call", False),
+        "validate_many": _metric(_per_call_us(run_many, number, 5) / len(blocks), "us/call", False),
+    }
+
+
+@contextlib.contextmanager
+def _run_history(out: str):
+    """Record runs in ``out`` (so the cost is measured) instead of the user's history."""
+    store = RunStore(Path(out) / "runs.sqlite3")
+    set_run_store(store)
+    try:
+        yield
+    finally:
+        set_run_store(None)
+        store.close()
+
+
+def bench_run_agent(responses: list[str], quick: bool) -> dict:
+    runs = 12 if quick else 60
+    generator.set_backend(FakeBackend(responses))
+    with tempfile.TemporaryDirectory() as out, _run_history(out):
+        start = time.perf_counter()
+        for i in range(runs):
+            run_agent(_PROMPTS[i % len(_PROMPTS)], output_dir=out, verbose=False)
+        elapsed = time.perf_counter() - start
+    return {"run_agent": _metric(runs / elapsed, "runs/s", True)}
+
+
+async def _batch(prompts: list[str], out: str, concurrency: int) -> None:
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i: int, prompt: str) -> None:
+        async with gate:
+            await arun_agent(prompt, output_dir=out, component_slug="c" + str(i), verbose=False)
+
+    try:
+        await asyncio.gather(*(one(i, p) for i, p in enumerate(prompts)))
+    finally:
+        await generator.aclose_async_client()
+
+
+def bench_batch(responses: list[str], quick: bool, latency: float = 0.05) -> dict:
+    jobs = 16 if quick else 48
+    prompts = [_PROMPTS[i % len(_PROMPTS)] for i in range(jobs)]
+    results = {}
+    for concurrency in (1, 4, 16):
+        generator.set_backend(FakeBackend(responses, latency=latency))
+        generator.set_max_concurrency(concurrency)
+        with tempfile.TemporaryDirectory() as out, _run_history(out):
+            start = time.perf_counter()
+            asyncio.run(_batch(prompts, out, concurrency))
+            elapsed = time.perf_counter() - start
+        results["batch_c" + str(concurrency)] = _metric(jobs / elapsed, "runs/s", True)
+    return results
+
+
+# Cumulative import time budget per module (``-X importtime``, ms). The groq
+# SDK alone is ~200 ms, so any path that pulls it in at import time fails.
+STARTUP_BUDGET_MS = {"main": 30.0, "relint": 50.0, "agent": 120.0}
+
+
+def _import_ms(module: str) -> float:
+    """Cumulative import time of ``module`` in a fresh interpreter, in ms."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    for line in proc.stderr.splitlines():
+        fields = line.split("|")
+        # Top-level entries are the ones whose name is not indented
+        if len(fields) == 3 and fields[2] == " " + module:
+            return int(fields[1]) / 1000
+    raise RuntimeError("no importtime entry for " + module)
+
+
+def bench_startup(responses: list[str], quick: bool) -> dict:
+    rounds = 3 if quick else 7
+    return {
+        "import_" + module: _metric(statistics.median(_import_ms(module) for _ in range(rounds)), "ms", False)
+        for module in STARTUP_BUDGET_MS
+    }
+
+
+BENCHMARKS = {
+    "prompt": bench_prompt,
+    "parse": bench_parse,
+    "validate": bench_validate,
+    "run_agent": bench_run_agent,
+    "batch": bench_batch,
+    "startup": bench_startup,
+}
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def run(only: list[str] | None = None, quick: bool = False) -> dict:
+    generator.set_response_cache(None)   # measure the pipeline, not the cache
+    responses = load_recorded_responses(FIXTURES)
+    results: dict = {}
+    for name, bench in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        results.update(bench(responses, quick))
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+            "fixtures": len(responses),
+        },
+        "results": results,
+    }
+
+
+def print_results(report: dict) -> None:
+    print("\n" + "=" * 60)
+    print("  Benchmarks (" + report["meta"]["python"] + ", " +
+          ("quick" if report["meta"]["quick"] else "full") + ")")
+    print("=" * 60)
+    for name, m in report["results"].items():
+        print("  " + name.ljust(14) + str(m["value"]).rjust(12) + "  " + m["unit"])
+    print("=" * 60)
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print the change per metric against ``baseline``; return the regressed metric names."""
+    regressions = []
+    print("\n  Against baseline (" + baseline["meta"]["timestamp"] + ", tolerance " +
+          str(int(tolerance * 100)) + "%):")
+    if baseline["meta"].get("quick") != report["meta"]["quick"]:
+        print("  note: quick and full runs are not directly comparable")
+    for name, m in report["results"].items():
+        old = baseline["results"].get(name)
+        if old is None or not old["value"]:
+            print("  " + name.ljust(14) + "   (no baseline)")
+            continue
+        change = (m["value"] - old["value"]) / old["value"]
+        worse = -change if m["higher_is_better"] else change
+        flag = "REGRESSION" if worse > tolerance else ("better" if worse < 0 else "")
+        if worse > tolerance:
+            regressions.append(name)
+        print("  " + name.ljust(14) + ("%+.1f%%" % (change * 100)).rjust(9) + "  " + flag)
+    return regressions
+
+
+def over_budget(report: dict) -> list[str]:
+    """Print and return the import metrics that exceed STARTUP_BUDGET_MS."""
+    over = []
+    for module, budget in STARTUP_BUDGET_MS.items():
+        m = report["results"].get("import_" + module)
+        if m is not None and m["value"] > budget:
+            over.append("import_" + module)
+            print("  import_" + module + " over budget: " + str(m["value"]) + " > " + str(budget) + " ms")
+    return over
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline ComponentForge benchmarks")
+    parser.add_argument("--only", help="Comma-separated subset: " + ",".join(BENCHMARKS))
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations (CI smoke run)")
+    parser.add_argument("--save", metavar="PATH", help="Write results JSON to PATH")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare with a saved results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative regression for --compare (default 0.25)")
+    args = parser.parse_args()
+
+    only = [name.strip() for name in args.only.split(",")] if args.only else None
+    report = run(only, args.quick)
+    print_results(report)
+    status = 1 if over_budget(report) else 0
+
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print("  Saved → " + args.save)
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
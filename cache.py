@@ -0,0 +1,152 @@
+"""
+cache.py
+--------
+Content-addressed on-disk cache for LLM generations.
+
+Entries are keyed by a SHA-256 of the full chat request (model, sampling
+parameters and every message), so a hit means the exact same request was
+answered before. Storage is a single SQLite file with LRU eviction by total
+size and a TTL on every entry. The total size is kept as a running count, so
+a put does not sum the whole table; it is re-read from the file every
+_RESYNC_PUTS puts to pick up writes from other processes.
+
+Public API:
+  ResponseCache(path, max_bytes, ttl)
+  ResponseCache.key(request)        -> str
+  ResponseCache.get(key)            -> dict | None   # {"raw_response", "blocks"}
+  ResponseCache.put(key, raw, blocks)
+  default_cache_path()              -> Path
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL = 30 * 24 * 3600
+_RESYNC_PUTS = 256
+
+
+def default_cache_path() -> Path:
+    """$COMPONENTFORGE_CACHE_DIR/responses.sqlite3, else ~/.cache/componentforge/."""
+    root = os.environ.get("COMPONENTFORGE_CACHE_DIR") or Path.home() / ".cache" / "componentforge"
+    return Path(root) / "responses.sqlite3"
+
+
+class ResponseCache:
+    """SQLite-backed response cache. Safe to share between threads; opened on first use."""
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: float = DEFAULT_TTL,
+    ) -> None:
+        self.path = Path(path) if path else default_cache_path()
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._total = 0           # bytes stored, as far as this process knows
+        self._puts = 0
+
+    @staticmethod
+    def key(request: dict) -> str:
+        """Hash of the canonical JSON form of a chat-completion request."""
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, raw TEXT NOT NULL, blocks TEXT NOT NULL,"
+                " size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses(created)")
+            self._total = self._sum(conn)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _sum(db: sqlite3.Connection) -> int:
+        return db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> dict | None:
+        """Stored {"raw_response", "blocks"} for ``key``, or None (missing or expired)."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT raw, blocks, created, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[2] > self.ttl:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total -= row[3]
+                return None
+            db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return {"raw_response": row[0], "blocks": json.loads(row[1])}
+
+    def put(self, key: str, raw: str, blocks: dict) -> None:
+        blocks_json = json.dumps(blocks, ensure_ascii=False)
+        size = len(raw.encode("utf-8")) + len(blocks_json.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            old = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, raw, blocks, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, raw, blocks_json, size, now, now),
+            )
+            self._total += size - (old[0] if old else 0)
+            self._puts += 1
+            if self._puts % _RESYNC_PUTS == 0:
+                self._total = self._sum(db)
+            self._evict(db, now)
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        # Both statements walk the created index over expired rows only
+        cutoff = now - self.ttl
+        expired = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses WHERE created < ?",
+                             (cutoff,)).fetchone()[0]
+        if expired:
+            db.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+            self._total -= expired
+        if self._total <= self.max_bytes:
+            return
+        # Least recently used first, until the cache fits again
+        excess = self._total - self.max_bytes
+        doomed = []
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            doomed.append((key,))
+            excess -= size
+            self._total -= size
+            if excess <= 0:
+                break
+        db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db().execute("DELETE FROM responses")
+            self._total = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
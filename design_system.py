@@ -0,0 +1,253 @@
+"""
+design_system.py
+----------------
+Compiled, cached view of design_system.json shared by generator and validator.
+
+The JSON file is read and compiled once into an immutable DesignSystem
+(approved colors and the hex digits they accept, approved radii, normalized
+font, the value -> token index of tokens.py, rendered system prompt).
+The system prompt is a compact token table rather than the JSON itself;
+prompt_for() renders it for a subset of sections and reports its size.
+``version`` hashes the whole file; ``token_version`` only the tokens the
+validator checks, so cached lint results survive unrelated edits.
+Compiled systems are cached by path and reloaded automatically when the
+file's mtime/size changes; a content hash keeps a touched-but-unchanged file
+from being recompiled.
+
+Public API:
+  load_design_system(path)           -> DesignSystem
+  DesignSystem.prompt_for(sections)  -> (system prompt, estimated tokens)
+  render_system_prompt(data, sections) -> str
+  PROMPT_SECTIONS, OPTIONAL_SECTIONS
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from tokencount import estimate_tokens
+from tokens import TokenIndex, build_index
+
+
+# ---------------------------------------------------------------------------
+# Token extraction
+# ---------------------------------------------------------------------------
+
+def _extract_approved_colors(design_system: dict) -> frozenset:
+    approved = set()
+    for value in design_system.get("colors", {}).values():
+        if isinstance(value, str) and value.startswith("#"):
+            approved.add(value.lower())
+    return frozenset(approved)
+
+
+def _approved_hex(colors: frozenset) -> frozenset:
+    """Lowercase hex digits (no '#') matching an approved color, incl. 3-digit shorthands."""
+    accepted = set()
+    for color in colors:
+        digits = color[1:]
+        accepted.add(digits)
+        if len(digits) == 6 and digits[0::2] == digits[1::2]:
+            accepted.add(digits[0::2])
+    return frozenset(accepted)
+
+
+def _extract_approved_radii(design_system: dict) -> frozenset:
+    approved = set()
+    for key, value in design_system.get("borders", {}).items():
+        if "radius" in key and isinstance(value, str):
+            approved.add(value.lower())
+    # Always allow 0 and 0px -- valid CSS reset, not a design token violation
+    approved.add("0")
+    approved.add("0px")
+    return frozenset(approved)
+
+
+def _normalize_font(font_family: str) -> str:
+    """Primary family name, lowercased and unquoted ("'Inter', sans-serif" -> "inter")."""
+    return font_family.lower().replace("'", "").replace('"', "").split(",")[0].strip()
+
+
+# Sections sent to the model, in prompt order. "meta" never is. The optional
+# ones are the first to go when a request is over its token budget.
+PROMPT_SECTIONS = ("colors", "typography", "spacing", "borders", "shadows", "effects", "breakpoints")
+OPTIONAL_SECTIONS = ("breakpoints", "effects")
+
+
+def _token_table(design_system: dict, sections: tuple) -> str:
+    """
+    ``[section]`` groups of ``name=value`` lines. Names sharing a value share
+    a line ("accent, warning=#f59e0b"); a color repeated in a later section
+    (border-color) is folded into its palette line.
+    """
+    groups: list[tuple[str, list]] = []
+    shared: dict = {}              # value key -> names on the line that holds it
+    for section in sections:
+        tokens = design_system.get(section)
+        if not isinstance(tokens, dict):
+            continue
+        group: list[tuple[list, str]] = []
+        for name, value in tokens.items():
+            if not isinstance(value, (str, int, float)):
+                continue
+            value = " ".join(str(value).split())
+            key = value.lower() if value.startswith("#") else (section, value)
+            names = shared.get(key)
+            if names is not None:
+                names.append(name)
+                continue
+            shared[key] = names = [name]
+            group.append((names, value))
+        if group:
+            groups.append((section, group))
+    lines: list[str] = []
+    for section, group in groups:
+        lines.append("[" + section + "]")
+        lines.extend(", ".join(names) + "=" + value for names, value in group)
+    return "\n".join(lines)
+
+
+def _rules(sections: tuple) -> list[str]:
+    rules = []
+    if "colors" in sections:
+        rules.append("Colors: ONLY [colors] values (hex, or rgb()/hsl() of the same color; alpha is fine). "
+                     "Never invent colors such as #ccc or #333.")
+    if "borders" in sections:
+        rules.append("border-radius: ONLY the border-radius values in [borders], or 0.")
+    if "typography" in sections:
+        rules.append("font-family, font-size and font-weight: ONLY [typography] values.")
+    if "spacing" in sections:
+        rules.append("margin, padding and gap: ONLY [spacing] values (0 and auto are fine).")
+    if "shadows" in sections:
+        rules.append("box-shadow: ONLY a [shadows] value, or none.")
+    if len(sections) > 1:
+        rules.append("Write token values literally, not as var() or $variables.")
+    rules += [
+        "Include a valid @Component decorator with selector and template/styles.",
+        "Every opening bracket/tag must have a matching closing bracket/tag.",
+        "Self-contained -- imports only from @angular/core and @angular/material.",
+        "Include proper TypeScript types (no implicit any).",
+    ]
+    return [str(i) + ". " + rule for i, rule in enumerate(rules, 1)]
+
+
+def render_system_prompt(design_system: dict, sections: tuple = PROMPT_SECTIONS) -> str:
+    """System prompt carrying only ``sections`` of the design system, as a compact token table."""
+    table = _token_table(design_system, sections)
+    design = "=== DESIGN TOKENS (use ONLY these values) ===\n" + table + "\n\n" if table else ""
+    return (
+        "You are an expert Angular frontend engineer.\n"
+        "Your ONLY job is to produce raw Angular component code. No explanations, no markdown prose, "
+        "no greetings.\n\n"
+        + design +
+        "=== OUTPUT FORMAT (follow exactly, no extra text) ===\n"
+        "<<<TS>>>\n<TypeScript component class here>\n<<<END_TS>>>\n\n"
+        "<<<HTML>>>\n<Angular template here>\n<<<END_HTML>>>\n\n"
+        "<<<SCSS>>>\n<SCSS styles here>\n<<<END_SCSS>>>\n\n"
+        "=== STRICT RULES ===\n" + "\n".join(_rules(sections)) + "\n"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Compiled design system
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class DesignSystem:
+    """Immutable, pre-compiled design tokens. Treat ``data`` as read-only."""
+    path: str
+    version: str
+    data: dict = field(repr=False, compare=False)
+    approved_colors: frozenset = field(repr=False)
+    approved_radii: frozenset = field(repr=False)
+    font_family: str = ""
+    font_clean: str = ""
+    system_prompt: str = field(default="", repr=False)
+    token_version: str = ""
+    approved_hex: frozenset = field(default=frozenset(), repr=False)
+    tokens: TokenIndex = field(default_factory=TokenIndex, repr=False, compare=False)
+    system_prompt_tokens: int = 0
+    _prompts: dict = field(default_factory=dict, repr=False, compare=False)
+
+    @staticmethod
+    def _token_version(colors: frozenset, radii: frozenset, font_family: str, tokens: TokenIndex) -> str:
+        """Fingerprint of exactly what the validator checks against (and quotes in messages)."""
+        text = "\n".join([",".join(sorted(colors)), ",".join(sorted(radii)), font_family, tokens.fingerprint])
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    def prompt_for(self, sections: tuple = PROMPT_SECTIONS) -> tuple[str, int]:
+        """(system prompt, estimated tokens) with only ``sections``; rendered once per subset."""
+        sections = tuple(s for s in PROMPT_SECTIONS if s in sections)
+        if sections == PROMPT_SECTIONS:
+            return self.system_prompt, self.system_prompt_tokens
+        hit = self._prompts.get(sections)
+        if hit is None:
+            prompt = render_system_prompt(self.data, sections)
+            hit = self._prompts[sections] = (prompt, estimate_tokens(prompt))
+        return hit
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, path: str = "<memory>") -> "DesignSystem":
+        data = json.loads(raw.decode("utf-8"))
+        font = data.get("typography", {}).get("font-family", "")
+        colors = _extract_approved_colors(data)
+        radii = _extract_approved_radii(data)
+        font_clean = _normalize_font(font) if font else ""
+        tokens = build_index(data)
+        prompt = render_system_prompt(data)
+        return cls(
+            path=path,
+            version=hashlib.sha256(raw).hexdigest()[:16],
+            data=data,
+            approved_colors=colors,
+            approved_radii=radii,
+            font_family=font,
+            font_clean=font_clean,
+            system_prompt=prompt,
+            system_prompt_tokens=estimate_tokens(prompt),
+            token_version=cls._token_version(colors, radii, font, tokens),
+            approved_hex=_approved_hex(colors),
+            tokens=tokens,
+        )
+
+
+# path -> (stat key, DesignSystem); content hash -> DesignSystem
+_BY_PATH: dict[str, tuple[tuple[int, int], DesignSystem]] = {}
+_BY_VERSION: dict[str, DesignSystem] = {}
+_LOCK = threading.Lock()
+
+
+def load_design_system(path: str | Path = "design_system.json") -> DesignSystem:
+    """
+    Return the compiled DesignSystem for ``path``.
+
+    Only a ``stat`` call is made while the file is unchanged. When mtime or
+    size moves, the file is re-read and hashed; identical content reuses the
+    already compiled object.
+    """
+    key = os.path.abspath(path)
+    st = os.stat(key)
+    stamp = (st.st_mtime_ns, st.st_size)
+
+    cached = _BY_PATH.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with _LOCK:
+        cached = _BY_PATH.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        with open(key, "rb") as f:
+            raw = f.read()
+        version = hashlib.sha256(raw).hexdigest()[:16]
+        ds = _BY_VERSION.get(version)
+        if ds is None or ds.path != key:
+            ds = DesignSystem.from_bytes(raw, path=key)
+            _BY_VERSION[version] = ds
+        _BY_PATH[key] = (stamp, ds)
+        return ds
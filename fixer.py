@@ -0,0 +1,190 @@
+"""
+fixer.py
+--------
+Deterministic auto-fixer for design-token violations.
+
+Runs locally before another LLM round-trip:
+  1. Unauthorized hex colors are snapped to the perceptually nearest approved
+     color (CIELAB distance; the palette is converted once per design-system
+     version and every looked-up color is memoized).
+  2. Unauthorized border-radius values, each value of a shorthand on its
+     own, are snapped to the nearest approved radius (px and rem as
+     tokens.to_px measures them, em like rem; 50%+ means "fully round").
+
+Colors and declarations are located with the same scanner the validator
+uses, so exactly the values the validator reports are rewritten.
+
+Public API:
+  fix_blocks(code_blocks, design_system_path) -> (fixed_blocks, changes)
+  nearest_color(hex_color, ds)                -> approved hex
+  nearest_radius(value, ds)                   -> approved radius | None
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+from design_system import DesignSystem, load_design_system
+from scanner import hex_colors, scan_scss, scan_typescript
+from tokens import to_px
+
+
+# ---------------------------------------------------------------------------
+# Colors
+# ---------------------------------------------------------------------------
+
+def _expand(hex_digits: str) -> str:
+    h = hex_digits.lower()
+    return "".join(c * 2 for c in h) if len(h) == 3 else h
+
+
+def _to_lab(hex_digits: str) -> tuple[float, float, float]:
+    """sRGB hex (6 digits) -> CIELAB (D65)."""
+    rgb = []
+    for i in (0, 2, 4):
+        c = int(hex_digits[i:i + 2], 16) / 255.0
+        rgb.append(c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4)
+    r, g, b = rgb
+    x = (0.4124 * r + 0.3576 * g + 0.1805 * b) / 0.95047
+    y = (0.2126 * r + 0.7152 * g + 0.0722 * b) / 1.00000
+    z = (0.0193 * r + 0.1192 * g + 0.9505 * b) / 1.08883
+
+    def f(t: float) -> float:
+        return t ** (1.0 / 3.0) if t > 0.008856 else 7.787 * t + 16.0 / 116.0
+
+    fx, fy, fz = f(x), f(y), f(z)
+    return 116.0 * fy - 16.0, 500.0 * (fx - fy), 200.0 * (fy - fz)
+
+
+_PALETTES: dict[str, tuple] = {}
+
+
+def _palette(ds: DesignSystem) -> tuple:
+    """(hex, lab) for every approved color; built once per design-system version."""
+    palette = _PALETTES.get(ds.version)
+    if palette is None:
+        palette = tuple((c, _to_lab(_expand(c[1:]))) for c in sorted(ds.approved_colors))
+        _PALETTES[ds.version] = palette
+    return palette
+
+
+@lru_cache(maxsize=4096)
+def _nearest(version: str, hex_digits: str) -> str:
+    lab = _to_lab(_expand(hex_digits))
+    best, best_d = "", float("inf")
+    for candidate, (l2, a2, b2) in _PALETTES[version]:
+        d = (lab[0] - l2) ** 2 + (lab[1] - a2) ** 2 + (lab[2] - b2) ** 2
+        if d < best_d:
+            best, best_d = candidate, d
+    return best
+
+
+def nearest_color(hex_color: str, ds: DesignSystem) -> str:
+    """Approved color perceptually closest to ``hex_color`` ("#abc" or "#aabbcc")."""
+    _palette(ds)
+    return _nearest(ds.version, hex_color.lstrip("#"))
+
+
+def _is_approved(hex_digits: str, ds: DesignSystem) -> bool:
+    return hex_digits.lower() in ds.approved_hex
+
+
+# ---------------------------------------------------------------------------
+# Radii
+# ---------------------------------------------------------------------------
+
+def _radius_px(value: str) -> float | None:
+    """tokens.to_px, plus em (as rem) and 50%+ as infinitely round."""
+    if value.endswith("%"):
+        try:
+            return float("inf") if float(value[:-1]) >= 50 else None
+        except ValueError:
+            return None
+    if value.endswith("em") and not value.endswith("rem"):
+        value = value[:-2] + "rem"
+    return to_px(value)
+
+
+def nearest_radius(value: str, ds: DesignSystem) -> str | None:
+    """Approved radius closest to ``value`` in px, or None when it can't be measured."""
+    px = _radius_px(value.strip().lower())
+    if px is None:
+        return None
+    sized = [(cpx, c) for c in sorted(ds.approved_radii) if (cpx := _radius_px(c.lower())) is not None]
+    if not sized:
+        return None
+    if px == float("inf"):
+        return max(sized)[1]          # 50%+ is a pill/circle: the largest token
+    return min(sized, key=lambda item: abs(item[0] - px))[1]
+
+
+# ---------------------------------------------------------------------------
+# Rewriting
+# ---------------------------------------------------------------------------
+
+def _apply(code: str, edits: list) -> str:
+    """Apply (start, end, replacement) edits, which must not overlap."""
+    if not edits:
+        return code
+    parts, pos = [], 0
+    for start, end, replacement in sorted(edits):
+        parts.append(code[pos:start])
+        parts.append(replacement)
+        pos = end
+    parts.append(code[pos:])
+    return "".join(parts)
+
+
+def _color_edits(colors, ds: DesignSystem, src: str, changes: list) -> list:
+    edits = []
+    for offset, digits in colors:
+        if _is_approved(digits, ds):
+            continue
+        target = nearest_color(digits, ds)
+        edits.append((offset, offset + 1 + len(digits), target))
+        changes.append("[" + src + "] #" + digits.lower() + " → " + target)
+    return edits
+
+
+def fix_blocks(
+    code_blocks: dict,
+    design_system_path: str = "design_system.json",
+) -> tuple[dict, list[str]]:
+    """
+    Snap unauthorized colors and radii to the nearest design tokens.
+
+    Returns (fixed_blocks, changes). ``fixed_blocks`` is a new dict (other keys
+    copied through); ``changes`` is empty when nothing was rewritten.
+    """
+    ds = load_design_system(design_system_path)
+    fixed = dict(code_blocks)
+    changes: list[str] = []
+
+    ts = code_blocks.get("ts", "")
+    if ts:
+        fixed["ts"] = _apply(ts, _color_edits(scan_typescript(ts).colors, ds, "TS", changes))
+
+    html = code_blocks.get("html", "")
+    if html:
+        fixed["html"] = _apply(html, _color_edits(hex_colors(html), ds, "HTML", changes))
+
+    scss = code_blocks.get("scss", "")
+    if scss:
+        scan = scan_scss(scss)
+        edits = _color_edits(scan.colors, ds, "SCSS", changes)
+        for decl in scan.declarations:
+            if decl.prop != "border-radius" and not decl.prop.endswith("-border-radius"):
+                continue
+            val = decl.value.lower()
+            # var(), $variables, calc() and elliptical "a / b" radii are left to the LLM
+            if "(" in val or "$" in val or "/" in val:
+                continue
+            parts = val.split()
+            snapped = [p if ds.tokens.length_token("radius", p) else (nearest_radius(p, ds) or p) for p in parts]
+            if snapped != parts:
+                target = " ".join(snapped)
+                edits.append((decl.start, decl.end, target))
+                changes.append("[SCSS] border-radius " + val + " → " + target)
+        fixed["scss"] = _apply(scss, edits)
+
+    return fixed, changes
@@ -0,0 +1,130 @@
+"""
+fsutil.py
+---------
+Crash-safe, change-aware file writes for generated output.
+
+Every file is written to a temp file in the same directory, fsync'ed and
+moved into place with os.replace(). A reader therefore sees either the old
+content or the new content, never a partial file. Files whose content hash
+is unchanged are not touched at all, so their mtimes stay put and watching
+dev servers do not rebuild.
+
+write_many() stages all files of a component first and only then renames
+them in one commit step. A failure while staging leaves every target
+untouched. write_stream() writes text as it is produced, hashing along the
+way, so a large export never has to be held in memory as one string.
+
+Public API:
+  content_hash(text)                      -> str
+  atomic_write(path, text)                -> bool    # False: unchanged, skipped
+  write_many(files)                       -> list[Path]   # paths actually written
+  write_stream(path, chunks)              -> bool    # chunks: iterable of str
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _unchanged(path: Path, digest: str) -> bool:
+    try:
+        # Raw bytes: read_text() would turn CRLF into LF and hide a real difference
+        return hashlib.sha256(path.read_bytes()).hexdigest() == digest
+    except FileNotFoundError:
+        return False
+
+
+def _stage(path: Path, data: bytes | Iterable[bytes]) -> str:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix="." + path.name + ".", suffix=".tmp")
+    try:
+        # mkstemp creates 0600 files; keep the target's mode, else a normal 0644
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        if hasattr(os, "fchmod"):
+            os.fchmod(fd, mode)
+        with os.fdopen(fd, "wb") as f:
+            if isinstance(data, bytes):
+                f.write(data)
+            else:
+                for chunk in data:
+                    f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return tmp
+
+
+def _fsync_dir(directory: Path) -> None:
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_many(files: dict[Path, str]) -> list[Path]:
+    """
+    Atomically write ``files`` (path -> text), skipping any whose current
+    content already hashes the same. Returns the paths that were (re)written.
+    """
+    staged: list[tuple[str, Path]] = []
+    try:
+        for path, text in files.items():
+            path = Path(path)
+            if _unchanged(path, content_hash(text)):
+                continue
+            staged.append((_stage(path, text.encode("utf-8")), path))
+    except BaseException:
+        for tmp, _ in staged:
+            os.unlink(tmp)
+        raise
+
+    # Commit step: renames only, once every file is safely on disk
+    for tmp, path in staged:
+        os.replace(tmp, path)
+    for directory in {path.parent for _, path in staged}:
+        _fsync_dir(directory)
+    return [path for _, path in staged]
+
+
+def atomic_write(path: str | Path, text: str) -> bool:
+    """Write one file atomically. Returns False if its content was already ``text``."""
+    return bool(write_many({Path(path): text}))
+
+
+def write_stream(path: str | Path, chunks: Iterable[str]) -> bool:
+    """
+    Atomically write the concatenation of ``chunks``, encoding and hashing each
+    one as it arrives. Returns False (and leaves the file alone) if the result
+    equals the current content.
+    """
+    path = Path(path)
+    hasher = hashlib.sha256()
+
+    def encoded():
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            hasher.update(data)
+            yield data
+
+    tmp = _stage(path, encoded())
+    if _unchanged(path, hasher.hexdigest()):
+        os.unlink(tmp)
+        return False
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+    return True
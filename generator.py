@@ -4,72 +4,175 @@ generator.py
 Uses Groq (free) with llama-3.3-70b-versatile.
 Supports multi-turn conversation history for iterative editing.
 Set GROQ_API_KEY environment variable before running.
+
+generate_component() is the blocking API; agenerate_component() is its
+asyncio twin, running on a shared keep-alive connection pool with a bounded
+number of requests in flight (set_max_concurrency()).
+
+Completed first-attempt responses are kept in a content-addressed on-disk
+cache (cache.py) keyed by the full request; set_response_cache(None) turns
+it off. Self-corrections and repairs are never cached: an identical retry
+would otherwise get back the very response it is correcting.
+
+The LLM itself is a pluggable backend (backends.py): Groq by default,
+set_backend(FakeBackend(...)) for offline runs. Requests go out through a
+scheduler (scheduler.py) that paces them to the Groq tier's rate limit and
+retries transient failures; llm_stats() reports what it did.
+
+The system prompt is the design system's compact token table
+(design_system.prompt_for). Repairs of TS/HTML blocks only carry the
+palette. Every request must fit the input budget (set_prompt_budget(),
+COMPONENTFORGE_PROMPT_BUDGET); over it, optional token sections go first,
+then the oldest history turns (a user message with its replies; the
+compact_history summary is kept), and PromptBudgetError is raised if that
+is still not enough.
 """
 
 from __future__ import annotations
 
-import json
+import asyncio
+import hashlib
 import os
 import re
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
-from groq import Groq
+from backends import GroqBackend
+from cache import ResponseCache
+from design_system import OPTIONAL_SECTIONS, PROMPT_SECTIONS, DesignSystem, load_design_system
+from history import is_summary
+from scheduler import Scheduler
+from tokencount import count_message_tokens, estimate_tokens
+from tracing import annotate, record_usage, span
 
 # ---------------------------------------------------------------------------
 # Client setup
 # ---------------------------------------------------------------------------
 
-_CLIENT = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+_BACKEND = GroqBackend()
 _MODEL_NAME = "llama-3.3-70b-versatile"
 
+_MAX_CONCURRENCY = int(os.environ.get("COMPONENTFORGE_MAX_CONCURRENCY", "16"))
 
-def _load_design_system(path: str | Path = "design_system.json") -> dict:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
 
+class _AsyncPool:
+    """The backend's async client on one connection pool, plus a gate capping requests in flight."""
 
-def _build_system_prompt(design_system: dict) -> str:
-    ds_str = json.dumps(design_system, indent=2)
-    return f"""You are an expert Angular frontend engineer.
-Your ONLY job is to produce raw Angular component code. No explanations, no markdown prose, no greetings.
+    def __init__(self, max_concurrency: int) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.client = _BACKEND.async_client(max_concurrency)
+        self.gate = asyncio.Semaphore(max_concurrency)
 
-=== DESIGN SYSTEM (use ONLY these tokens) ===
-{ds_str}
 
-=== OUTPUT FORMAT (follow exactly, no extra text) ===
-<<<TS>>>
-<TypeScript component class here>
-<<<END_TS>>>
+_ASYNC_POOL: _AsyncPool | None = None
 
-<<<HTML>>>
-<Angular template here>
-<<<END_HTML>>>
 
-<<<SCSS>>>
-<SCSS styles here>
-<<<END_SCSS>>>
+def _async_pool() -> _AsyncPool:
+    # httpx pools and semaphores belong to one event loop; rebuild for a new one.
+    global _ASYNC_POOL
+    if _ASYNC_POOL is None or _ASYNC_POOL.loop is not asyncio.get_running_loop():
+        _ASYNC_POOL = _AsyncPool(_MAX_CONCURRENCY)
+    return _ASYNC_POOL
+
+
+def set_max_concurrency(limit: int) -> None:
+    """Cap concurrent async LLM requests (and pooled connections). Applies to new pools."""
+    global _MAX_CONCURRENCY, _ASYNC_POOL
+    _MAX_CONCURRENCY = max(1, int(limit))
+    _ASYNC_POOL = None
+
+
+def set_backend(backend: Any) -> None:
+    """Route all generations through ``backend`` (see backends.py), e.g. FakeBackend offline."""
+    global _BACKEND, _ASYNC_POOL, _SCHEDULER
+    _BACKEND = backend
+    _ASYNC_POOL = None
+    _SCHEDULER = Scheduler.from_env(getattr(backend, "rpm", None))
+
+
+# Every LLM request is paced, retried and circuit-broken here (scheduler.py)
+_SCHEDULER = Scheduler.from_env(_BACKEND.rpm)
+
+
+def set_scheduler(scheduler: Scheduler) -> None:
+    """Replace the request scheduler (rate limit, retries, timeout, circuit breaker)."""
+    global _SCHEDULER
+    _SCHEDULER = scheduler
+
+
+def llm_stats() -> dict:
+    """Scheduler counters: calls, attempts, retries, throttling, circuit state."""
+    return _SCHEDULER.stats()
+
+
+# Estimated input tokens (system prompt + messages) allowed per request
+_PROMPT_BUDGET: int | None = int(os.environ.get("COMPONENTFORGE_PROMPT_BUDGET", "8000")) or None
+
+
+class PromptBudgetError(ValueError):
+    """The request does not fit the prompt budget even after trimming."""
+
+
+def set_prompt_budget(tokens: int | None) -> None:
+    """Cap estimated input tokens per request; None (or 0) removes the cap."""
+    global _PROMPT_BUDGET
+    _PROMPT_BUDGET = int(tokens) if tokens else None
+
+
+_RESPONSE_CACHE: ResponseCache | None = ResponseCache()
+
+
+def set_response_cache(cache: ResponseCache | None) -> None:
+    """Replace the response cache; None disables caching (e.g. --no-cache)."""
+    global _RESPONSE_CACHE
+    _RESPONSE_CACHE = cache
+
+
+async def aclose_async_client() -> None:
+    """Close the pooled async client of the running loop (e.g. at the end of a batch)."""
+    global _ASYNC_POOL
+    if _ASYNC_POOL is not None and _ASYNC_POOL.loop is asyncio.get_running_loop():
+        await _ASYNC_POOL.client.close()
+    _ASYNC_POOL = None
 
-=== STRICT RULES ===
-1. Use ONLY hex color values from the design system "colors" section. Never invent colors.
-2. Use ONLY border-radius values from the "borders" section.
-3. Use ONLY font-family from the "typography" section.
-4. Include a valid @Component decorator with selector and inline template/styles.
-5. Every opening bracket/tag must have a matching closing bracket/tag.
-6. No placeholder colors like #ccc, #000 unless they are in the design system.
-7. Self-contained -- imports only from @angular/core and @angular/material.
-8. Include proper TypeScript types (no implicit any).
-"""
+
+_BLOCK_TAGS = {"ts": "TS", "html": "HTML", "scss": "SCSS"}
+
+# All three sections in one scan. The body is an unrolled "anything up to the
+# matching end marker" loop: runs of non-'<' text are consumed whole instead
+# of testing the end marker after every character as a lazy ``.*?`` would.
+_SECTION_RE = re.compile(
+    r"<<<(TS|HTML|SCSS)>>>([^<]*(?:<(?!<<END_\1>>>)[^<]*)*)<<<END_\1>>>"
+)
+_SECTION_KEYS = {tag: key for key, tag in _BLOCK_TAGS.items()}
 
 
 def _build_user_prompt(
     user_description: str,
     design_system: dict,
     previous_errors: list[str] | None = None,
+    repair_blocks: dict[str, str] | None = None,
 ) -> str:
     base = f"Generate an Angular component for: {user_description}"
 
-    if previous_errors:
+    if repair_blocks:
+        errors_block = "\n".join(f"  - {e}" for e in previous_errors or [])
+        failing = format_code_blocks(repair_blocks)
+        names = ", ".join(_BLOCK_TAGS[k] for k in repair_blocks)
+        base += f"""
+
+REPAIR REQUEST:
+The rest of the component already passed validation. Only these block(s) failed: {names}
+{failing}
+
+Validation errors to fix:
+{errors_block}
+
+Return ONLY the corrected {names} block(s), complete, using the same <<<...>>> markers.
+Do not output any other block.
+"""
+    elif previous_errors:
         errors_block = "\n".join(f"  - {e}" for e in previous_errors)
         base += f"""
 
@@ -89,27 +192,320 @@ Re-generate the FULL component (all three blocks) with every error corrected.
 
 def parse_code_blocks(raw: str) -> dict[str, str]:
     """Extract TS / HTML / SCSS blocks from the model's raw text output."""
-    patterns = {
-        "ts":   r"<<<TS>>>(.*?)<<<END_TS>>>",
-        "html": r"<<<HTML>>>(.*?)<<<END_HTML>>>",
-        "scss": r"<<<SCSS>>>(.*?)<<<END_SCSS>>>",
+    found: dict[str, str] = {}
+    for match in _SECTION_RE.finditer(raw):
+        key = _SECTION_KEYS[match.group(1)]
+        if key not in found:         # first occurrence wins
+            found[key] = match.group(2).strip()
+            if len(found) == len(_BLOCK_TAGS):
+                break
+    return {key: found.get(key, "") for key in _BLOCK_TAGS}
+
+
+def format_code_blocks(blocks: dict[str, str]) -> str:
+    """Inverse of parse_code_blocks: render the given blocks with their markers."""
+    parts = []
+    for key, tag in _BLOCK_TAGS.items():
+        if key in blocks:
+            parts.append("<<<" + tag + ">>>\n" + blocks[key] + "\n<<<END_" + tag + ">>>")
+    return "\n\n".join(parts)
+
+
+class _SectionParser:
+    """Detects <<<X>>> ... <<<END_X>>> sections as soon as they finish streaming."""
+
+    _END_MARKERS = {"ts": "<<<END_TS>>>", "html": "<<<END_HTML>>>", "scss": "<<<END_SCSS>>>"}
+    _OPEN_MARKERS = {"ts": "<<<TS>>>", "html": "<<<HTML>>>", "scss": "<<<SCSS>>>"}
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.finished: dict[str, str] = {}
+        self._searched = 0   # END markers are only looked for in new text
+
+    def feed(self, delta: str) -> list[tuple[str, str]]:
+        """Append streamed text; return (key, content) for each block that just closed."""
+        self.text += delta
+        if ">" not in delta:
+            return []
+        start = max(0, self._searched - len("<<<END_HTML>>>"))
+        self._searched = len(self.text)
+        closed = []
+        for key, end_marker in self._END_MARKERS.items():
+            if key in self.finished:
+                continue
+            end = self.text.find(end_marker, start)
+            if end == -1:
+                continue
+            begin = self.text.rfind(self._OPEN_MARKERS[key], 0, end)
+            content = self.text[begin + len(self._OPEN_MARKERS[key]):end] if begin != -1 else ""
+            self.finished[key] = content.strip()
+            closed.append((key, self.finished[key]))
+        return closed
+
+
+def _chunk_usage(chunk: Any) -> None:
+    # Groq reports usage on the final chunk, under the x_groq extension field
+    x_groq = getattr(chunk, "x_groq", None)
+    if x_groq is not None:
+        record_usage(getattr(x_groq, "usage", None))
+
+
+def _stream_completion(request: dict, on_block: Callable[[str, str], bool] | None) -> tuple[str, bool]:
+    """
+    Stream a chat completion, handing each finished block to ``on_block``.
+
+    ``on_block`` returns True to cancel: the HTTP stream is closed at once so
+    no further tokens are generated or billed. Returns (raw_text, aborted).
+    """
+    parser = _SectionParser()
+    started = time.perf_counter()
+    client = _BACKEND.client()
+    stream = _SCHEDULER.call(
+        lambda timeout: client.chat.completions.create(stream=True, timeout=timeout, **request)
+    )
+    try:
+        for chunk in stream:
+            if started:
+                annotate(ttfb_ms=round((time.perf_counter() - started) * 1000, 1))
+                started = 0.0
+            _chunk_usage(chunk)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            for key, content in parser.feed(delta):
+                if on_block is not None and on_block(key, content):
+                    return parser.text, True
+    finally:
+        stream.close()
+    return parser.text, False
+
+
+async def _astream_completion(
+    client: Any,
+    request: dict,
+    on_block: Callable[[str, str], bool] | None,
+) -> tuple[str, bool]:
+    """Async counterpart of _stream_completion."""
+    parser = _SectionParser()
+    started = time.perf_counter()
+    stream = await _SCHEDULER.acall(
+        lambda timeout: client.chat.completions.create(stream=True, timeout=timeout, **request)
+    )
+    try:
+        async for chunk in stream:
+            if started:
+                annotate(ttfb_ms=round((time.perf_counter() - started) * 1000, 1))
+                started = 0.0
+            _chunk_usage(chunk)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            for key, content in parser.feed(delta):
+                if on_block is not None and on_block(key, content):
+                    return parser.text, True
+    finally:
+        await stream.close()
+    return parser.text, False
+
+
+# Repairing only TS/HTML needs the palette (inline styles), not the scale tokens
+_REPAIR_SECTIONS = {"ts": ("colors",), "html": ("colors",), "scss": PROMPT_SECTIONS}
+
+
+def _prompt_sections(repair_blocks: dict[str, str] | None) -> tuple:
+    if not repair_blocks:
+        return PROMPT_SECTIONS
+    wanted = {s for key in repair_blocks for s in _REPAIR_SECTIONS.get(key, PROMPT_SECTIONS)}
+    return tuple(s for s in PROMPT_SECTIONS if s in wanted)
+
+
+def _history_turns(messages: list[dict]) -> list[list[dict]]:
+    """``messages`` split into turns: each user message with the replies that follow it."""
+    turns: list[list[dict]] = []
+    for message in messages:
+        if message.get("role") == "user" or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+
+def _fit_budget(design_system: DesignSystem, sections: tuple, messages: list[dict]) -> tuple[str, list[dict], int]:
+    """(system prompt, messages, estimated tokens) within _PROMPT_BUDGET; see the module docstring."""
+    system_prompt, system_tokens = design_system.prompt_for(sections)
+    total = count_message_tokens([{"content": system_prompt}] + messages)
+    budget = _PROMPT_BUDGET
+    if budget is None or total <= budget:
+        return system_prompt, messages, total
+
+    for optional in OPTIONAL_SECTIONS:
+        if total <= budget:
+            break
+        if optional in sections:
+            sections = tuple(s for s in sections if s != optional)
+            system_prompt, trimmed = design_system.prompt_for(sections)
+            total -= system_tokens - trimmed
+            system_tokens = trimmed
+    if total > budget and len(messages) > 1:
+        # Whole turns, oldest first, so no reply is left without its request
+        turns = _history_turns(messages[:-1])
+        droppable = [i for i, turn in enumerate(turns) if not is_summary(turn[0])]
+        dropped = set()
+        for i in droppable:
+            if total <= budget:
+                break
+            total -= count_message_tokens(turns[i])
+            dropped.add(i)
+        messages = [m for i, turn in enumerate(turns) if i not in dropped for m in turn] + messages[-1:]
+    if total > budget:
+        raise PromptBudgetError(
+            "Prompt needs ~" + str(total) + " tokens, over the budget of " + str(budget) +
+            " (system prompt ~" + str(system_tokens) + "). Shorten the request or raise the budget."
+        )
+    annotate(prompt_trimmed=True)
+    return system_prompt, messages, total
+
+
+def _build_request(
+    user_description: str,
+    design_system_path: str | Path,
+    previous_errors: list[str] | None,
+    temperature: float,
+    conversation_history: list[dict] | None,
+    repair_blocks: dict[str, str] | None = None,
+) -> dict:
+    with span("design_system.load"):
+        design_system = load_design_system(design_system_path)
+    with span("prompt.build") as build:
+        user_prompt = _build_user_prompt(
+            user_description, design_system.data, previous_errors, repair_blocks,
+        )
+
+        # Build messages: history + current user turn
+        messages = list(conversation_history) if conversation_history else []
+        messages.append({"role": "user", "content": user_prompt})
+        system_prompt, messages, tokens = _fit_budget(design_system, _prompt_sections(repair_blocks), messages)
+        build.set(prompt_tokens_est=tokens)
+
+    return {
+        "model": _MODEL_NAME,
+        "temperature": temperature,
+        "max_tokens": 4096,
+        "messages": [{"role": "system", "content": system_prompt}] + messages,
     }
-    blocks: dict[str, str] = {}
-    for key, pattern in patterns.items():
-        match = re.search(pattern, raw, re.DOTALL)
-        blocks[key] = match.group(1).strip() if match else ""
+
+
+def _announce(previous_errors: list[str] | None, stream: bool, verbose: bool,
+              repair_blocks: dict[str, str] | None = None, request: dict | None = None) -> None:
+    if not verbose:
+        return
+    if repair_blocks:
+        mode = " (repair mode: " + ", ".join(_BLOCK_TAGS[k] for k in repair_blocks) + ")"
+    elif previous_errors:
+        mode = " (self-correction mode)"
+    else:
+        mode = ""
+    print(
+        f"\n{'='*60}\n"
+        f"[Generator] Calling Groq ({_MODEL_NAME})"
+        f"{mode}"
+        f"{' [streaming]' if stream else ''}"
+        f"{' ~' + str(count_message_tokens(request['messages'])) + ' prompt tokens' if request else ''}...\n"
+        f"{'='*60}"
+    )
+
+
+def _prompt_tokens(request: dict, response: Any = None) -> int:
+    """Prompt tokens billed for ``response`` when reported, else an estimate."""
+    usage = getattr(response, "usage", None)
+    reported = getattr(usage, "prompt_tokens", None)
+    return reported if reported else count_message_tokens(request["messages"])
+
+
+def _completion_tokens(raw: str, response: Any = None) -> int:
+    """Completion tokens reported for ``response``, else estimated from the text (streams)."""
+    reported = getattr(getattr(response, "usage", None), "completion_tokens", None)
+    return reported if reported else estimate_tokens(raw)
+
+
+def _system_hash(request: dict) -> str:
+    """Short hash of the system prompt, identifying the prompt variant a result came from."""
+    return hashlib.sha256(request["messages"][0]["content"].encode("utf-8")).hexdigest()[:16]
+
+
+def _to_blocks(raw: str, stream: bool, aborted: bool, request: dict, response: Any = None) -> dict[str, Any]:
+    blocks: dict[str, Any] = parse_code_blocks(raw)
+    blocks["raw_response"] = raw
+    blocks["prompt_tokens"] = _prompt_tokens(request, response)
+    blocks["completion_tokens"] = _completion_tokens(raw, response)
+    blocks["system_hash"] = _system_hash(request)
+    if stream:
+        blocks["aborted"] = aborted
+    return blocks
+
+
+def _cached_blocks(request: dict, stream: bool, verbose: bool,
+                  retry: bool = False) -> tuple[str | None, dict | None]:
+    """Return (cache key, blocks on a hit); no key for a ``retry``. No network I/O on a hit."""
+    if _RESPONSE_CACHE is None or not _BACKEND.cacheable or retry:
+        return None, None
+    key = ResponseCache.key(request)
+    hit = _RESPONSE_CACHE.get(key)
+    if hit is None:
+        return key, None
+    if verbose:
+        print("\n[Generator] Cache hit " + key[:12] + " — skipping Groq call.")
+    blocks: dict[str, Any] = dict(hit["blocks"])
+    blocks["raw_response"] = hit["raw_response"]
+    blocks["cached"] = True
+    blocks["prompt_tokens"] = 0
+    blocks["completion_tokens"] = 0
+    blocks["system_hash"] = _system_hash(request)
+    if stream:
+        blocks["aborted"] = False
+    return key, blocks
+
+
+def _replay(blocks: dict, on_block: Callable[[str, str], bool] | None) -> dict:
+    """Feed a cached hit's blocks to a stream's ``on_block``, as a live stream would."""
+    if on_block is None:
+        return blocks
+    for key in ("ts", "html", "scss"):
+        if blocks.get(key) and on_block(key, blocks[key]):
+            blocks["aborted"] = True
+            break
     return blocks
 
 
+def _store_blocks(key: str | None, blocks: dict) -> None:
+    # Cancelled streams are partial and must never be served as a hit
+    if key is None or _RESPONSE_CACHE is None or blocks.get("aborted"):
+        return
+    _RESPONSE_CACHE.put(key, blocks["raw_response"], {k: blocks[k] for k in ("ts", "html", "scss")})
+
+
 def generate_component(
     user_description: str,
     design_system_path: str | Path = "design_system.json",
     previous_errors: list[str] | None = None,
     temperature: float = 0.2,
     conversation_history: list[dict] | None = None,
+    stream: bool = False,
+    on_block: Callable[[str, str], bool] | None = None,
+    verbose: bool = True,
+    repair_blocks: dict[str, str] | None = None,
 ) -> dict[str, Any]:
     """
-    Call Groq and return a dict with keys: ts, html, scss, raw_response.
+    Call Groq and return a dict with keys: ts, html, scss, raw_response,
+    prompt_tokens and completion_tokens (as reported by Groq, else
+    estimated), system_hash (of the system prompt sent). A response-cache hit
+    (first attempts only) returns the stored result (plus ``cached``: True, token counts 0)
+    without any network call; when streaming, its blocks still go through
+    ``on_block``.
 
     Parameters
     ----------
@@ -118,30 +514,96 @@ def generate_component(
     previous_errors     : Validation errors from a previous iteration.
     temperature         : Sampling temperature.
     conversation_history: Prior turns for multi-turn editing support.
+    stream              : Stream the response and parse blocks as they close.
+                          The result then also carries an ``aborted`` flag.
+    on_block            : Streaming only. Called as on_block(key, content) for
+                          each finished block; return True to cancel the stream.
+    verbose             : Print the call banner.
+    repair_blocks       : Repair mode. The failing blocks (key -> current
+                          code); only these are sent, with previous_errors,
+                          and only these are asked for back. Blocks the model
+                          does not return come back as "".
     """
-    design_system = _load_design_system(design_system_path)
-    system_prompt = _build_system_prompt(design_system)
-    user_prompt = _build_user_prompt(user_description, design_system, previous_errors)
-
-    print(
-        f"\n{'='*60}\n"
-        f"[Generator] Calling Groq ({_MODEL_NAME})"
-        f"{' (self-correction mode)' if previous_errors else ''}...\n"
-        f"{'='*60}"
+    request = _build_request(
+        user_description, design_system_path, previous_errors, temperature, conversation_history,
+        repair_blocks,
     )
+    with span("cache.lookup"):
+        cache_key, cached = _cached_blocks(request, stream, verbose, bool(previous_errors or repair_blocks))
+    if cached is not None:
+        annotate(cached=True)
+        return _replay(cached, on_block if stream else None)
+    _announce(previous_errors, stream, verbose, repair_blocks, request)
+
+    aborted = False
+    response = None
+    with span("llm", model=_MODEL_NAME, temperature=temperature, stream=stream) as llm:
+        if stream:
+            raw, aborted = _stream_completion(request, on_block)
+            llm.set(aborted=aborted)
+        else:
+            client = _BACKEND.client()
+            response = _SCHEDULER.call(
+                lambda timeout: client.chat.completions.create(timeout=timeout, **request)
+            )
+            raw = response.choices[0].message.content
+            record_usage(getattr(response, "usage", None))
+    with span("parse"):
+        blocks = _to_blocks(raw, stream, aborted, request, response)
+    _store_blocks(cache_key, blocks)
+    return blocks
 
-    # Build messages: history + current user turn
-    messages = list(conversation_history) if conversation_history else []
-    messages.append({"role": "user", "content": user_prompt})
 
-    response = _CLIENT.chat.completions.create(
-        model=_MODEL_NAME,
-        temperature=temperature,
-        max_tokens=4096,
-        messages=[{"role": "system", "content": system_prompt}] + messages,
+async def agenerate_component(
+    user_description: str,
+    design_system_path: str | Path = "design_system.json",
+    previous_errors: list[str] | None = None,
+    temperature: float = 0.2,
+    conversation_history: list[dict] | None = None,
+    stream: bool = False,
+    on_block: Callable[[str, str], bool] | None = None,
+    verbose: bool = True,
+    repair_blocks: dict[str, str] | None = None,
+) -> dict[str, Any]:
+    """
+    Async generate_component. Same parameters and result.
+
+    Requests share one pooled connection set per event loop; at most
+    set_max_concurrency() of them are in flight, the rest wait their turn.
+    """
+    request = _build_request(
+        user_description, design_system_path, previous_errors, temperature, conversation_history,
+        repair_blocks,
     )
+    # SQLite calls block; keep them off the event loop
+    with span("cache.lookup"):
+        cache_key, cached = await asyncio.to_thread(
+            _cached_blocks, request, stream, verbose, bool(previous_errors or repair_blocks),
+        )
+    if cached is not None:
+        annotate(cached=True)
+        return _replay(cached, on_block if stream else None)
+    pool = _async_pool()
 
-    raw = response.choices[0].message.content
-    blocks = parse_code_blocks(raw)
-    blocks["raw_response"] = raw
-    return blocks
\ No newline at end of file
+    aborted = False
+    response = None
+    with span("llm.queue"):
+        await pool.gate.acquire()
+    try:
+        _announce(previous_errors, stream, verbose, repair_blocks, request)
+        with span("llm", model=_MODEL_NAME, temperature=temperature, stream=stream) as llm:
+            if stream:
+                raw, aborted = await _astream_completion(pool.client, request, on_block)
+                llm.set(aborted=aborted)
+            else:
+                response = await _SCHEDULER.acall(
+                    lambda timeout: pool.client.chat.completions.create(timeout=timeout, **request)
+                )
+                raw = response.choices[0].message.content
+                record_usage(getattr(response, "usage", None))
+    finally:
+        pool.gate.release()
+    with span("parse"):
+        blocks = _to_blocks(raw, stream, aborted, request, response)
+    await asyncio.to_thread(_store_blocks, cache_key, blocks)
+    return blocks
@@ -0,0 +1,78 @@
+"""
+history.py
+----------
+Conversation-history compaction for multi-turn editing.
+
+Instead of resending every prior prompt and every full assistant response,
+a follow-up carries two messages: a numbered summary of the edit requests
+so far, and the latest component state. Older request lines are dropped or
+clipped until the pair fits within the token budget. The component itself
+is never truncated because the model needs it to apply the edit.
+
+Token counts are the estimates from tokencount.py.
+
+Public API:
+  compact_history(history, budget)  -> list[dict]
+  is_summary(message)               -> bool
+"""
+
+from __future__ import annotations
+
+from tokencount import MESSAGE_OVERHEAD, estimate_tokens
+
+
+DEFAULT_HISTORY_BUDGET = 3000
+_REQUEST_CLIP = 160       # characters kept from each summarized request
+_SUMMARY_HEADER = "Edit requests so far (oldest first); the current component follows."
+
+
+def _clip(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= _REQUEST_CLIP else text[:_REQUEST_CLIP - 1] + "…"
+
+
+def compact_history(
+    history: list[dict] | None,
+    budget: int = DEFAULT_HISTORY_BUDGET,
+) -> list[dict]:
+    """
+    Collapse ``history`` (alternating user/assistant messages) to a summary
+    of the user's requests plus the most recent assistant response.
+
+    Request lines are kept newest first until ``budget`` tokens are used.
+    Lines that do not fit are counted in an "earlier request(s) omitted"
+    note. Returns [] when there is no assistant response yet.
+    """
+    if not history:
+        return []
+    latest = next((m["content"] for m in reversed(history)
+                   if m.get("role") == "assistant" and m.get("content")), "")
+    if not latest:
+        return []
+    requests = [_clip(m["content"]) for m in history if m.get("role") == "user" and m.get("content")]
+
+    remaining = budget - estimate_tokens(latest) - estimate_tokens(_SUMMARY_HEADER) - 2 * MESSAGE_OVERHEAD
+    kept: list[str] = []
+    for number in range(len(requests), 0, -1):
+        line = str(number) + ". " + requests[number - 1]
+        cost = estimate_tokens(line) + 1
+        if cost > remaining and kept:
+            break
+        kept.append(line)       # the latest request is always kept
+        remaining -= cost
+    kept.reverse()
+
+    omitted = len(requests) - len(kept)
+    lines = [_SUMMARY_HEADER]
+    if omitted:
+        lines.append("(" + str(omitted) + " earlier request(s) omitted)")
+    lines.extend(kept)
+    return [
+        {"role": "user", "content": "\n".join(lines)},
+        {"role": "assistant", "content": latest},
+    ]
+
+
+def is_summary(message: dict) -> bool:
+    """True for the request-summary message compact_history() puts first."""
+    return message.get("role") == "user" and (message.get("content") or "").startswith(_SUMMARY_HEADER)
@@ -4,84 +4,176 @@ main.py -- CLI entry point for Guided Component Architect
 Usage:
   python main.py "A login card with glassmorphism"
   python main.py "A navbar" --export-tsx
+  python main.py --export-tsx          # latest component already on disk, no API key
+  python main.py --export-dir output/  # every component in a directory
   python main.py --interactive
   python main.py --demo
+  python main.py "A navbar" --stream
+  python main.py --batch prompts.jsonl --concurrency 8
+  python main.py --serve --port 8765
+  python main.py --list
+  python main.py --stats --since 7
+  python main.py --validate-dir output/ --fix --report lint.json
 """
 
 from __future__ import annotations
 
 import argparse
+import contextlib
+import json
 import os
 import sys
+import time
 from pathlib import Path
 
+from history import DEFAULT_HISTORY_BUDGET, compact_history
+from tracing import FORMATS, tracing
+
 
 def export_as_tsx(output_dir: str, slug: str = None) -> list:
-    out = Path(output_dir)
-
-    if slug:
-        ts_files   = list(out.glob(slug + ".component.ts"))
-        html_files = list(out.glob(slug + ".component.html"))
-        scss_files = list(out.glob(slug + ".component.scss"))
-    else:
-        ts_files   = sorted(out.glob("*.component.ts"),   key=lambda f: f.stat().st_mtime, reverse=True)
-        html_files = sorted(out.glob("*.component.html"), key=lambda f: f.stat().st_mtime, reverse=True)
-        scss_files = sorted(out.glob("*.component.scss"), key=lambda f: f.stat().st_mtime, reverse=True)
-
-    if not ts_files:
+    """Export ``slug`` (default: the latest component) as .tsx + CSS module; returns the paths."""
+    from tsx_export import export_component
+
+    try:
+        paths = export_component(output_dir, slug)
+    except ValueError as e:
+        print("❌ TSX export failed: " + str(e))
+        return []
+    if not paths:
         print("No .component.ts found in output dir.")
         return []
+    print("\n📦 TSX exported → " + str(paths[0]) + " (+ " + paths[1].name + ")")
+    return [str(path) for path in paths]
+
+
+def run_export_dir(output_dir: str) -> list:
+    """Export every component in ``output_dir`` in one pass."""
+    from tsx_export import export_dir
+
+    def skipped(slug: str, e: ValueError) -> None:
+        print("❌ Export failed for " + slug + ": " + str(e))
+
+    start = time.perf_counter()
+    paths = export_dir(output_dir, on_error=skipped)
+    print("📦 Exported " + str(len(paths) // 2) + " component(s) as .tsx + .module.scss in " +
+          str(round((time.perf_counter() - start) * 1000)) + "ms → " + output_dir)
+    return [str(path) for path in paths]
+
+
+def list_components(output_dir: str = "output", limit: int | None = None) -> list:
+    """Print the components recorded in the output manifest, newest first."""
+    import manifest
+
+    rows = manifest.entries(output_dir)
+    if not rows:
+        print("No components recorded in " + str(manifest.manifest_path(output_dir)))
+        return []
+    shown = rows[:limit] if limit else rows
+    print("\n" + "=" * 60)
+    print("  Components in " + output_dir + "/ (" + str(len(rows)) + ")")
+    print("=" * 60)
+    for entry in shown:
+        if entry.get("passed") is None:
+            icon = "·"
+        else:
+            icon = "✅" if entry["passed"] else "❌ " + str(entry.get("errors", "?"))
+        stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["timestamp"]))
+        print("  " + stamp + "  " + entry["slug"].ljust(45) + " " + icon)
+    if len(shown) < len(rows):
+        print("  ... " + str(len(rows) - len(shown)) + " more")
+    return shown
+
+
+def show_stats(since_days: float | None = None) -> dict:
+    """Print latency, iteration and error statistics from the run history."""
+    from runstore import RunStore
+
+    store = RunStore()
+    stats = store.stats(since=time.time() - since_days * 86400 if since_days else None)
+    store.close()
+    print("\n" + "=" * 60)
+    print("  Run history: " + str(store.path) +
+          (" (last " + format(since_days, "g") + " days)" if since_days else ""))
+    print("=" * 60)
+    if not stats["runs"]:
+        print("  No runs recorded yet.")
+        return stats
+
+    def secs(value):
+        return "-" if value is None else str(round(value, 3)) + "s"
+
+    print("  Runs        : " + str(stats["runs"]) + " (" + str(stats["passed"]) + " passed, " +
+          str(round(stats["pass_rate"] * 100)) + "%; " + str(stats["cached_runs"]) + " from cache)")
+    print("  Latency     : p50 " + secs(stats["latency_p50"]) + " | p95 " + secs(stats["latency_p95"]))
+    print("  LLM call    : p50 " + secs(stats["llm_p50"]) + " | p95 " + secs(stats["llm_p95"]))
+    if stats["avg_iterations_to_pass"] is not None:
+        spread = ", ".join(str(n) + "×" + str(k) for k, n in stats["passed_at_iteration"].items())
+        print("  To pass     : " + str(round(stats["avg_iterations_to_pass"], 2)) +
+              " iterations on average (runs × iterations: " + spread + ")")
+    print("  Tokens/run  : " + str(round(stats["avg_prompt_tokens"] or 0)) + " prompt, " +
+          str(round(stats["avg_completion_tokens"] or 0)) + " completion")
+    if stats["top_errors"]:
+        print("-" * 60)
+        print("  Most common validator errors (count / runs):")
+        for error in stats["top_errors"]:
+            print("  " + str(error["count"]).rjust(5) + " / " + str(error["runs"]).ljust(5) + error["kind"])
+    print("=" * 60)
+    return stats
+
+
+def run_validate_dir(output_dir: str, fix: bool = False, report_path: str | None = None,
+                     workers: int | None = None) -> int:
+    """Re-lint a whole output directory. Returns the exit code (1 if anything still fails)."""
+    from relint import relint_dir, write_report
+
+    report = relint_dir(output_dir, fix=fix, workers=workers)
+    if report_path:
+        write_report(report, report_path)
+    if report_path == "-":
+        return 0 if report["summary"]["failed"] == 0 else 1
+
+    summary = report["summary"]
+    print("\n" + "=" * 60)
+    print("  Re-lint: " + output_dir + "/")
+    print("=" * 60)
+    for component in report["components"]:
+        if component["fixes"]:
+            print("  🔧 " + component["slug"] + " — " + str(len(component["fixes"])) + " fix(es)")
+        if not component["passed"]:
+            print("  ❌ " + component["slug"])
+            for e in component["errors"]:
+                print("    ✖ " + e)
+    print("-" * 60)
+    print("  Components : " + str(summary["components"]) + " (" + str(summary["cached"]) + " unchanged)")
+    print("  Passed     : " + str(summary["passed"]))
+    print("  Failed     : " + str(summary["failed"]))
+    if fix:
+        print("  Fixed      : " + str(summary["fixed"]))
+    print("  Elapsed    : " + str(summary["elapsed"]) + "s")
+    if report_path:
+        print("  Report     → " + report_path)
+    print("=" * 60)
+    return 0 if summary["failed"] == 0 else 1
+
 
-    ts_content   = ts_files[0].read_text(encoding="utf-8")
-    html_content = html_files[0].read_text(encoding="utf-8") if html_files else ""
-    scss_content = scss_files[0].read_text(encoding="utf-8") if scss_files else ""
-    escaped_html = html_content.replace("`", "\\`")
-
-    lines = [
-        "// AUTO-EXPORTED by Guided Component Architect",
-        'import React from "react";',
-        "",
-        "// Original TypeScript Logic",
-        "/*",
-        ts_content,
-        "*/",
-        "",
-        "// Styles (original SCSS)",
-        "const styles = `",
-        scss_content,
-        "`;",
-        "",
-        "export default function ComponentPreview() {",
-        "  return (",
-        "    <>",
-        '      <style dangerouslySetInnerHTML={{ __html: styles }} />',
-        "      <div",
-        '        className="preview-wrapper"',
-        "        dangerouslySetInnerHTML={{",
-        "          __html: `" + escaped_html + "`,",
-        "        }}",
-        "      />",
-        "    </>",
-        "  );",
-        "}",
-    ]
-
-    stem = ts_files[0].stem.replace(".component", "")
-    tsx_path = out / (stem + ".tsx")
-    tsx_path.write_text("\n".join(lines), encoding="utf-8")
-    print("\n📦 TSX exported →", tsx_path)
-    return [str(tsx_path)]
-
-
-def run_single(prompt: str, output_dir: str = "output", export_tsx: bool = False):
+def run_single(prompt: str, output_dir: str = "output", export_tsx: bool = False, **agent_opts):
     from agent import run_agent
-    result = run_agent(prompt, output_dir=output_dir)
+    result = run_agent(prompt, output_dir=output_dir, **agent_opts)
     if export_tsx:
         export_as_tsx(output_dir, result.get("slug"))
     return result
 
 
-def run_interactive(output_dir: str = "output"):
+def _component_state(result: dict) -> str:
+    """The component as written to disk, in the generator's block format."""
+    from generator import format_code_blocks
+
+    blocks = result.get("blocks") or {}
+    return format_code_blocks(blocks) if blocks.get("ts") else result.get("raw_response", "")
+
+
+def run_interactive(output_dir: str = "output", history_budget: int = DEFAULT_HISTORY_BUDGET,
+                    **agent_opts):
     from agent import run_agent
 
     print("\n" + "=" * 60)
@@ -126,15 +218,17 @@ def run_interactive(output_dir: str = "output"):
 
         # Pass component_slug=None on first turn (derive from prompt)
         # Pass component_slug=current_slug on follow-ups (reuse same filename)
+        # Follow-ups carry the latest component plus a summary of earlier requests
         result = run_agent(
             user_input,
             output_dir=output_dir,
-            conversation_history=conversation_history,
+            conversation_history=compact_history(conversation_history, history_budget),
             component_slug=current_slug,   # None on first, slug on follow-ups
+            **agent_opts,
         )
 
         conversation_history.append({"role": "user", "content": user_input})
-        conversation_history.append({"role": "assistant", "content": result.get("raw_response", "")})
+        conversation_history.append({"role": "assistant", "content": _component_state(result)})
         last_raw_output = result.get("raw_response", "")
 
         # Lock in the slug after first generation
@@ -143,11 +237,13 @@ def run_interactive(output_dir: str = "output"):
             is_first = False
 
         status = "✅ SUCCESS" if result.get("passed") else "⚠  ERRORS: " + str(result.get("errors", 0))
-        print("\n  " + status + " | Iterations: " + str(result.get("iterations", 1)))
+        print("\n  " + status + " | Iterations: " + str(result.get("iterations", 1)) +
+              " | Tokens sent: " + str(result.get("tokens_sent", 0)))
         print("  Follow-up to refine | 'export' for .tsx | 'reset' for new component\n")
 
 
-def run_demo(output_dir: str = "output"):
+def run_demo(output_dir: str = "output", history_budget: int = DEFAULT_HISTORY_BUDGET,
+             **agent_opts):
     from agent import run_agent
 
     print("\n" + "=" * 60)
@@ -161,17 +257,19 @@ def run_demo(output_dir: str = "output"):
         "A login card with glassmorphism effect, email and password inputs, and a sign-in button",
         output_dir=output_dir,
         conversation_history=conversation_history,
+        **agent_opts,
     )
     slug = result1.get("slug")
     conversation_history.append({"role": "user", "content": "A login card with glassmorphism effect"})
-    conversation_history.append({"role": "assistant", "content": result1.get("raw_response", "")})
+    conversation_history.append({"role": "assistant", "content": _component_state(result1)})
 
     # Step 2: follow-up (reuse slug)
     result2 = run_agent(
         "Now make the sign-in button fully rounded with a gradient from primary to primary-dark",
         output_dir=output_dir,
-        conversation_history=conversation_history,
+        conversation_history=compact_history(conversation_history, history_budget),
         component_slug=slug,
+        **agent_opts,
     )
 
     print("\n" + "=" * 60)
@@ -182,30 +280,272 @@ def run_demo(output_dir: str = "output"):
     export_as_tsx(output_dir, slug)
 
 
+def _load_batch_manifest(path: str) -> list[dict]:
+    """One JSON value per line: {"prompt": ..., "slug": optional} or a bare string."""
+    from agent import _slugify
+
+    jobs = []
+    seen: dict[str, int] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, str):
+                entry = {"prompt": entry}
+            if not entry.get("prompt"):
+                raise ValueError(path + ":" + str(line_no) + ": missing 'prompt'")
+            slug = entry.get("slug") or _slugify(entry["prompt"])
+            # Distinct prompts that slugify alike must not overwrite each other
+            seen[slug] = seen.get(slug, 0) + 1
+            if seen[slug] > 1:
+                slug = slug + "-" + str(seen[slug])
+            jobs.append({"prompt": entry["prompt"], "slug": slug})
+    return jobs
+
+
+def _passed_slugs(results_path: Path, output_dir: str) -> set:
+    """Slugs with a passing record in a previous results file and their TS file still on disk."""
+    passed = set()
+    if not results_path.exists():
+        return passed
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue   # a run killed mid-write can leave a torn last line
+            slug = record.get("slug")
+            if record.get("passed") and slug and (Path(output_dir) / (slug + ".component.ts")).exists():
+                passed.add(slug)
+    return passed
+
+
+async def _run_batch_jobs(jobs: list, output_dir: str, concurrency: int, results_path: Path,
+                          **agent_opts) -> list:
+    import asyncio
+
+    from agent import arun_agent
+    from generator import aclose_async_client, set_max_concurrency
+
+    set_max_concurrency(concurrency)
+    gate = asyncio.Semaphore(concurrency)
+    records = []
+    done = 0
+
+    async def run_job(job: dict) -> None:
+        nonlocal done
+        async with gate:
+            start = time.time()
+            try:
+                result = await arun_agent(
+                    job["prompt"],
+                    output_dir=output_dir,
+                    component_slug=job["slug"],
+                    verbose=False,
+                    **agent_opts,
+                )
+                record = {
+                    "prompt": job["prompt"],
+                    "slug": job["slug"],
+                    "passed": result["passed"],
+                    "iterations": result["iterations"],
+                    "elapsed": round(result["elapsed"], 3),
+                    "errors": result["error_list"],
+                    "files": result["files"],
+                }
+            except Exception as exc:   # one failed job must not sink the batch
+                record = {
+                    "prompt": job["prompt"],
+                    "slug": job["slug"],
+                    "passed": False,
+                    "iterations": 0,
+                    "elapsed": round(time.time() - start, 3),
+                    "errors": [type(exc).__name__ + ": " + str(exc)],
+                    "files": {},
+                }
+        record["timestamp"] = time.time()
+        records.append(record)
+        with open(results_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        done += 1
+        icon = "✅" if record["passed"] else "❌"
+        print("  [" + str(done) + "/" + str(len(jobs)) + "] " + icon + " " + record["slug"] +
+              " (" + str(record["iterations"]) + " iter, " + str(record["elapsed"]) + "s)")
+
+    try:
+        await asyncio.gather(*(run_job(job) for job in jobs))
+    finally:
+        await aclose_async_client()
+    return records
+
+
+def run_batch(manifest: str, output_dir: str = "output", concurrency: int = 4,
+              results_path: str | None = None, **agent_opts) -> list:
+    """
+    Run every prompt in a JSONL manifest through arun_agent, ``concurrency`` at a time.
+
+    One record per prompt is appended to ``results_path`` (default
+    <output_dir>/batch_results.jsonl) as soon as it finishes. Prompts whose
+    slug already has a passing record and output on disk are skipped, so an
+    interrupted batch resumes where it stopped.
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    results = Path(results_path) if results_path else Path(output_dir) / "batch_results.jsonl"
+    jobs = _load_batch_manifest(manifest)
+    skip = _passed_slugs(results, output_dir)
+    pending = [job for job in jobs if job["slug"] not in skip]
+
+    print("\n" + "=" * 60)
+    print("  Guided Component Architect -- Batch Mode")
+    print("=" * 60)
+    print("  Manifest    : " + manifest)
+    print("  Prompts     : " + str(len(jobs)) + " (" + str(len(jobs) - len(pending)) + " already passing, skipped)")
+    print("  Concurrency : " + str(concurrency))
+    print("  Results     : " + str(results))
+    print("=" * 60)
+
+    import asyncio
+
+    from generator import llm_stats
+
+    start = time.time()
+    records = asyncio.run(_run_batch_jobs(pending, output_dir, concurrency, results, **agent_opts))
+    passed = sum(1 for r in records if r["passed"])
+
+    print("=" * 60)
+    print("  BATCH COMPLETE | Passed: " + str(passed) + "/" + str(len(records)) +
+          " | Elapsed: " + str(round(time.time() - start, 1)) + "s")
+    stats = llm_stats()
+    if stats["retries"] or stats["throttled_s"] or stats["rejected"]:
+        print("  LLM: " + str(stats["attempts"]) + " attempts, " + str(stats["retries"]) + " retries, " +
+              str(stats["throttled_s"]) + "s rate-limited, circuit " + stats["circuit"])
+    print("=" * 60)
+    return records
+
+
 def main():
     parser = argparse.ArgumentParser(description="Guided Component Architect")
     parser.add_argument("prompt", nargs="?", help="Component description")
     parser.add_argument("--interactive", "-i", action="store_true", help="Multi-turn REPL")
     parser.add_argument("--demo", action="store_true", help="Run built-in demo")
     parser.add_argument("--export-tsx", action="store_true", help="Export as .tsx")
+    parser.add_argument("--export-dir", metavar="DIR",
+                        help="Export every component in DIR as .tsx + .module.scss and exit")
     parser.add_argument("--output-dir", default="output", help="Output directory")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream generations and cancel early on validation errors")
+    parser.add_argument("--repair", action="store_true",
+                        help="Self-correct by resending only the failing block(s)")
+    parser.add_argument("--no-autofix", action="store_true",
+                        help="Never snap off-token colors/radii locally; always ask the LLM")
+    parser.add_argument("--candidates", type=int, default=1, metavar="N",
+                        help="Sample N generations per iteration concurrently; keep the best")
+    parser.add_argument("--history-budget", type=int, default=DEFAULT_HISTORY_BUDGET, metavar="TOKENS",
+                        help="Interactive/demo: token budget for carried-over history (default "
+                             + str(DEFAULT_HISTORY_BUDGET) + ")")
+    parser.add_argument("--prompt-budget", type=int, metavar="TOKENS",
+                        help="Max estimated input tokens per LLM request; 0 for no limit "
+                             "(default 8000, or $COMPONENTFORGE_PROMPT_BUDGET)")
+    parser.add_argument("--batch", metavar="MANIFEST",
+                        help="Generate every prompt in a JSONL manifest")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Batch mode: components generated at once (default 4)")
+    parser.add_argument("--results", metavar="PATH",
+                        help="Batch mode: results JSONL (default <output-dir>/batch_results.jsonl)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always call the LLM; bypass the on-disk response cache")
+    parser.add_argument("--list", action="store_true",
+                        help="List generated components (from the output manifest) and exit")
+    parser.add_argument("--stats", action="store_true",
+                        help="Report latency, iterations to pass and top errors from the run history")
+    parser.add_argument("--since", type=float, metavar="DAYS",
+                        help="With --stats: only runs from the last DAYS days")
+    parser.add_argument("--no-history", action="store_true",
+                        help="Do not record this run in the run history")
+    parser.add_argument("--fake-llm", metavar="RECORDINGS",
+                        help="Offline: replay recorded raw responses (dir of .txt or .jsonl) instead of Groq")
+    parser.add_argument("--fake-latency", type=float, default=0.0, metavar="SECONDS",
+                        help="With --fake-llm: simulated latency per LLM call")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Write a per-phase timing trace of the run to PATH")
+    parser.add_argument("--trace-format", choices=FORMATS, default="jsonl",
+                        help="Trace format: jsonl (default) or chrome (chrome://tracing, Perfetto)")
+    parser.add_argument("--validate-dir", metavar="DIR",
+                        help="Re-lint every component in DIR; exit 1 if any fails")
+    parser.add_argument("--fix", action="store_true",
+                        help="With --validate-dir: snap off-token colors/radii and rewrite files")
+    parser.add_argument("--report", metavar="PATH",
+                        help="With --validate-dir: write the JSON report to PATH ('-' for stdout)")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="With --validate-dir: worker processes (default: CPU count)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run the local HTTP server (generate/validate/stream endpoints)")
+    parser.add_argument("--host", default="127.0.0.1", help="Serve mode: bind address")
+    parser.add_argument("--port", type=int, default=8765, help="Serve mode: port (default 8765)")
 
     args = parser.parse_args()
+    agent_opts = {
+        "stream": args.stream,
+        "repair": args.repair,
+        "autofix": not args.no_autofix,
+        "candidates": max(1, args.candidates),
+    }
+
+    if args.list:
+        list_components(args.output_dir)
+        return
+    if args.stats:
+        show_stats(args.since)
+        return
+    if args.validate_dir:
+        sys.exit(run_validate_dir(args.validate_dir, args.fix, args.report, args.workers))
+    if args.export_dir:
+        run_export_dir(args.export_dir)
+        return
+    generating = args.prompt or args.interactive or args.demo or args.batch or args.serve
+    if args.export_tsx and not generating:
+        export_as_tsx(args.output_dir)
+        return
+    if not generating:
+        parser.print_help()
+        return
 
-    if not os.environ.get("GROQ_API_KEY"):
+    if args.fake_llm:
+        from backends import FakeBackend
+        from generator import set_backend
+        set_backend(FakeBackend.from_path(args.fake_llm, latency=args.fake_latency))
+    elif not os.environ.get("GROQ_API_KEY"):
         print("GROQ_API_KEY not set.")
         print("Get a free key at https://console.groq.com")
         print("Then: set GROQ_API_KEY=your_key_here")
         sys.exit(1)
 
-    if args.demo:
-        run_demo(args.output_dir)
-    elif args.interactive:
-        run_interactive(args.output_dir)
-    elif args.prompt:
-        run_single(args.prompt, output_dir=args.output_dir, export_tsx=args.export_tsx)
-    else:
-        parser.print_help()
+    if args.no_cache:
+        from generator import set_response_cache
+        set_response_cache(None)
+    if args.no_history:
+        from agent import set_run_store
+        set_run_store(None)
+    if args.prompt_budget is not None:
+        from generator import set_prompt_budget
+        set_prompt_budget(args.prompt_budget)
+
+    trace = tracing(args.trace, args.trace_format) if args.trace else contextlib.nullcontext()
+    with trace:
+        if args.serve:
+            from server import serve
+            serve(args.host, args.port, args.output_dir, history_budget=args.history_budget, **agent_opts)
+        elif args.batch:
+            records = run_batch(args.batch, args.output_dir, args.concurrency, args.results, **agent_opts)
+            sys.exit(0 if all(r["passed"] for r in records) else 1)
+        elif args.demo:
+            run_demo(args.output_dir, args.history_budget, **agent_opts)
+        elif args.interactive:
+            run_interactive(args.output_dir, args.history_budget, **agent_opts)
+        elif args.prompt:
+            run_single(args.prompt, output_dir=args.output_dir, export_tsx=args.export_tsx, **agent_opts)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,196 @@
+"""
+manifest.py
+-----------
+Append-only manifest of the components written to an output directory.
+
+Every write of a component appends one JSON line to
+``<output_dir>/.manifest.jsonl``:
+
+  {"slug", "files": {ext: path}, "hashes": {ext: sha256}, "timestamp",
+   "passed", "errors"}
+
+The newest entry wins for a slug. latest() only reads the tail of the file.
+Slug lookups and listings use an in-process index that is updated by
+reading just the bytes appended since the previous call. The directory
+itself is never listed or stat'ed per file.
+
+Public API:
+  record(output_dir, slug, files, hashes, passed, errors) -> dict
+  latest(output_dir)        -> dict | None
+  lookup(output_dir, slug)  -> dict | None
+  entries(output_dir)       -> list[dict]   # newest first, one per slug
+  components(output_dir, exts) -> list[dict]  # {"slug", "files"}, by slug
+  manifest_path(output_dir) -> Path
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+MANIFEST_NAME = ".manifest.jsonl"
+_TAIL_CHUNK = 8192
+
+
+def manifest_path(output_dir: str | Path) -> Path:
+    return Path(output_dir) / MANIFEST_NAME
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+_WRITE_LOCK = threading.Lock()
+
+
+def record(
+    output_dir: str | Path,
+    slug: str,
+    files: dict[str, str],
+    hashes: dict[str, str],
+    passed: bool | None = None,
+    errors: int | None = None,
+) -> dict:
+    """Append one entry. The line goes out in a single O_APPEND write."""
+    entry = {
+        "slug": slug,
+        "files": files,
+        "hashes": hashes,
+        "timestamp": time.time(),
+        "passed": passed,
+        "errors": errors,
+    }
+    line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+    path = manifest_path(output_dir)
+    with _WRITE_LOCK:
+        # O_BINARY: no newline translation on Windows (0 elsewhere)
+        fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size:
+                # lseek + read: Windows has no pread. O_APPEND still sends the write to the end.
+                os.lseek(fd, size - 1, os.SEEK_SET)
+                if os.read(fd, 1) != b"\n":
+                    line = b"\n" + line     # seal off a torn line left by a crash
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    return entry
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _reverse_lines(path: Path):
+    """Yield the file's lines last to first, reading fixed-size chunks from the end."""
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        tail = b""
+        while pos > 0:
+            step = min(_TAIL_CHUNK, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + tail).split(b"\n")
+            tail = lines.pop(0)          # may continue in the previous chunk
+            for line in reversed(lines):
+                if line:
+                    yield line
+        if tail:
+            yield tail
+
+
+def _parse(line: bytes) -> dict | None:
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None                      # torn line from an interrupted write
+    return entry if isinstance(entry, dict) and "slug" in entry else None
+
+
+def latest(output_dir: str | Path) -> dict | None:
+    """Most recently written component, read from the end of the manifest."""
+    path = manifest_path(output_dir)
+    if not path.exists():
+        return None
+    for line in _reverse_lines(path):
+        entry = _parse(line)
+        if entry is not None:
+            return entry
+    return None
+
+
+class _Index:
+    """slug -> newest entry, ordered oldest to newest write, plus the byte offset read so far."""
+
+    def __init__(self) -> None:
+        self.offset = 0
+        self.inode = None
+        self.by_slug: dict[str, dict] = {}
+
+
+_INDEXES: dict[str, _Index] = {}
+_INDEX_LOCK = threading.Lock()
+
+
+def _index(output_dir: str | Path) -> dict[str, dict]:
+    path = manifest_path(output_dir)
+    key = os.path.abspath(path)
+    try:
+        st = os.stat(key)
+    except FileNotFoundError:
+        _INDEXES.pop(key, None)
+        return {}
+    with _INDEX_LOCK:
+        idx = _INDEXES.get(key)
+        if idx is None or idx.inode != st.st_ino or st.st_size < idx.offset:
+            idx = _INDEXES[key] = _Index()   # new or replaced file: start over
+            idx.inode = st.st_ino
+        if st.st_size > idx.offset:
+            with open(key, "rb") as f:
+                f.seek(idx.offset)
+                chunk = f.read(st.st_size - idx.offset)
+            complete = chunk.rfind(b"\n") + 1    # a trailing partial line is read next time
+            for line in chunk[:complete].split(b"\n"):
+                entry = _parse(line) if line else None
+                if entry is not None:
+                    idx.by_slug.pop(entry["slug"], None)
+                    idx.by_slug[entry["slug"]] = entry
+            idx.offset += complete
+        return idx.by_slug
+
+
+def lookup(output_dir: str | Path, slug: str) -> dict | None:
+    """Newest entry for ``slug``, or None if it was never written to this directory."""
+    return _index(output_dir).get(slug)
+
+
+def entries(output_dir: str | Path) -> list[dict]:
+    """Newest entry per slug, most recently written first."""
+    return list(reversed(list(_index(output_dir).values())))
+
+
+def components(output_dir: str | Path, exts=("ts", "html", "scss")) -> list[dict]:
+    """
+    [{"slug", "files": {ext: path}}] sorted by slug: from the manifest, or
+    from ``*.component.<ext>`` file names in a directory written before it.
+    """
+    output_dir = Path(output_dir)
+    found = []
+    if manifest_path(output_dir).exists():
+        for entry in entries(output_dir):
+            files = {k: str(output_dir / Path(p).name) for k, p in entry["files"].items()}
+            found.append({"slug": entry["slug"], "files": files})
+    else:
+        by_slug: dict[str, dict] = {}
+        for path in output_dir.glob("*.component.*"):
+            slug, _, ext = path.name.rpartition(".component.")
+            if ext in exts:
+                by_slug.setdefault(slug, {})[ext] = str(path)
+        found = [{"slug": slug, "files": files} for slug, files in by_slug.items()]
+    found.sort(key=lambda c: c["slug"])
+    return found
@@ -62,6 +62,26 @@ const DESIGN_SYSTEM = {
   },
 };
 
+// When set (e.g. http://127.0.0.1:8765), requests are proxied to a running
+// `python main.py --serve`, which runs the full pipeline: the real design
+// system, validation, auto-fix and self-correction. The direct Groq call
+// below is only the fallback for deployments without that server.
+const COMPONENTFORGE_API_URL = process.env.COMPONENTFORGE_API_URL;
+
+async function proxyToServer(body: Record<string, unknown>) {
+  const res = await fetch(`${COMPONENTFORGE_API_URL!.replace(/\/$/, "")}/generate`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({
+      prompt: body.prompt,
+      conversationHistory: body.conversationHistory ?? [],
+      slug: body.slug,
+    }),
+  });
+  const data = await res.json();
+  return NextResponse.json(data, { status: res.status });
+}
+
 function parseBlocks(raw: string) {
   const extract = (tag: string) => {
     const m = raw.match(new RegExp(`<<<${tag}>>>(.*?)<<<END_${tag}>>>`, "s"));
@@ -72,7 +92,15 @@ function parseBlocks(raw: string) {
 
 export async function POST(req: NextRequest) {
   try {
-    const { prompt, apiKey, conversationHistory = [] } = await req.json();
+    const body = await req.json();
+    const { prompt, apiKey, conversationHistory = [] } = body;
+
+    if (COMPONENTFORGE_API_URL) {
+      if (!prompt) {
+        return NextResponse.json({ error: "prompt is required" }, { status: 400 });
+      }
+      return await proxyToServer(body);
+    }
 
     if (!prompt || !apiKey) {
       return NextResponse.json({ error: "prompt and apiKey are required" }, { status: 400 });
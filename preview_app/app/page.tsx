@@ -173,6 +173,8 @@ export default function Home() {
   const [showKey, setShowKey] = useState(false);
   const [copied, setCopied] = useState("");
   const conversationRef = useRef<Array<{role:string;content:string}>>([]);
+  // Component slug from the first response; follow-ups edit the same files
+  const slugRef = useRef<string|null>(null);
   const textareaRef = useRef<HTMLTextAreaElement>(null);
 
   useEffect(()=>{
@@ -197,10 +199,11 @@ export default function Home() {
     setError("");setLoading(true);
     try{
       const res = await fetch("/api/generate",{method:"POST",headers:{"Content-Type":"application/json"},
-        body:JSON.stringify({prompt:prompt.trim(),apiKey:apiKey.trim(),conversationHistory:conversationRef.current})});
+        body:JSON.stringify({prompt:prompt.trim(),apiKey:apiKey.trim(),conversationHistory:conversationRef.current,slug:slugRef.current??undefined})});
       const data = await res.json();
       if(!res.ok) throw new Error(data.error||"Generation failed");
       const nc: GeneratedComponent={ts:data.ts||"",html:data.html||"",scss:data.scss||"",prompt,timestamp:new Date().toLocaleTimeString()};
+      if(data.slug) slugRef.current=data.slug;
       conversationRef.current=[...conversationRef.current,{role:"user",content:prompt},{role:"assistant",content:data.raw||""}];
       const doc=buildSrcdoc(nc,dark);
       setSrcdoc(doc);setComponent(nc);setHistory(p=>[nc,...p].slice(0,8));
@@ -208,7 +211,7 @@ export default function Home() {
     }catch(e:any){setError(e.message);}finally{setLoading(false);}
   };
 
-  const reset = () => {conversationRef.current=[];setIsFollowUp(false);setComponent(null);setPrompt("");setError("");setSrcdoc("");};
+  const reset = () => {conversationRef.current=[];slugRef.current=null;setIsFollowUp(false);setComponent(null);setPrompt("");setError("");setSrcdoc("");};
 
   const copyCode = (text:string,label:string) => {
     navigator.clipboard.writeText(text);setCopied(label);setTimeout(()=>setCopied(""),2000);
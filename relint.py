@@ -0,0 +1,141 @@
+"""
+relint.py
+---------
+Re-lint a whole output directory (``python main.py --validate-dir DIR``).
+
+Components come from the directory's manifest; for directories written
+before the manifest existed, the *.component.* files are grouped by name.
+Components whose files are unchanged and whose blocks were already checked
+under the current design-system token version are answered from the
+validation memo without reading any file (validator.revalidate_dir, which
+relint drives). The rest are validated across a process pool in chunks.
+With ``fix=True``, off-token colors and radii are snapped by fixer.py and
+written back atomically when that lowers the error count.
+
+Public API:
+  relint_dir(output_dir, design_system_path, fix, workers) -> report dict
+  write_report(report, path)
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+import manifest
+from design_system import load_design_system
+from fixer import fix_blocks
+from fsutil import write_many
+from validator import BLOCK_KEYS, check_files, revalidate_dir, validate_block
+
+
+_CHUNK = 32            # components per worker task
+_MIN_PARALLEL = 64     # below this many components a pool costs more than it saves
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def _errors(outcomes: dict) -> int:
+    return sum(len(o[0]) for o in outcomes.values())
+
+
+def _lint_component(component: dict, design_system_path: str, fix: bool) -> dict:
+    files = component["files"]
+    checked = check_files(files, design_system_path)
+    fixes: list[str] = []
+
+    error_count = _errors(checked["outcomes"])
+    if fix and error_count:
+        contents = checked["contents"]
+        fixed, changes = fix_blocks(contents, design_system_path)
+        if changes:
+            fixed_outcomes = {key: validate_block(key, fixed[key], design_system_path) for key in BLOCK_KEYS}
+            if sum(len(r.errors) for r in fixed_outcomes.values()) < error_count:
+                write_many({Path(files[k]): fixed[k] for k in files if fixed[k] != contents[k]})
+                checked, fixes = check_files(files, design_system_path), changes
+
+    del checked["contents"]
+    return dict(component, fixes=fixes, **checked)
+
+
+def _lint_chunk(args: tuple) -> list[dict]:
+    components, design_system_path, fix = args
+    return [_lint_component(c, design_system_path, fix) for c in components]
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def relint_dir(
+    output_dir: str | Path,
+    design_system_path: str = "design_system.json",
+    fix: bool = False,
+    workers: int | None = None,
+) -> dict:
+    """Validate (and optionally fix) every component in ``output_dir``. Returns the report."""
+    start = time.time()
+    out = Path(output_dir)
+    ds = load_design_system(design_system_path)
+    fixes: dict[str, list[str]] = {}
+    checked = 0
+
+    def lint(pending: list[dict]) -> list[dict]:
+        nonlocal checked
+        chunks = [pending[i:i + _CHUNK] for i in range(0, len(pending), _CHUNK)]
+        tasks = [(chunk, design_system_path, fix) for chunk in chunks]
+        records = []
+        if len(pending) >= _MIN_PARALLEL and (workers is None or workers > 1):
+            from concurrent.futures import ProcessPoolExecutor   # multiprocessing is a heavy import
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for done in pool.map(_lint_chunk, tasks):
+                    records.extend(done)
+        else:
+            for task in tasks:
+                records.extend(_lint_chunk(task))
+        checked = len(records)
+        for record in records:
+            if record["fixes"]:
+                fixes[record["slug"]] = record["fixes"]
+                errors = _errors(record["outcomes"])
+                hashes = {k: record["digests"][k] for k in record["files"]}
+                manifest.record(out, record["slug"], record["files"], hashes, errors == 0, errors)
+        return records
+
+    # A remembered failure still has to be opened when fixes were asked for
+    results = revalidate_dir(out, design_system_path, check=lint, recheck_failures=fix)
+
+    components = [{
+        "slug": slug,
+        "passed": result.passed,
+        "errors": result.errors,
+        "warnings": result.warnings,
+        "fixes": fixes.get(slug, []),
+    } for slug, result in results.items()]
+    failed = sum(not c["passed"] for c in components)
+    return {
+        "output_dir": str(out),
+        "design_system": {"path": ds.path, "version": ds.version, "token_version": ds.token_version},
+        "summary": {
+            "components": len(components),
+            "passed": len(components) - failed,
+            "failed": failed,
+            "fixed": len(fixes),
+            "cached": len(components) - checked,
+            "elapsed": round(time.time() - start, 3),
+        },
+        "components": components,
+    }
+
+
+def write_report(report: dict, path: str) -> None:
+    """JSON report to ``path`` ("-" for stdout)."""
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if path == "-":
+        print(text)
+    else:
+        Path(path).write_text(text + "\n", encoding="utf-8")
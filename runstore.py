@@ -0,0 +1,203 @@
+"""
+runstore.py
+-----------
+Persistent history of agent runs, for tuning MAX_ITERATIONS, the prompt and
+the validator.
+
+Every finished run is appended to a SQLite file (default
+``$COMPONENTFORGE_CACHE_DIR/runs.sqlite3``, next to the response cache):
+
+  runs        one row per run: slug, prompt / system-prompt hashes, options,
+              passed, iterations, elapsed, token usage
+  iterations  one row per iteration: LLM and validation time, error count,
+              auto-fixes, cache hit, token usage
+  errors      every validator error of every iteration, with its ``kind``
+              (the message with values, positions and tags blanked out) so
+              "Unauthorized color '#333'" and "... '#ccc'" count together
+
+stats() answers the tuning questions in a few aggregate queries: latency
+percentiles, iterations needed to pass and the most common errors.
+
+Public API:
+  RunStore(path)
+  RunStore.record(prompt, result, options)  -> int    # run id
+  RunStore.stats(since, top)                -> dict
+  error_kind(message)                       -> str
+  default_store_path()                      -> Path
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+def default_store_path() -> Path:
+    """$COMPONENTFORGE_CACHE_DIR/runs.sqlite3, else ~/.cache/componentforge/."""
+    root = os.environ.get("COMPONENTFORGE_CACHE_DIR") or Path.home() / ".cache" / "componentforge"
+    return Path(root) / "runs.sqlite3"
+
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS runs ("
+    " id INTEGER PRIMARY KEY, started REAL NOT NULL, slug TEXT, prompt_hash TEXT, system_hash TEXT,"
+    " options TEXT, passed INTEGER NOT NULL, iterations INTEGER NOT NULL, elapsed REAL NOT NULL,"
+    " errors INTEGER NOT NULL, prompt_tokens INTEGER, completion_tokens INTEGER, cached INTEGER)",
+    "CREATE TABLE IF NOT EXISTS iterations ("
+    " run_id INTEGER NOT NULL, iteration INTEGER NOT NULL, llm_s REAL, validate_s REAL,"
+    " errors INTEGER, autofixed INTEGER, aborted INTEGER, cached INTEGER,"
+    " prompt_tokens INTEGER, completion_tokens INTEGER, PRIMARY KEY (run_id, iteration))",
+    "CREATE TABLE IF NOT EXISTS errors ("
+    " run_id INTEGER NOT NULL, iteration INTEGER NOT NULL, kind TEXT NOT NULL, message TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS runs_started ON runs(started)",
+    "CREATE INDEX IF NOT EXISTS errors_run ON errors(run_id)",
+)
+
+
+# ---------------------------------------------------------------------------
+# Error kinds
+# ---------------------------------------------------------------------------
+
+_POSITION = re.compile(r"^\[(\w+) \d+:\d+\]")
+_VALUE = re.compile(r"'[^']*[\d#(][^']*'")
+_TAG = re.compile(r"</?[A-Za-z][\w-]*>")
+_NUMBER = re.compile(r"\d+")
+
+
+def error_kind(message: str) -> str:
+    """
+    ``message`` with its specifics removed, for grouping:
+    "[HTML 4:5] <p> is not closed before </div>." -> "[HTML] <x> is not closed before </x>."
+    """
+    kind = _POSITION.sub(r"[\1]", message.split(" — ")[0])
+    kind = _VALUE.sub("'…'", kind)
+    kind = _TAG.sub(lambda m: "</x>" if m.group().startswith("</") else "<x>", kind)
+    return _NUMBER.sub("N", kind)
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile of already sorted ``values``."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+class RunStore:
+    """Append-only SQLite run history. Safe to share between threads; opened on first use."""
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path) if path else default_store_path()
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def record(self, prompt: str, result: dict, options: dict | None = None) -> int:
+        """
+        Append one finished run (a run_agent result dict) in one transaction.
+        ``options`` are the run flags (stream, repair, ...), stored as JSON.
+        """
+        log = result.get("iteration_log", [])
+        run = (
+            time.time() - result["elapsed"], result.get("slug"), _hash(prompt), result.get("system_hash"),
+            json.dumps(options or {}, sort_keys=True), int(result["passed"]), result["iterations"],
+            result["elapsed"], result["errors"], result.get("tokens_sent", 0),
+            result.get("completion_tokens", 0), int(bool(log) and all(it.get("cached") for it in log)),
+        )
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            try:
+                run_id = db.execute(
+                    "INSERT INTO runs (started, slug, prompt_hash, system_hash, options, passed,"
+                    " iterations, elapsed, errors, prompt_tokens, completion_tokens, cached)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", run,
+                ).lastrowid
+                db.executemany(
+                    "INSERT INTO iterations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(run_id, it["iteration"], it["llm_s"], it["validate_s"], len(it["errors"]),
+                      it.get("autofixed", 0), int(it.get("aborted", False)), int(it.get("cached", False)),
+                      it.get("prompt_tokens", 0), it.get("completion_tokens", 0)) for it in log],
+                )
+                db.executemany(
+                    "INSERT INTO errors VALUES (?, ?, ?, ?)",
+                    [(run_id, it["iteration"], error_kind(e), e) for it in log for e in it["errors"]],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return run_id
+
+    def stats(self, since: float | None = None, top: int = 10) -> dict:
+        """
+        Aggregates over runs started at or after ``since`` (epoch seconds).
+
+        Latency percentiles leave out runs answered entirely from the
+        response cache; ``llm_p50``/``llm_p95`` are per LLM call.
+        """
+        since = since or 0.0
+        with self._lock:
+            db = self._db()
+            runs, passed, cached, prompt_tokens, completion_tokens = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(passed), 0), COALESCE(SUM(cached), 0),"
+                " AVG(prompt_tokens), AVG(completion_tokens) FROM runs WHERE started >= ?", (since,),
+            ).fetchone()
+            elapsed = [row[0] for row in db.execute(
+                "SELECT elapsed FROM runs WHERE started >= ? AND NOT cached ORDER BY elapsed", (since,))]
+            llm = [row[0] for row in db.execute(
+                "SELECT i.llm_s FROM iterations i JOIN runs r ON r.id = i.run_id"
+                " WHERE r.started >= ? AND NOT i.cached ORDER BY i.llm_s", (since,))]
+            to_pass = dict(db.execute(
+                "SELECT iterations, COUNT(*) FROM runs WHERE started >= ? AND passed"
+                " GROUP BY iterations ORDER BY iterations", (since,)).fetchall())
+            top_errors = db.execute(
+                "SELECT e.kind, COUNT(*), COUNT(DISTINCT e.run_id) FROM errors e"
+                " JOIN runs r ON r.id = e.run_id WHERE r.started >= ?"
+                " GROUP BY e.kind ORDER BY COUNT(*) DESC, e.kind LIMIT ?", (since, top),
+            ).fetchall()
+        return {
+            "runs": runs,
+            "passed": passed,
+            "pass_rate": passed / runs if runs else None,
+            "cached_runs": cached,
+            "latency_p50": _percentile(elapsed, 0.50),
+            "latency_p95": _percentile(elapsed, 0.95),
+            "llm_p50": _percentile(llm, 0.50),
+            "llm_p95": _percentile(llm, 0.95),
+            "avg_iterations_to_pass": (sum(k * n for k, n in to_pass.items()) / passed) if passed else None,
+            "passed_at_iteration": to_pass,
+            "avg_prompt_tokens": prompt_tokens,
+            "avg_completion_tokens": completion_tokens,
+            "top_errors": [{"kind": kind, "count": count, "runs": n_runs} for kind, count, n_runs in top_errors],
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,472 @@
+"""
+scanner.py
+----------
+Single-pass lexers used by the Linter-Agent.
+
+Each block is walked exactly once by one compiled master pattern whose tokens
+are whole comments, whole string literals, brackets, hex colors and, for
+SCSS, statement terminators together with the declaration that follows
+them. The Python loop only sees those tokens, never individual characters. Everything inside comments is ignored.
+
+Angular templates get their own linear tokenizer (scan_template): elements,
+comments, interpolations and @if/@for/@switch/@defer blocks, reporting every
+problem with its offset instead of stopping at the first.
+
+Public API:
+  scan_typescript(code) -> ScanResult
+  scan_scss(code)       -> ScanResult
+  hex_colors(text)      -> [(offset of '#', digits as written)]   # free text, e.g. HTML
+  scan_template(code)   -> [Problem(offset, message)]
+  template_token(code, pos)          -> Match | None   # for other template walkers
+  block_keyword(code, token)         -> str | None
+  block_header(code, pos, keyword)   -> BlockHeader
+  raw_text_end(code, name, pos)      -> Match | None
+  VOID_ELEMENTS, RAW_TEXT_ELEMENTS, BLOCK_KEYWORDS
+  inline_sources(ts)    -> [("template" | "styles", offset, text)]
+  line_col(code, offset) -> (line, column)
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+
+# ---------------------------------------------------------------------------
+# Data classes
+# ---------------------------------------------------------------------------
+
+class Declaration(NamedTuple):
+    """A ``property: value`` declaration; ``start``/``end`` delimit the stripped value."""
+    prop: str
+    value: str
+    start: int
+    end: int
+
+
+@dataclass
+class ScanResult:
+    colors: list = field(default_factory=list)        # (offset of '#', digits as written)
+    declarations: list = field(default_factory=list)  # Declaration, SCSS only
+    mismatch: tuple | None = None                     # (bracket, offset) of first mismatch
+    unclosed: list = field(default_factory=list)      # opening brackets left on the stack
+
+
+# ---------------------------------------------------------------------------
+# Token tables
+# ---------------------------------------------------------------------------
+
+_PAIRS = {"}": "{", "]": "[", ")": "("}
+_OPEN = frozenset("{[(")
+_QUOTES = frozenset("\"'`")
+
+# Mirrors the historical ``#([0-9a-fA-F]{6}|[0-9a-fA-F]{3})\b`` color pattern.
+_HEX = r"\#(?:[0-9a-fA-F]{6}|[0-9a-fA-F]{3})\b"
+
+# Comments and strings are matched whole, so the master pattern never stops
+# inside them; brackets, hex colors and (SCSS) terminators are single tokens.
+# Every token is recognised by its first character, so dispatch happens on
+# ``tok[0]`` instead of named groups, and a leading first-character lookahead
+# lets the regex engine skip plain text without trying each alternative.
+_LINE_COMMENT = r"//[^\n]*"
+_BLOCK_COMMENT = r"/\*(?:.*?\*/|.*)"
+_STRING = r"\"[^\"\\]*(?:\\.[^\"\\]*)*\"?|'[^'\\]*(?:\\.[^'\\]*)*'?"
+_HEX_RE = re.compile(_HEX)
+
+_TS_TOKENS = re.compile(
+    r"(?=[/\"'`{}\[\]()#])(?:" + _LINE_COMMENT + "|" + _BLOCK_COMMENT + "|" + _STRING +
+    r"|`[^`\\]*(?:\\.[^`\\]*)*`?|[{}\[\]()]|" + _HEX + ")",
+    re.DOTALL,
+)
+
+# SCSS adds ';' as a statement terminator. A terminator (or the start of the
+# text) may be followed by a declaration start, captured in group 1; the
+# optional '$' keeps "$border-radius: ..." matching as it always has, and
+# custom properties ("--gap: ...") are captured with their dashes. '//'
+# right after ':' is a URL scheme (url(http://...)), not a comment.
+_DECL = r"(?:\s*\$?(-{0,2}[A-Za-z_][\w-]*)\s*:)?"
+_SCSS_TOKENS = re.compile(
+    r"(?=[/\"'{}\[\]();#])(?:/(?<!:/)/[^\n]*|" + _BLOCK_COMMENT + "|" + _STRING +
+    r"|[\[\]()]|[{};]" + _DECL + "|" + _HEX + ")",
+    re.DOTALL,
+)
+_SCSS_FIRST_DECL = re.compile(_DECL)
+
+
+# ---------------------------------------------------------------------------
+# Lexer
+# ---------------------------------------------------------------------------
+
+def _scan(code: str, tokens: re.Pattern, declarations: bool) -> ScanResult:
+    result = ScanResult()
+    colors = result.colors
+    decls = result.declarations
+    stack: list = []
+    brackets_live = True      # bracket tracking stops at the first mismatch
+    decl_prop = None          # SCSS: open declaration property ...
+    decl_start = 0            # ... and where its value begins
+    at_statement = False      # SCSS: a declaration may still start here
+    pos = 0
+
+    if declarations:
+        d = _SCSS_FIRST_DECL.match(code)
+        decl_prop = d.group(1)
+        pos = decl_start = d.end()
+        at_statement = decl_prop is None
+
+    for m in tokens.finditer(code, pos):
+        tok = m.group()
+        ch = tok[0]
+
+        if ch == "/":
+            if at_statement and decl_prop is None:
+                # A declaration may follow a comment: "/* note */ color: ..."
+                d = _SCSS_FIRST_DECL.match(code, m.end())
+                if d.group(1) is not None:
+                    decl_prop = d.group(1)
+                    decl_start = d.end()
+            continue
+        at_statement = False
+        if ch == "#":
+            colors.append((m.start(), tok[1:]))
+            continue
+        if ch in _QUOTES:
+            if "#" in tok:
+                base = m.start()
+                for c in _HEX_RE.finditer(tok):
+                    colors.append((base + c.start(), c.group()[1:]))
+            continue
+
+        if ch != ";" and brackets_live:
+            if ch in _OPEN:
+                stack.append(ch)
+            elif not stack or stack[-1] != _PAIRS[ch]:
+                result.mismatch = (ch, m.start())
+                brackets_live = False
+            else:
+                stack.pop()
+
+        if declarations and ch in "{};":
+            # "prop: x {" was a selector such as "a:hover", not a declaration
+            if decl_prop is not None and ch != "{":
+                raw = code[decl_start:m.start()]
+                value = raw.strip()
+                if value:
+                    start = decl_start + len(raw) - len(raw.lstrip())
+                    decls.append(Declaration(decl_prop.lower(), value, start, start + len(value)))
+            decl_prop = m.group(1)
+            decl_start = m.end()
+            at_statement = decl_prop is None
+
+    if decl_prop is not None:
+        raw = code[decl_start:]
+        value = raw.strip()
+        if value:
+            start = decl_start + len(raw) - len(raw.lstrip())
+            decls.append(Declaration(decl_prop.lower(), value, start, start + len(value)))
+    if brackets_live:
+        result.unclosed = stack
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Angular template tokenizer
+# ---------------------------------------------------------------------------
+
+class Problem(NamedTuple):
+    """A template error at ``offset`` (see line_col)."""
+    offset: int
+    message: str
+
+
+VOID_ELEMENTS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+})
+# Contents are plain text up to the matching end tag
+RAW_TEXT_ELEMENTS = frozenset({"script", "style", "textarea", "title"})
+
+# Built-in control flow (@if / @for / @switch / @defer). Keywords not listed
+# here are text (an e-mail address, "@Input" in prose) and are ignored.
+BLOCK_KEYWORDS = frozenset({
+    "if", "else", "for", "empty", "switch", "case", "default",
+    "defer", "placeholder", "loading", "error",
+})
+_DEFER_PARTS = ("defer", "placeholder", "loading", "error")
+_FOLLOWS = {"else": ("if", "else"), "empty": ("for",),
+            "placeholder": _DEFER_PARTS, "loading": _DEFER_PARTS, "error": _DEFER_PARTS}
+_INSIDE = {"case": "switch", "default": "switch"}
+
+# Every token is found by one search from the current position and every
+# sub-pattern only consumes text after it, so the whole template is walked
+# once. Quoted attribute values are consumed whole ('>' inside "a > b" is not
+# a tag end); an unterminated one runs to the end of the text. Nothing after
+# the attribute star can fail ('>?'), so a tag match never backtracks.
+_TEMPLATE_TOKENS = re.compile(
+    r"""<(/?)([A-Za-z][\w:.-]*)((?:[^"'>]+|"[^"]*"?|'[^']*'?)*)(>?)"""   # whole tag
+    r"|<!--|<!|\{\{|@[A-Za-z]+|\}"
+)
+_PARAM_CHUNK = re.compile(r"""[^()"']+|"[^"]*"?|'[^']*'?|[()]""")
+_ELSE_IF = re.compile(r"\s+if\b")
+_SPACE = re.compile(r"\s*")
+_RAW_END = {name: re.compile(r"</" + name + r"\s*>", re.IGNORECASE) for name in RAW_TEXT_ELEMENTS}
+
+
+def _block_params(code: str, pos: int) -> int:
+    """End of the ``(...)`` expression at ``pos`` (nested parens and quotes), or -1 if unclosed."""
+    depth = 0
+    while True:
+        m = _PARAM_CHUNK.match(code, pos)
+        if m is None:
+            return -1
+        tok = m.group()
+        if tok == "(":
+            depth += 1
+        elif tok == ")":
+            depth -= 1
+            if depth == 0:
+                return m.end()
+        pos = m.end()
+
+
+class BlockHeader(NamedTuple):
+    """The ``[if] (params) {`` after a block keyword, as read by block_header."""
+    else_if: bool       # "@else if"
+    params: str         # text inside the parentheses, "" without them
+    body: int           # offset just after the '{' (where it was expected if missing; -1 if '(' is unclosed)
+    missing: str        # "(" for an unclosed '(', "{" for a missing '{', else ""
+
+
+def template_token(code: str, pos: int) -> re.Match | None:
+    """
+    The next template token at or after ``pos``: a whole tag, ``<!--``,
+    ``<!``, ``{{``, ``@word`` or ``}``. For a tag, groups() is
+    (``"/"`` or ``""``, name, attributes, ``">"`` or ``""`` if unterminated);
+    for anything else they are None and group() is the token.
+    """
+    return _TEMPLATE_TOKENS.search(code, pos)
+
+
+def raw_text_end(code: str, name: str, pos: int) -> re.Match | None:
+    """The ``</name>`` ending raw-text element ``name`` (see RAW_TEXT_ELEMENTS), or None."""
+    return _RAW_END[name].search(code, pos)
+
+
+def block_keyword(code: str, token: re.Match) -> str | None:
+    """The control-flow keyword of an ``@word`` token, or None if it is plain text."""
+    keyword, start = token.group()[1:], token.start()
+    if keyword not in BLOCK_KEYWORDS or (start and (code[start - 1].isalnum() or code[start - 1] == "_")):
+        return None
+    return keyword
+
+
+def block_header(code: str, pos: int, keyword: str) -> BlockHeader:
+    """Read the header of block ``@keyword`` from ``pos``, just after the keyword."""
+    else_if = False
+    if keyword == "else":
+        elif_m = _ELSE_IF.match(code, pos)
+        if elif_m is not None:
+            else_if, pos = True, elif_m.end()
+    pos = _SPACE.match(code, pos).end()
+    params = ""
+    if code.startswith("(", pos):
+        params_end = _block_params(code, pos)
+        if params_end == -1:
+            return BlockHeader(else_if, "", -1, "(")
+        params, pos = code[pos + 1:params_end - 1], _SPACE.match(code, params_end).end()
+    if not code.startswith("{", pos):
+        return BlockHeader(else_if, params, pos, "{")
+    return BlockHeader(else_if, params, pos + 1, "")
+
+
+def scan_template(code: str) -> list[Problem]:
+    """
+    Every tag and control-flow error in an Angular template, in one linear pass.
+
+    Tracks elements, comments, interpolations, raw-text elements and
+    ``@if``/``@for``/``@switch``/``@defer`` blocks (with their ``@else``,
+    ``@empty``, ``@case`` ... companions). Scanning continues after a
+    mismatch, so all problems are reported; an unterminated comment, tag,
+    interpolation or raw-text element ends the scan, as it ends the template.
+    """
+    problems: list[Problem] = []
+    stack: list[tuple[str, int]] = []     # ("div", offset) or ("@if", offset)
+    blocks = 0                            # "@" entries on the stack
+    # Open element names per block scope, so a stray </x> is recognised
+    # without walking the stack (which would make nested input quadratic)
+    scopes: list[dict[str, int]] = [{}]
+    last_closed = ("", -1)                # block keyword and the end of its '}'
+    pos, end = 0, len(code)
+
+    while pos < end:
+        m = template_token(code, pos)
+        if m is None:
+            break
+        closing, tag, attrs, gt = m.groups()
+        start = m.start()
+
+        if tag is not None:
+            name = tag.lower()
+            pos = m.end()
+            if closing:
+                if not gt:
+                    problems.append(Problem(start, "Unclosed tag </" + name + "."))
+                    break
+                if name in VOID_ELEMENTS:
+                    continue
+                # An element can only be closed inside the block it was opened in
+                scope = scopes[-1]
+                if scope.get(name):
+                    while True:
+                        open_name, offset = stack.pop()
+                        scope[open_name] -= 1
+                        if open_name == name:
+                            break
+                        problems.append(Problem(offset, "<" + open_name + "> is not closed before </" + name + ">."))
+                else:
+                    expected = stack[-1][0] if stack and stack[-1][0][0] != "@" else None
+                    problems.append(Problem(start, "Unexpected </" + name + "> — expected " +
+                                            ("</" + expected + ">." if expected else "no closing tag here.")))
+                continue
+            if not gt:
+                problems.append(Problem(start, "Unclosed tag <" + name + "> (missing '>' or quote)."))
+                break
+            if name in VOID_ELEMENTS or (attrs and attrs.rstrip().endswith("/")):
+                continue
+            if name in RAW_TEXT_ELEMENTS:
+                raw_end = raw_text_end(code, name, pos)
+                if raw_end is None:
+                    problems.append(Problem(start, "<" + name + "> is never closed."))
+                    break
+                pos = raw_end.end()
+                continue
+            stack.append((name, start))
+            scope = scopes[-1]
+            scope[name] = scope.get(name, 0) + 1
+            continue
+
+        tok = m.group()
+        if tok == "<!--":
+            close = code.find("-->", m.end())
+            if close == -1:
+                problems.append(Problem(start, "Unclosed comment <!--."))
+                break
+            pos = close + 3
+        elif tok == "<!":
+            close = code.find(">", m.end())
+            pos = end if close == -1 else close + 1
+        elif tok == "{{":
+            close = code.find("}}", m.end())
+            if close == -1:
+                problems.append(Problem(start, "Unclosed interpolation {{."))
+                break
+            pos = close + 2
+        elif tok == "}":
+            pos = m.end()
+            if not blocks:
+                continue          # plain text brace outside any block
+            unclosed = []
+            while stack[-1][0][0] != "@":
+                unclosed.append(stack.pop())
+            keyword, _ = stack.pop()
+            scopes.pop()
+            for open_name, offset in unclosed:
+                problems.append(Problem(offset, "<" + open_name + "> is not closed before its " +
+                                        keyword + " block ends."))
+            blocks -= 1
+            last_closed = (keyword[1:], pos)
+        else:
+            keyword = block_keyword(code, m)
+            pos = m.end()
+            if keyword is None:
+                continue
+            follows = _FOLLOWS.get(keyword)
+            if follows is not None and not (
+                last_closed[0] in follows and not code[last_closed[1]:start].strip()
+            ):
+                problems.append(Problem(start, "@" + keyword + " must directly follow an @" +
+                                        " / @".join(follows) + " block."))
+            parent = _INSIDE.get(keyword)
+            if parent is not None and not (blocks and stack[-1][0] == "@" + parent):
+                problems.append(Problem(start, "@" + keyword + " is only allowed directly inside @" + parent + "."))
+            header = block_header(code, pos, keyword)
+            if header.missing == "(":
+                problems.append(Problem(start, "Unclosed '(' in @" + keyword + "."))
+                break
+            pos = header.body
+            if header.missing == "{":
+                problems.append(Problem(start, "@" + keyword + " is missing its '{'."))
+                continue
+            stack.append(("@" + keyword, start))
+            scopes.append({})
+            blocks += 1
+
+    for name, offset in stack:
+        if name[0] == "@":
+            problems.append(Problem(offset, name + " block is never closed ('}' missing)."))
+        else:
+            problems.append(Problem(offset, "<" + name + "> is never closed."))
+    problems.sort()
+    return problems
+
+
+def line_col(code: str, offset: int) -> tuple[int, int]:
+    """1-based (line, column) of ``offset`` in ``code``."""
+    line_start = code.rfind("\n", 0, offset) + 1
+    return code.count("\n", 0, offset) + 1, offset - line_start + 1
+
+
+# Inline ``template:`` / ``styles:`` string literals of a @Component
+# (a leading \b would defeat the regex engine's literal prefix scan, so the
+# word boundary is checked by hand)
+_INLINE_KEY = re.compile(r"(template|styles)\s*:\s*")
+_LITERAL = re.compile(r"`[^`\\]*(?:\\.[^`\\]*)*`|" + _STRING)
+_LIST_SEP = re.compile(r"\s*,?\s*")
+
+
+def inline_sources(ts: str) -> list[tuple[str, int, str]]:
+    """
+    ("template" | "styles", offset, text) for every inline template / style
+    string in ``ts``; ``offset`` is where ``text`` starts inside ``ts``.
+    """
+    found = []
+    pos = 0
+    while True:
+        m = _INLINE_KEY.search(ts, pos)
+        if m is None:
+            return found
+        kind, pos = m.group(1), m.end()
+        if m.start() and (ts[m.start() - 1].isalnum() or ts[m.start() - 1] in "_$"):
+            continue
+        in_list = kind == "styles" and ts.startswith("[", pos)
+        if in_list:
+            pos = _SPACE.match(ts, pos + 1).end()
+        while True:
+            lit = _LITERAL.match(ts, pos)
+            if lit is None or len(lit.group()) < 2 or lit.group()[-1] != lit.group()[0]:
+                break
+            found.append((kind, lit.start() + 1, lit.group()[1:-1]))
+            pos = lit.end()
+            if not in_list:
+                break
+            pos = _LIST_SEP.match(ts, pos).end()
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def scan_typescript(code: str) -> ScanResult:
+    """Brackets and hex colors; strings (incl. template literals) and comments tracked."""
+    return _scan(code, _TS_TOKENS, declarations=False)
+
+
+def hex_colors(text: str) -> list[tuple[int, str]]:
+    """Every hex color in ``text``, comments and strings included (for HTML)."""
+    return [(m.start(), m.group()[1:]) for m in _HEX_RE.finditer(text)]
+
+
+def scan_scss(code: str) -> ScanResult:
+    """Brackets, hex colors and ``property: value`` declarations in one pass."""
+    return _scan(code, _SCSS_TOKENS, declarations=True)
@@ -0,0 +1,279 @@
+"""
+scheduler.py
+------------
+Rate limiting, retries and circuit breaking for LLM calls.
+
+Every chat-completion request the generator makes goes through one
+process-wide Scheduler:
+
+  1. Token bucket  -- requests are paced to ``rpm`` per minute (our Groq
+                      tier; GROQ_RPM) with bursts of up to ``burst``. A
+                      caller reserves a slot and sleeps until it comes up,
+                      so threads and asyncio tasks share one budget.
+  2. Retries       -- 429, 408/409, 5xx, timeouts and connection errors are
+                      retried up to ``max_retries`` times with full-jitter
+                      exponential backoff; a Retry-After header is honoured.
+                      Anything else (bad request, auth) is raised at once.
+  3. Timeout       -- ``timeout`` seconds per attempt, passed to the client.
+  4. Circuit       -- after ``failure_threshold`` consecutive transient
+                      failures, calls fail fast with CircuitOpenError for
+                      ``cooldown`` seconds; then one trial call decides
+                      whether it closes again.
+
+Waits and retries show up as "llm.throttle" / "llm.backoff" trace spans and
+in the counters returned by stats().
+
+Public API:
+  Scheduler(rpm, burst, max_retries, base_delay, max_delay, timeout,
+            failure_threshold, cooldown)
+  Scheduler.from_env(rpm)                 # GROQ_RPM, GROQ_TIMEOUT, GROQ_MAX_RETRIES
+  Scheduler.call(send)        -> send(timeout) result   (blocking)
+  Scheduler.acall(send)       -> await send(timeout)    (asyncio)
+  Scheduler.stats()           -> counters dict
+  CircuitOpenError
+  is_retryable(exc)           -> bool
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+from tracing import annotate, span
+
+
+_RETRY_STATUS = frozenset({408, 409, 429})
+_RETRY_NAMES = frozenset({"APITimeoutError", "APIConnectionError", "ReadTimeout", "ConnectTimeout"})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the LLM while the circuit breaker is open."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient failure worth retrying: rate limit, timeout, connection or server error."""
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status in _RETRY_STATUS or status >= 500
+    return (isinstance(exc, (TimeoutError, ConnectionError))
+            or type(exc).__name__ in _RETRY_NAMES)
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Token bucket
+# ---------------------------------------------------------------------------
+
+class _TokenBucket:
+    """``rate`` tokens per second, at most ``capacity`` saved up."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token; returns how long to wait before using it (0.0 if available now)."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1.0
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+# ---------------------------------------------------------------------------
+# Scheduler
+# ---------------------------------------------------------------------------
+
+class Scheduler:
+    """Paces, retries and circuit-breaks LLM requests. Thread- and task-safe."""
+
+    def __init__(
+        self,
+        rpm: float | None = 30,
+        burst: int | None = None,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        timeout: float | None = 60.0,
+        failure_threshold: int = 5,
+        cooldown: float = 30.0,
+    ) -> None:
+        self.rpm = rpm
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._bucket = _TokenBucket(rpm / 60.0, burst or max(1, int(rpm) // 6)) if rpm else None
+        self._lock = threading.Lock()
+        self._failures = 0            # consecutive transient failures
+        self._opened_at: float | None = None
+        self._trial = False           # half-open: one call is probing
+        self._stats = dict.fromkeys(
+            ("calls", "attempts", "retries", "failures", "rate_limited", "timeouts",
+             "circuit_opened", "rejected"), 0)
+        self._stats["throttled_s"] = 0.0
+        self._stats["backoff_s"] = 0.0
+
+    @classmethod
+    def from_env(cls, rpm: float | None = 30) -> "Scheduler":
+        """Defaults overridden by GROQ_RPM, GROQ_TIMEOUT and GROQ_MAX_RETRIES."""
+        env = os.environ
+        if rpm is not None:
+            rpm = float(env.get("GROQ_RPM", rpm))
+        return cls(
+            rpm=rpm or None,
+            timeout=float(env.get("GROQ_TIMEOUT", "60")),
+            max_retries=int(env.get("GROQ_MAX_RETRIES", "4")),
+        )
+
+    # -- bookkeeping ---------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out["throttled_s"] = round(out["throttled_s"], 3)
+        out["backoff_s"] = round(out["backoff_s"], 3)
+        out["circuit"] = self._state()
+        return out
+
+    def _count(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self._stats[key] += amount
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if self._trial else "open"
+
+    def _admit(self) -> None:
+        """Raise CircuitOpenError unless a call may go out now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining <= 0 and not self._trial:
+                self._trial = True
+                return
+            self._stats["rejected"] += 1
+        raise CircuitOpenError(
+            "LLM circuit open after " + str(self.failure_threshold) + " consecutive failures; "
+            "retry in " + str(max(0, round(remaining, 1))) + "s"
+        )
+
+    def _succeeded(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def _failed(self, exc: BaseException) -> None:
+        with self._lock:
+            self._stats["failures"] += 1
+            if getattr(exc, "status_code", None) == 429:
+                self._stats["rate_limited"] += 1
+            if isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__:
+                self._stats["timeouts"] += 1
+            self._failures += 1
+            if self._trial or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._stats["circuit_opened"] += 1
+            self._trial = False
+
+    def _release_trial(self) -> None:
+        # A non-transient error says nothing about the service; let the next call probe.
+        with self._lock:
+            self._trial = False
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        hinted = _retry_after(exc)
+        return max(delay, min(hinted, self.max_delay)) if hinted is not None else delay
+
+    def _give_up(self, attempt: int, exc: BaseException) -> bool:
+        if not is_retryable(exc):
+            self._release_trial()
+            return True
+        self._failed(exc)
+        return attempt >= self.max_retries or self._opened_at is not None
+
+    # -- calls ---------------------------------------------------------------
+
+    def call(self, send: Callable[[float | None], Any]) -> Any:
+        """Run ``send(timeout)`` (one request attempt) under the pacing/retry/circuit policy."""
+        self._count("calls")
+        attempt = 0
+        while True:
+            self._admit()
+            wait = self._bucket.reserve() if self._bucket is not None else 0.0
+            if wait > 0:
+                with span("llm.throttle", wait_ms=round(wait * 1000, 1)):
+                    time.sleep(wait)
+                self._count("throttled_s", wait)
+            self._count("attempts")
+            try:
+                result = send(self.timeout)
+            except Exception as exc:
+                if self._give_up(attempt, exc):
+                    raise
+                delay = self._backoff(attempt, exc)
+                attempt += 1
+                self._count("retries")
+                self._count("backoff_s", delay)
+                annotate(retries=attempt)
+                with span("llm.backoff", attempt=attempt, error=type(exc).__name__,
+                          delay_ms=round(delay * 1000, 1)):
+                    time.sleep(delay)
+                continue
+            self._succeeded()
+            return result
+
+    async def acall(self, send: Callable[[float | None], Awaitable[Any]]) -> Any:
+        """Async call(): ``await send(timeout)``; waits never block the event loop."""
+        self._count("calls")
+        attempt = 0
+        while True:
+            self._admit()
+            wait = self._bucket.reserve() if self._bucket is not None else 0.0
+            if wait > 0:
+                with span("llm.throttle", wait_ms=round(wait * 1000, 1)):
+                    await asyncio.sleep(wait)
+                self._count("throttled_s", wait)
+            self._count("attempts")
+            try:
+                result = await send(self.timeout)
+            except asyncio.CancelledError:
+                self._release_trial()
+                raise
+            except Exception as exc:
+                if self._give_up(attempt, exc):
+                    raise
+                delay = self._backoff(attempt, exc)
+                attempt += 1
+                self._count("retries")
+                self._count("backoff_s", delay)
+                annotate(retries=attempt)
+                with span("llm.backoff", attempt=attempt, error=type(exc).__name__,
+                          delay_ms=round(delay * 1000, 1)):
+                    await asyncio.sleep(delay)
+                continue
+            self._succeeded()
+            return result
@@ -0,0 +1,267 @@
+"""
+server.py
+---------
+Long-lived local HTTP server (``python main.py --serve``) exposing the full
+pipeline (generation, validation, auto-fix and self-correction) to the
+preview app and other tools.
+
+The design system is compiled once at startup. All agent runs share one
+background event loop, so the pooled async Groq client and the response
+cache stay warm between requests. HTTP requests are handled on threads,
+and the generations themselves run concurrently on that loop, bounded by
+the generator's concurrency cap.
+
+Endpoints (JSON in, JSON out):
+  GET  /health     -> {"status", "design_system", "llm": scheduler counters}
+  POST /validate   {"ts", "html", "scss"} -> {"passed", "errors", "warnings"}
+  POST /generate   {"prompt", "conversationHistory"?, "slug"?, "repair"?,
+                    "autofix"?, "candidates"? (1-5)} -> result (see _result_payload);
+                   send the first response's "slug" back to edit the same component
+  POST /stream     same body as /generate; newline-delimited JSON events
+                   ("iteration", "block", "validation", "autofix"), then a
+                   final {"event": "result", ...} or {"event": "error", ...}
+
+Public API:
+  serve(host, port, output_dir, design_system_path, **agent_opts)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import queue
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from agent import arun_agent
+from design_system import load_design_system
+from generator import format_code_blocks, llm_stats
+from history import DEFAULT_HISTORY_BUDGET, compact_history
+from validator import validate_component
+
+
+_MAX_BODY = 4 * 1024 * 1024
+_MAX_CANDIDATES = 5         # each candidate is a concurrent LLM call; larger requests are clamped
+_SLUG = re.compile(r"[a-z0-9][a-z0-9-]*")     # as agent._slugify makes them; names output files
+_DONE = object()
+
+
+class _BadRequest(ValueError):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Background event loop
+# ---------------------------------------------------------------------------
+
+class _LoopThread:
+    """One asyncio loop on a daemon thread; coroutines are submitted from handler threads."""
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="componentforge-loop",
+                                       daemon=True)
+        self.thread.start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self) -> None:
+        from generator import aclose_async_client
+
+        self.submit(aclose_async_client()).result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=10)
+
+
+# ---------------------------------------------------------------------------
+# Request / response shaping
+# ---------------------------------------------------------------------------
+
+def _agent_kwargs(body: dict, defaults: dict, history_budget: int) -> dict:
+    prompt = body.get("prompt")
+    if not isinstance(prompt, str) or not prompt.strip():
+        raise _BadRequest("prompt is required")
+    history = body.get("conversationHistory") or []
+    if not isinstance(history, list):
+        raise _BadRequest("conversationHistory must be a list of messages")
+    opts = dict(defaults)
+    for name in ("repair", "autofix"):
+        if name in body:
+            opts[name] = bool(body[name])
+    if "candidates" in body:
+        candidates = body["candidates"]
+        if isinstance(candidates, bool) or not isinstance(candidates, int):
+            raise _BadRequest("candidates must be an integer")
+        opts["candidates"] = min(max(1, candidates), _MAX_CANDIDATES)
+    slug = body.get("slug")
+    if slug and not (isinstance(slug, str) and _SLUG.fullmatch(slug)):
+        raise _BadRequest("slug must be a component slug from an earlier response")
+    return dict(
+        opts,
+        user_description=prompt.strip(),
+        conversation_history=compact_history(history, history_budget),
+        component_slug=slug or None,
+    )
+
+
+def _result_payload(result: dict) -> dict:
+    """run_agent result as JSON; ``raw`` is the final component, ready to feed back as history."""
+    blocks = result.get("blocks") or {}
+    return {
+        "passed": result["passed"],
+        "iterations": result["iterations"],
+        "elapsed": round(result["elapsed"], 3),
+        "errors": result["error_list"],
+        "fixes": result.get("fixes", []),
+        "slug": result["slug"],
+        "files": result["files"],
+        "tokensSent": result.get("tokens_sent", 0),
+        "ts": blocks.get("ts", ""),
+        "html": blocks.get("html", ""),
+        "scss": blocks.get("scss", ""),
+        "raw": format_code_blocks(blocks) if blocks.get("ts") else result.get("raw_response", ""),
+    }
+
+
+# ---------------------------------------------------------------------------
+# HTTP handler
+# ---------------------------------------------------------------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "ComponentForge/1.0"
+    protocol_version = "HTTP/1.1"
+
+    # Set on the subclass created by serve()
+    worker: _LoopThread
+    output_dir: str
+    design_system_path: str
+    agent_defaults: dict
+    history_budget: int
+
+    def log_message(self, format: str, *args: Any) -> None:
+        print("  [serve] " + self.address_string() + " " + (format % args))
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > _MAX_BODY:
+            raise _BadRequest("request body too large")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as exc:
+            raise _BadRequest("invalid JSON: " + str(exc)) from exc
+        if not isinstance(body, dict):
+            raise _BadRequest("request body must be a JSON object")
+        return body
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            ds = load_design_system(self.design_system_path)
+            self._send_json(200, {"status": "ok", "design_system": ds.version, "llm": llm_stats()})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        routes = {"/generate": self._generate, "/validate": self._validate, "/stream": self._stream}
+        route = routes.get(self.path)
+        if route is None:
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            route(self._read_json())
+        except _BadRequest as exc:
+            self._send_json(400, {"error": str(exc)})
+        except Exception as exc:   # keep serving; report the failure to this caller only
+            self._send_json(500, {"error": type(exc).__name__ + ": " + str(exc)})
+
+    def _validate(self, body: dict) -> None:
+        blocks = {k: body.get(k) or "" for k in ("ts", "html", "scss")}
+        errors, warnings = validate_component(blocks, self.design_system_path)
+        self._send_json(200, {"passed": not errors, "errors": errors, "warnings": warnings})
+
+    def _generate(self, body: dict) -> None:
+        kwargs = _agent_kwargs(body, self.agent_defaults, self.history_budget)
+        future = self.worker.submit(arun_agent(output_dir=self.output_dir, verbose=False, **kwargs))
+        self._send_json(200, _result_payload(future.result()))
+
+    def _stream(self, body: dict) -> None:
+        kwargs = _agent_kwargs(body, self.agent_defaults, self.history_budget)
+        kwargs["stream"] = True
+        events: queue.Queue = queue.Queue()
+        future = self.worker.submit(arun_agent(
+            output_dir=self.output_dir, verbose=False, on_event=events.put, **kwargs,
+        ))
+        future.add_done_callback(lambda _: events.put(_DONE))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while (event := events.get()) is not _DONE:
+                self._write_line(event)
+            try:
+                final = dict(_result_payload(future.result()), event="result")
+            except Exception as exc:
+                final = {"event": "error", "error": type(exc).__name__ + ": " + str(exc)}
+            self._write_line(final)
+        except (BrokenPipeError, ConnectionResetError):
+            future.cancel()   # client went away: stop paying for the generation
+
+    def _write_line(self, event: dict) -> None:
+        self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    output_dir: str = "output",
+    design_system_path: str = "design_system.json",
+    history_budget: int = DEFAULT_HISTORY_BUDGET,
+    **agent_opts,
+) -> None:
+    """Run the server until interrupted. ``agent_opts`` are per-request defaults for run_agent."""
+    ds = load_design_system(design_system_path)   # compile once, up front
+    worker = _LoopThread()
+    handler = type("Handler", (_Handler,), {
+        "worker": worker,
+        "output_dir": output_dir,
+        "design_system_path": design_system_path,
+        "agent_defaults": {k: v for k, v in agent_opts.items() if k != "stream"},
+        "history_budget": history_budget,
+    })
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+
+    print("\n" + "=" * 60)
+    print("  Guided Component Architect -- Server")
+    print("=" * 60)
+    print("  Listening : http://" + host + ":" + str(httpd.server_address[1]))
+    print("  Design    : " + ds.path + " (" + ds.version + ")")
+    print("  Output    : " + output_dir + "/")
+    print("  Endpoints : GET /health | POST /generate /validate /stream")
+    print("=" * 60 + "\n")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        httpd.server_close()
+        worker.stop()
@@ -0,0 +1,40 @@
+"""
+test_tokens.py
+--------------
+Declaration checks in tokens.py (run with ``python -m pytest``).
+"""
+
+from __future__ import annotations
+
+from design_system import load_design_system
+from validator import validate_block
+
+
+def _errors(prop: str, value: str) -> list[str]:
+    return [f.message for f in load_design_system().tokens.check(prop, value) if f.error]
+
+
+def test_important_radius_is_on_token():
+    assert _errors("border-radius", "8px !important") == []
+    assert validate_block("scss", ".a { border-radius: 8px !important; }").errors == []
+
+
+def test_important_radius_still_checked():
+    assert _errors("border-radius", "7px !important") == [
+        "Unauthorized border-radius '7px' — allowed: 0, 4px, 8px, 12px, 16px, 9999px"
+    ]
+
+
+def test_important_shadow_is_on_token():
+    assert _errors("box-shadow", "0 2px 8px rgba(0,0,0,0.10) !important") == []
+    assert validate_block("scss", ".a { box-shadow: 0 2px 8px rgba(0,0,0,0.10) !important; }").errors == []
+
+
+def test_important_shadow_still_checked():
+    errors = _errors("box-shadow", "0 2px 9px rgba(0,0,0,0.10) !important")
+    assert len(errors) == 1 and "'0 2px 9px rgba(0,0,0,0.10)'" in errors[0]
+
+
+def test_scss_default_flag():
+    assert _errors("border-radius", "12px !default") == []
+    assert _errors("border-radius", "12px !default !global") == []
@@ -0,0 +1,29 @@
+"""
+tokencount.py
+-------------
+Prompt-size estimates shared by the prompt renderer (design_system.py),
+history compaction (history.py) and the generator's token budget.
+
+Counts are estimates: about 4 characters per token plus a small per-message
+overhead. That is close enough for budgeting without a tokenizer dependency.
+
+Public API:
+  estimate_tokens(text)             -> int
+  count_message_tokens(messages)    -> int
+"""
+
+from __future__ import annotations
+
+
+_CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4      # role + framing tokens per chat message
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for ``text`` (ceil(chars / 4))."""
+    return -(-len(text) // _CHARS_PER_TOKEN)
+
+
+def count_message_tokens(messages: list[dict]) -> int:
+    """Estimated prompt tokens for a list of chat messages."""
+    return sum(estimate_tokens(m.get("content") or "") + MESSAGE_OVERHEAD for m in messages)
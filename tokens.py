@@ -0,0 +1,432 @@
+"""
+tokens.py
+---------
+Design-token index and CSS value checks for the Linter-Agent.
+
+build_index() compiles every token in design_system.json once into lookup
+tables keyed by normalized value:
+
+  colors       (r, g, b)  -- hex, rgb()/rgba() and hsl()/hsla() all meet
+                             here; hsl() is also indexed as written
+                             (rounded h, s%, l%) so converted palette
+                             colors match exactly. Alpha is free: a
+                             translucent palette color is on-token.
+  spacing,
+  font-size,
+  radius       px          -- rem at 16px, so 0.75rem and 12px are the same
+  font-weight  number      -- "normal" / "bold" are 400 / 700
+  shadow       canonical text (spacing, units on 0, color syntax erased)
+
+TokenIndex.check() splits a declared value into its components (shorthands,
+comma lists, "/" in radii) and resolves each with one dict lookup. var()
+resolves through token names, custom properties declared in the same
+stylesheet and fallbacks; calc() and relative units (%, em, vw) are left
+alone except in radii, which only ever took tokens.
+
+Public API:
+  TokenIndex                                       # DesignSystem.tokens
+  TokenIndex.length_token(kind, text)      -> token name | None
+  TokenIndex.check(prop, value, custom)    -> (Finding(error, message), ...)
+  build_index(data)                        -> TokenIndex
+  color_findings(index, text)              -> [Finding]   # functional colors in free text
+  parse_color(text)                        -> (r, g, b, alpha) | None
+  to_px(text)                              -> float | None
+"""
+
+from __future__ import annotations
+
+import colorsys
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+
+_ROOT_FONT_PX = 16.0
+_MAX_VAR_DEPTH = 8          # custom properties referring to each other
+_MEMO_SIZE = 8192
+
+
+class Finding(NamedTuple):
+    """A token violation (``error``) or an unverifiable value (warning)."""
+    error: bool
+    message: str
+
+
+# ---------------------------------------------------------------------------
+# Value normalization
+# ---------------------------------------------------------------------------
+
+_LENGTH = re.compile(r"(-?(?:\d+\.?\d*|\.\d+))([a-z%]*)")
+_HEX_VALUE = re.compile(r"#([0-9a-f]{3}|[0-9a-f]{6})")
+_COLOR_FN = re.compile(r"\b(rgba?|hsla?)\(([^()]*)\)", re.IGNORECASE)
+_COLOR_ANY = re.compile(r"\b(?:rgba?|hsla?)\([^()]*\)|#(?:[0-9a-f]{6}|[0-9a-f]{3})\b")
+_ARGS = re.compile(r"[\s,/]+")
+_NUMBER = re.compile(r"(?<![\w.#-])(-?(?:\d+\.?\d*|\.\d+))(px)?(?![\w.%])")
+_VAR = re.compile(r"var\(\s*(--[\w-]+)\s*(?:,\s*(.*))?\)", re.DOTALL)
+_GLOBAL_KEYWORDS = frozenset({"inherit", "initial", "unset", "revert", "revert-layer"})
+# "!important" and SCSS's "!default" / "!global" flags are not part of the value
+_FLAGS = re.compile(r"(?:\s*!\s*(?:important|default|global))+\s*$", re.IGNORECASE)
+_WEIGHT_KEYWORDS = {"normal": 400, "bold": 700}
+
+
+def _length(text: str) -> tuple[float, str] | None:
+    m = _LENGTH.fullmatch(text)
+    return (float(m.group(1)), m.group(2)) if m is not None else None
+
+
+def to_px(text: str) -> float | None:
+    """px for a px / rem / unitless-zero length, else None."""
+    parsed = _length(text.strip().lower())
+    if parsed is None:
+        return None
+    number, unit = parsed
+    if unit == "rem":
+        return number * _ROOT_FONT_PX
+    if unit == "px" or (not unit and number == 0):
+        return number
+    return None
+
+
+def _channel(text: str) -> float:
+    return float(text[:-1]) * 2.55 if text.endswith("%") else float(text)
+
+
+def _hue(text: str) -> float:
+    parsed = _length(text)
+    if parsed is None:
+        raise ValueError(text)
+    number, unit = parsed
+    scale = {"": 1.0, "deg": 1.0, "turn": 360.0, "rad": 57.29577951308232, "grad": 0.9}[unit]
+    return number * scale % 360
+
+
+def _hsl_parts(args: list[str]) -> tuple[float, float, float]:
+    return _hue(args[0]), float(args[1].rstrip("%")), float(args[2].rstrip("%"))
+
+
+def parse_color(text: str) -> tuple[int, int, int, float] | None:
+    """(r, g, b, alpha) for a hex, rgb()/rgba() or hsl()/hsla() color, else None."""
+    text = text.strip().lower()
+    m = _HEX_VALUE.fullmatch(text)
+    if m is not None:
+        digits = m.group(1)
+        if len(digits) == 3:
+            digits = "".join(c * 2 for c in digits)
+        return int(digits[0:2], 16), int(digits[2:4], 16), int(digits[4:6], 16), 1.0
+    m = _COLOR_FN.fullmatch(text)
+    if m is None:
+        return None
+    args = [a for a in _ARGS.split(m.group(2).strip()) if a]
+    if len(args) not in (3, 4):
+        return None
+    try:
+        alpha = 1.0 if len(args) == 3 else (
+            float(args[3][:-1]) / 100 if args[3].endswith("%") else float(args[3]))
+        if m.group(1).startswith("rgb"):
+            r, g, b = (min(255, max(0, round(_channel(a)))) for a in args[:3])
+            return r, g, b, alpha
+        h, s, l = _hsl_parts(args)
+    except (ValueError, KeyError):
+        return None            # var(), calc() or a typo inside the function
+    r, g, b = colorsys.hls_to_rgb(h / 360, min(l, 100) / 100, min(s, 100) / 100)
+    return round(r * 255), round(g * 255), round(b * 255), alpha
+
+
+def _hsl_key(rgb: tuple[int, int, int]) -> tuple[int, int, int]:
+    h, l, s = colorsys.rgb_to_hls(*(c / 255 for c in rgb))
+    return round(h * 360) % 360, round(s * 100), round(l * 100)
+
+
+def _number(text: str) -> str:
+    value = float(text)
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def _canonical_color(text: str) -> str:
+    color = parse_color(text)
+    if color is None:
+        return text
+    return "rgba(" + ",".join(str(c) for c in color[:3]) + "," + _number(str(color[3])) + ")"
+
+
+def _canonical_shadow(text: str) -> str:
+    """One shadow with colors as rgba(r,g,b,a), numbers trimmed, 0px as 0 and single spaces."""
+    text = _COLOR_ANY.sub(lambda m: _canonical_color(m.group()), text.lower())
+    text = _NUMBER.sub(lambda m: _number(m.group(1)) + ("" if float(m.group(1)) == 0 else (m.group(2) or "")), text)
+    return " ".join(text.split())
+
+
+def _split(value: str, separators: str = " \t\n\r") -> list[str]:
+    """Components of ``value`` split on ``separators`` outside parentheses."""
+    if "(" not in value and separators.isspace():
+        return value.split()
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(value):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(0, depth - 1)
+        elif depth == 0 and ch in separators:
+            parts.append(value[start:i])
+            start = i + 1
+    parts.append(value[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+def _key(px: float) -> float:
+    return round(px, 3)
+
+
+@dataclass(frozen=True)
+class TokenIndex:
+    """Normalized value -> token name, per kind of token. Built by build_index()."""
+    colors: dict = field(default_factory=dict)     # (r, g, b) -> name
+    hsl: dict = field(default_factory=dict)        # (h, s%, l%) rounded -> name
+    lengths: dict = field(default_factory=dict)    # "spacing" | "font-size" | "radius" -> {px: name}
+    weights: dict = field(default_factory=dict)    # 400 -> "font-weight-normal"
+    shadows: dict = field(default_factory=dict)    # canonical shadow -> name
+    names: dict = field(default_factory=dict)      # token name -> kind
+    allowed: dict = field(default_factory=dict)    # kind -> "a, b, c" for messages
+    fingerprint: str = ""
+    # (prop, value) -> findings for var()-free declarations; values repeat a lot
+    _memo: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def length_token(self, kind: str, text: str) -> str | None:
+        """Token name for a px / rem length of ``kind`` ("spacing", "font-size", "radius")."""
+        px = to_px(text)
+        return None if px is None else self.lengths[kind].get(_key(px))
+
+    def check(self, prop: str, value: str, custom: dict | None = None) -> tuple[Finding, ...]:
+        """
+        Findings for one ``prop: value`` declaration. ``custom`` maps custom
+        properties declared in the same stylesheet ("--gap") to their values.
+        """
+        pure = "var(" not in value          # otherwise the outcome depends on ``custom``
+        if pure:
+            hit = self._memo.get((prop, value))
+            if hit is not None:
+                return hit
+        findings: list[Finding] = []
+        if "(" in value:
+            _color_findings(self, value, findings)
+        kind = _property_kind(prop)
+        if kind is not None:
+            _check_value(self, kind, prop, value, custom or {}, 0, findings)
+        outcome = tuple(findings)
+        if pure and len(self._memo) < _MEMO_SIZE:
+            self._memo[(prop, value)] = outcome
+        return outcome
+
+
+def _kind(section: str, name: str) -> str | None:
+    if section == "colors" or name.endswith("-color"):
+        return "color"
+    if section == "spacing":
+        return "spacing"
+    if section == "shadows":
+        return "shadow"
+    if "radius" in name:
+        return "radius"
+    if name.startswith("font-size"):
+        return "font-size"
+    if name.startswith("font-weight"):
+        return "font-weight"
+    return None
+
+
+def build_index(data: dict) -> TokenIndex:
+    """Compile the token sections of a design_system.json document."""
+    colors: dict = {}
+    lengths: dict[str, dict] = {"spacing": {}, "font-size": {}, "radius": {}}
+    written: dict[str, dict] = {"spacing": {}, "font-size": {}, "radius": {}}
+    weights: dict = {}
+    shadows: dict = {}
+    names: dict = {}
+    embedded = []                  # colors inside shadows / effects
+    for section, tokens in data.items():
+        if section in ("meta", "breakpoints") or not isinstance(tokens, dict):
+            continue
+        for name, value in tokens.items():
+            if not isinstance(value, str):
+                continue
+            kind = _kind(section, name)
+            if kind is not None:
+                names[name] = kind
+            if kind == "color":
+                color = parse_color(value)
+                if color is not None:
+                    colors.setdefault(color[:3], name)
+            elif kind in lengths:
+                px = to_px(value)
+                if px is not None:
+                    lengths[kind].setdefault(_key(px), name)
+                    written[kind].setdefault(_key(px), value.strip())
+            elif kind == "font-weight":
+                try:
+                    weights.setdefault(int(value), name)
+                except ValueError:
+                    pass
+            elif kind == "shadow":
+                for shadow in _split(value, ","):
+                    shadows.setdefault(_canonical_shadow(shadow), name)
+            embedded.extend((m.group(), name) for m in _COLOR_ANY.finditer(value.lower()))
+    for text, name in embedded:
+        color = parse_color(text)
+        if color is not None:
+            colors.setdefault(color[:3], name)
+
+    # A zero radius is a reset, not a design decision
+    lengths["radius"].setdefault(0.0, "0")
+    written["radius"].setdefault(0.0, "0")
+    allowed = {kind: ", ".join(values[px] for px in sorted(values)) for kind, values in written.items()}
+    allowed["font-weight"] = ", ".join(str(w) for w in sorted(weights))
+    allowed["shadow"] = ", ".join(dict.fromkeys(shadows.values()))
+
+    text = repr((sorted(colors.items()), sorted((k, sorted(v.items())) for k, v in lengths.items()),
+                 sorted(weights.items()), sorted(shadows.items())))
+    return TokenIndex(
+        colors=colors,
+        hsl={_hsl_key(rgb): name for rgb, name in reversed(list(colors.items()))},
+        lengths=lengths,
+        weights=weights,
+        shadows=shadows,
+        names=names,
+        allowed=allowed,
+        fingerprint=hashlib.sha256(text.encode("utf-8")).hexdigest()[:16],
+    )
+
+
+# ---------------------------------------------------------------------------
+# Checks
+# ---------------------------------------------------------------------------
+
+_SIDES = ("", "-top", "-right", "-bottom", "-left", "-inline", "-inline-start",
+          "-inline-end", "-block", "-block-start", "-block-end")
+_CORNERS = ("top-left", "top-right", "bottom-right", "bottom-left",
+            "start-start", "start-end", "end-start", "end-end")
+
+# Declared property -> kind of token its value must resolve to
+PROPERTY_KINDS: dict[str, str] = {
+    **{"margin" + side: "spacing" for side in _SIDES},
+    **{"padding" + side: "spacing" for side in _SIDES},
+    "gap": "spacing", "row-gap": "spacing", "column-gap": "spacing",
+    "font-size": "font-size",
+    "font-weight": "font-weight",
+    "border-radius": "radius",
+    **{"border-" + corner + "-radius": "radius" for corner in _CORNERS},
+    "box-shadow": "shadow",
+}
+
+
+def _property_kind(prop: str) -> str | None:
+    kind = PROPERTY_KINDS.get(prop)
+    if kind is None and prop.endswith("-border-radius"):
+        return "radius"          # vendor-prefixed
+    return kind
+
+
+def _unauthorized(prop: str, value: str, index: TokenIndex, kind: str) -> Finding:
+    if kind == "shadow":
+        return Finding(True, "Unauthorized box-shadow '" + value + "' — use a design system shadow (" +
+                       index.allowed["shadow"] + ").")
+    return Finding(True, "Unauthorized " + prop + " '" + value + "' — allowed: " + index.allowed[kind])
+
+
+def _resolve(index: TokenIndex, kind: str, prop: str, part: str, custom: dict,
+             depth: int, findings: list) -> None:
+    """Append a finding unless ``part`` (one component of a value) resolves to a ``kind`` token."""
+    if part in _GLOBAL_KEYWORDS:
+        return
+    if part.startswith("var("):
+        m = _VAR.fullmatch(part)
+        if m is None:
+            return
+        name, fallback = m.group(1), m.group(2)
+        if index.names.get(name[2:]) == kind:
+            return
+        if name in custom and depth < _MAX_VAR_DEPTH:
+            _check_value(index, kind, prop, custom[name], custom, depth + 1, findings)
+        elif fallback:
+            _check_value(index, kind, prop, fallback, custom, depth + 1, findings)
+        elif name[2:] in index.names:
+            findings.append(_unauthorized(prop, part, index, kind))
+        else:
+            findings.append(Finding(False, prop + " uses " + part + ", which is not a design token."))
+        return
+    if part.startswith("$"):
+        # SCSS variables are resolved by name only; a local one was checked where it was declared
+        if index.names.get(part[1:], kind) != kind:
+            findings.append(_unauthorized(prop, part, index, kind))
+        return
+    if "(" in part or "#{" in part:
+        return                    # calc(), min(), interpolation: not statically known
+
+    if kind == "font-weight":
+        weight = _WEIGHT_KEYWORDS.get(part)
+        if weight is None:
+            try:
+                weight = int(float(part))
+            except ValueError:
+                return            # bolder / lighter
+        if weight not in index.weights:
+            findings.append(_unauthorized(prop, part, index, kind))
+        return
+
+    px = to_px(part)
+    if px is None:
+        if kind == "radius" or (_length(part) is not None and _length(part)[1] == ""):
+            findings.append(_unauthorized(prop, part, index, kind))
+        return                    # auto, keywords, %, em, vw ...
+    if px == 0 or _key(abs(px) if kind == "spacing" else px) in index.lengths[kind]:
+        return
+    findings.append(_unauthorized(prop, part, index, kind))
+
+
+def _check_value(index: TokenIndex, kind: str, prop: str, value: str, custom: dict,
+                 depth: int, findings: list) -> None:
+    value = _FLAGS.sub("", value).strip()
+    lowered = value.lower()
+    if kind == "shadow":
+        if lowered in ("none",) or lowered in _GLOBAL_KEYWORDS:
+            return
+        for shadow in _split(value, ","):
+            if shadow.lower().startswith("var(") or shadow.startswith("$"):
+                _resolve(index, kind, prop, shadow.lower(), custom, depth, findings)
+            elif "(" in shadow and _COLOR_ANY.search(shadow.lower()) is None:
+                continue          # calc() lengths, var() colors: not statically known
+            elif _canonical_shadow(shadow) not in index.shadows:
+                findings.append(_unauthorized(prop, shadow, index, kind))
+        return
+    separators = " \t\n\r/" if kind == "radius" else " \t\n\r"
+    for part in _split(lowered, separators):
+        _resolve(index, kind, prop, part, custom, depth, findings)
+
+
+def _color_findings(index: TokenIndex, text: str, findings: list) -> None:
+    for m in _COLOR_FN.finditer(text):
+        color = parse_color(m.group())
+        if color is None:
+            continue
+        if color[:3] in index.colors:
+            continue
+        if m.group(1).lower().startswith("hsl"):
+            try:
+                h, s, l = _hsl_parts([a for a in _ARGS.split(m.group(2).strip()) if a])
+            except (ValueError, KeyError, IndexError):
+                h = s = l = -1.0
+            if (round(h) % 360, round(s), round(l)) in index.hsl:
+                continue
+        findings.append(Finding(True, "Unauthorized color '" + m.group() + "' — use a design system color."))
+
+
+def color_findings(index: TokenIndex, text: str) -> list[Finding]:
+    """rgb()/rgba()/hsl()/hsla() colors in ``text`` that are not palette colors (hex is the scanner's job)."""
+    findings: list[Finding] = []
+    if "(" in text:
+        _color_findings(index, text, findings)
+    return findings
@@ -0,0 +1,193 @@
+"""
+tracing.py
+----------
+Lightweight span tracing for the agent loop.
+
+Phases are wrapped in ``with span("name", **attrs):`` blocks. While no
+tracer is active, span() returns a shared no-op object, so instrumented hot
+paths cost one global lookup per span. When a tracer is active, every span
+records its start, duration, parent and attributes. The parent is tracked
+through a context variable, so concurrent asyncio runs keep their own
+nesting. Each top-level span (one agent run) gets its own lane: a "tid" in
+Chrome traces.
+
+Traces are written as JSON Lines (one span per line, times in ms) or in
+Chrome trace-event format, which opens in chrome://tracing or Perfetto.
+
+Public API:
+  tracing(path, fmt="jsonl")  -> context manager enabling a Tracer
+  span(name, **attrs)         -> context manager
+  annotate(**attrs)           -> add attributes to the innermost open span
+  record_usage(usage)         -> annotate with Groq token usage / timings
+  enabled()                   -> bool
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+
+FORMATS = ("jsonl", "chrome")
+
+_USAGE_FIELDS = (
+    "prompt_tokens", "completion_tokens", "total_tokens",
+    "queue_time", "prompt_time", "completion_time", "total_time",
+)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "id", "parent", "lane", "start", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> "_Span":
+        parent = _CURRENT.get()
+        self.parent = parent.id if parent is not None else None
+        self.lane = parent.lane if parent is not None else self.tracer._new_lane()
+        self.id = next(self.tracer._ids)
+        self._token = _CURRENT.set(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        end = time.perf_counter_ns()
+        try:
+            _CURRENT.reset(self._token)
+        except ValueError:
+            pass     # closed from another context (e.g. an abandoned generator)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._finish(self, end)
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """Collects finished spans in memory; written out when tracing() exits."""
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter_ns()
+        self.spans: list[dict] = []
+        self._ids = itertools.count(1)
+        self._lanes = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _new_lane(self) -> int:
+        return next(self._lanes)
+
+    def _finish(self, span: _Span, end: int) -> None:
+        record = {
+            "name": span.name,
+            "id": span.id,
+            "parent": span.parent,
+            "lane": span.lane,
+            "start_ms": round((span.start - self.origin) / 1e6, 3),
+            "dur_ms": round((end - span.start) / 1e6, 3),
+            "attrs": span.attrs,
+        }
+        with self._lock:
+            self.spans.append(record)
+
+    def write_jsonl(self, path: str | Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for record in sorted(self.spans, key=lambda r: r["start_ms"]):
+                f.write(json.dumps(record, default=str) + "\n")
+
+    def write_chrome(self, path: str | Path) -> None:
+        events = [
+            {
+                "name": r["name"],
+                "cat": "componentforge",
+                "ph": "X",
+                "ts": round(r["start_ms"] * 1000, 1),
+                "dur": round(r["dur_ms"] * 1000, 1),
+                "pid": 1,
+                "tid": r["lane"],
+                "args": r["attrs"],
+            }
+            for r in self.spans
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def write(self, path: str | Path, fmt: str = "jsonl") -> None:
+        if fmt == "chrome":
+            self.write_chrome(path)
+        else:
+            self.write_jsonl(path)
+
+
+# The tracer is process-wide (spans from server threads count too); the
+# innermost open span is per context, so asyncio tasks nest independently.
+_ACTIVE: Tracer | None = None
+_CURRENT: ContextVar[_Span | None] = ContextVar("componentforge_span", default=None)
+
+
+def enabled() -> bool:
+    return _ACTIVE is not None
+
+
+def span(name: str, **attrs: Any):
+    """Time the enclosed block as ``name``. A no-op unless tracing is enabled."""
+    tracer = _ACTIVE
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, attrs)
+
+
+def annotate(**attrs: Any) -> None:
+    """Attach attributes to the innermost open span, if any."""
+    if _ACTIVE is None:
+        return
+    current = _CURRENT.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+def record_usage(usage: Any) -> None:
+    """Annotate the current span with the token counts / timings of a Groq ``usage`` object."""
+    if _ACTIVE is None or usage is None:
+        return
+    annotate(**{f: getattr(usage, f) for f in _USAGE_FIELDS if getattr(usage, f, None) is not None})
+
+
+@contextmanager
+def tracing(path: str | Path, fmt: str = "jsonl"):
+    """Enable tracing for the enclosed block and write the trace to ``path`` on exit."""
+    global _ACTIVE
+    if fmt not in FORMATS:
+        raise ValueError("trace format must be one of " + ", ".join(FORMATS))
+    previous, tracer = _ACTIVE, Tracer()
+    _ACTIVE = tracer
+    try:
+        yield tracer
+    finally:
+        _ACTIVE = previous
+        tracer.write(path, fmt)
@@ -0,0 +1,764 @@
+"""
+tsx_export.py
+-------------
+React/TSX export of generated Angular components.
+
+The Angular template is converted to real JSX in one pass over the tokens
+scanner.scan_template walks, so the preview does no runtime HTML parsing:
+
+  class="a b" / [class.x] / [ngClass]   -> className={cx(...)} (CSS-module lookup)
+  [prop]="e" / [attr.x] / [style.w.px]  -> prop={e} / x={e} / style={{ w: ... }}
+  (click)="f()" / (keyup.enter)         -> onClick={($event) => { f(); }}
+  *ngIf / @if ... @else                 -> {(c) ? (...) : null}
+  *ngFor / @for ... @empty              -> {(items ?? []).map((item, $index) => ...)}
+  @switch / @case                       -> an immediately-invoked switch
+  {{ expr | pipe }}                     -> {expr}
+
+Component fields with literal initial values become local variables and
+methods become no-ops, so the export renders the component's initial state.
+Expressions are carried over as written; the file is marked @ts-nocheck.
+
+The SCSS becomes ``<slug>.module.scss``: every rule is nested under a
+``.host`` class (``:host`` -> ``&``) so all selectors are local to the
+module. Both files are streamed to disk with fsutil.write_stream() and left
+untouched when unchanged.
+
+Public API:
+  template_to_jsx(html)                     -> Iterator[str]   # JSX chunks
+  scss_module(lines)                        -> Iterator[str]
+  render_tsx(slug, ts, html)                -> Iterator[str]
+  export_component(output_dir, slug, dest)  -> list[Path]      # [tsx, module]
+  export_dir(output_dir, dest, on_error)    -> list[Path]
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import manifest
+from fsutil import write_stream
+from scanner import (
+    RAW_TEXT_ELEMENTS, VOID_ELEMENTS, block_header, block_keyword, inline_sources,
+    raw_text_end, template_token,
+)
+
+
+# ---------------------------------------------------------------------------
+# Expressions and attributes
+# ---------------------------------------------------------------------------
+
+_PIPE = re.compile(r"""'[^']*'|"[^"]*"|`[^`]*`|\|\||\|""")
+_ANY = re.compile(r"\$any\(")
+
+_ATTR = re.compile(r"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"?|'([^']*)'?|([^\s"'>]+)))?""")
+_ATTR_NAMES = {
+    "class": "className", "for": "htmlFor", "tabindex": "tabIndex", "readonly": "readOnly",
+    "maxlength": "maxLength", "minlength": "minLength", "colspan": "colSpan", "rowspan": "rowSpan",
+    "autocomplete": "autoComplete", "autofocus": "autoFocus", "contenteditable": "contentEditable",
+    "crossorigin": "crossOrigin", "srcset": "srcSet", "novalidate": "noValidate",
+    "enctype": "encType", "accesskey": "accessKey", "spellcheck": "spellCheck",
+    "datetime": "dateTime", "inputmode": "inputMode", "innertext": "innerText",
+    "textcontent": "textContent", "routerlink": "href",
+}
+_FORM_FIELDS = frozenset({"input", "textarea", "select"})
+# Angular forms / animation plumbing with no DOM counterpart
+_DROPPED = frozenset({
+    "ngModel", "ngModelOptions", "ngModelChange", "ngForm", "ngNonBindable", "formControl",
+    "formControlName", "formGroup", "formGroupName", "formArrayName", "routerLinkActive",
+})
+_EVENTS = {
+    "click": "onClick", "dblclick": "onDoubleClick", "contextmenu": "onContextMenu",
+    "input": "onInput", "change": "onChange", "submit": "onSubmit", "ngSubmit": "onSubmit",
+    "keyup": "onKeyUp", "keydown": "onKeyDown", "keypress": "onKeyPress",
+    "focus": "onFocus", "blur": "onBlur", "focusin": "onFocus", "focusout": "onBlur",
+    "mouseenter": "onMouseEnter", "mouseleave": "onMouseLeave", "mouseover": "onMouseOver",
+    "mouseout": "onMouseOut", "mousedown": "onMouseDown", "mouseup": "onMouseUp",
+    "mousemove": "onMouseMove", "scroll": "onScroll", "wheel": "onWheel",
+    "touchstart": "onTouchStart", "touchend": "onTouchEnd", "dragstart": "onDragStart",
+    "dragover": "onDragOver", "drop": "onDrop",
+}
+_KEYS = {
+    "enter": "Enter", "escape": "Escape", "esc": "Escape", "space": " ", "tab": "Tab",
+    "backspace": "Backspace", "delete": "Delete", "arrowup": "ArrowUp",
+    "arrowdown": "ArrowDown", "arrowleft": "ArrowLeft", "arrowright": "ArrowRight",
+}
+_CAMEL = re.compile(r"[-:]([A-Za-z])")
+
+
+def _expr(text: str) -> str:
+    """A template expression as JavaScript: pipes dropped, ``$any(x)`` unwrapped."""
+    for m in _PIPE.finditer(text):
+        if m.group() == "|":
+            text = text[:m.start()]
+            break
+    return _ANY.sub("(", text.strip()) or "undefined"
+
+
+def _template_literal(value: str) -> str:
+    """``a {{ b }} c`` -> a JS template literal."""
+    parts, pos = [], 0
+    while True:
+        start = value.find("{{", pos)
+        stop = value.find("}}", start + 2) if start != -1 else -1
+        literal = value[pos:] if stop == -1 else value[pos:start]
+        parts.append(literal.replace("\\", "\\\\").replace("`", "\\`").replace("${", "\\${"))
+        if stop == -1:
+            return "`" + "".join(parts) + "`"
+        parts.append("${" + _expr(value[start + 2:stop]) + "}")
+        pos = stop + 2
+
+
+def _string(value: str) -> str:
+    """A static attribute value as a JS expression."""
+    return _template_literal(value) if "{{" in value else json.dumps(value)
+
+
+def _prop_name(tag: str, name: str) -> str:
+    lower = name.lower()
+    if tag in _FORM_FIELDS and lower in ("value", "checked"):
+        return "default" + lower.capitalize()      # uncontrolled: no onChange needed
+    if lower in _ATTR_NAMES:
+        return _ATTR_NAMES[lower]
+    if lower.startswith(("aria-", "data-")):
+        return lower
+    return _CAMEL.sub(lambda m: m.group(1).upper(), name)
+
+
+def _style_key(name: str) -> str:
+    name = name.strip()
+    if name.startswith("--"):
+        return json.dumps(name)
+    return _CAMEL.sub(lambda m: m.group(1).upper(), name.lower())
+
+
+def _handler(event: str, statements: str) -> str | None:
+    """``(event)="statements"`` as a React prop, or None for events with no DOM prop."""
+    if ":" in event or event.startswith("@") or event in _DROPPED:
+        return None                               # (window:resize), (@fade.done)
+    name, _, modifiers = event.partition(".")
+    body = statements.strip().rstrip(";").strip()
+    body = body + ";" if body else ""
+    if name in ("submit", "ngSubmit"):
+        body = "$event.preventDefault(); " + body
+    if modifiers and name in ("keyup", "keydown", "keypress"):
+        key = modifiers.rpartition(".")[2]
+        body = "if ($event.key === " + json.dumps(_KEYS.get(key.lower(), key)) + ") { " + body + " }"
+    prop = _EVENTS.get(name) or "on" + name[:1].upper() + name[1:]
+    return prop + "={($event) => { " + body + " }}"
+
+
+def _props(tag: str, attrs: str) -> tuple[list[str], list[tuple[str, str]]]:
+    """(JSX props, structural directives) for one tag's attribute text."""
+    props: list[str] = []
+    directives: list[tuple[str, str]] = []
+    classes: list[str] = []
+    style: list[str] = []
+    for m in _ATTR.finditer(attrs):
+        name = m.group(1)
+        value = next((v for v in m.groups()[1:] if v is not None), None)
+        if name.startswith("*"):
+            directives.append((name[1:], value or ""))
+        elif name.startswith(("#", "let-", "@", "[@")):
+            continue
+        elif name.startswith("[(") and name.endswith(")]"):
+            target = name[2:-2]
+            target = "value" if target == "ngModel" else target
+            props.append(_prop_name(tag, target) + "={" + _expr(value or "") + "}")
+        elif name.startswith("[") and name.endswith("]"):
+            target, expr = name[1:-1], _expr(value or "")
+            if target in _DROPPED:
+                continue
+            if target.startswith("class."):
+                classes.append("(" + expr + ") && " + json.dumps(target[6:]))
+            elif target in ("class", "className", "ngClass"):
+                classes.append(expr)
+            elif target.startswith("style."):
+                prop, _, unit = target[6:].partition(".")
+                style.append(_style_key(prop) + ": " + ("(" + expr + ") + " + json.dumps(unit) if unit else expr))
+            elif target == "ngStyle":
+                style.append("...(" + expr + ")")
+            elif target == "innerHTML":
+                props.append("dangerouslySetInnerHTML={{ __html: " + expr + " }}")
+            else:
+                props.append(_prop_name(tag, target[5:] if target.startswith("attr.") else target)
+                             + "={" + expr + "}")
+        elif name.startswith("(") and name.endswith(")"):
+            prop = _handler(name[1:-1], value or "")
+            if prop is not None:
+                props.append(prop)
+        elif name in _DROPPED:
+            continue
+        elif name == "class":
+            if value and value.strip():
+                classes.append(_string(value.strip()))
+        elif name == "style":
+            for decl in (value or "").split(";"):
+                prop, colon, val = decl.partition(":")
+                if colon and prop.strip():
+                    style.append(_style_key(prop) + ": " + _string(val.strip()))
+        elif value is None:
+            props.append(_prop_name(tag, name))
+        elif "{{" in value or '"' in value:
+            props.append(_prop_name(tag, name) + "={" + _string(value) + "}")
+        else:
+            props.append(_prop_name(tag, name) + '="' + value + '"')
+    if classes:
+        props.insert(0, "className={cx(" + ", ".join(classes) + ")}")
+    if style:
+        props.append("style={{ " + ", ".join(style) + " }}")
+    return props, directives
+
+
+# ---------------------------------------------------------------------------
+# Loops
+# ---------------------------------------------------------------------------
+
+_LOOP_VARS = {
+    "$index": "$index", "$count": "$array.length", "$first": "$index === 0",
+    "$last": "$index === $array.length - 1", "$even": "$index % 2 === 0", "$odd": "$index % 2 === 1",
+}
+_NG_FOR_OF = re.compile(r"\s*let\s+(\w+)\s+of\s+(.+)", re.S)
+_FOR_OF = re.compile(r"\s*(\w+)\s+of\s+(.+)", re.S)
+_LET = re.compile(r"(?:let\s+)?(\w+)\s*=\s*\$?(\w+)")
+_AS = re.compile(r"\s*\$?(\w+)\s+as\s+(\w+)")
+_TRACK = re.compile(r"\s*track\s+(.+)", re.S)
+
+
+def _loop(item: str, items: str, aliases: list[tuple[str, str]]) -> str:
+    lets = "".join(" const " + alias + " = " + _LOOP_VARS.get("$" + var, "undefined") + ";"
+                   for alias, var in aliases)
+    return "(" + items + " ?? []).map((" + item + ", $index, $array) => {" + lets + " return ("
+
+
+def _ng_for(spec: str) -> tuple[str, str]:
+    """(prefix, suffix) around an element carrying ``*ngFor``."""
+    item, items, aliases = "item", "[]", []
+    for part in spec.split(";"):
+        m = _NG_FOR_OF.match(part)
+        if m is not None:
+            item, items = m.group(1), _expr(m.group(2))
+            continue
+        aliases += [(a.group(2), a.group(1)) for a in _AS.finditer(part)]
+        aliases += [(a.group(1), a.group(2)) for a in _LET.finditer(part)]
+    return "{" + _loop(item, items, aliases), "); })}"
+
+
+def _for_block(params: str, implicit: list[str]) -> tuple[str, str]:
+    """(opener, closer before ``null}`` / an @empty branch) for ``@for (params)``."""
+    item, items, track = "item", "[]", "$index"
+    aliases = [(v, v[1:]) for v in implicit]
+    for part in params.split(";"):
+        m = _FOR_OF.match(part)
+        if m is not None:
+            item, items = m.group(1), _expr(m.group(2))
+        elif _TRACK.match(part):
+            track = _expr(_TRACK.match(part).group(1))
+        else:
+            aliases += [(a.group(1), a.group(2)) for a in _LET.finditer(part)]
+    return ("{(" + items + " ?? []).length ? " + _loop(item, items, aliases)
+            + "<React.Fragment key={" + track + "}>",
+            "</React.Fragment>); }) : ")
+
+
+# ---------------------------------------------------------------------------
+# Template -> JSX
+# ---------------------------------------------------------------------------
+
+_ELSE = re.compile(r"\s*@else\b")
+_EMPTY = re.compile(r"\s*@empty\s*\{")
+_QUIET_ELEMENTS = frozenset({"ng-template", "ng-content"})   # not rendered in place
+_QUIET_BLOCKS = frozenset({"placeholder", "loading", "error", "empty", "else"})
+
+
+def _text(text: str) -> str:
+    return (text.replace("{", "&#123;").replace("}", "&#125;")
+            .replace("<", "&lt;").replace(">", "&gt;"))
+
+
+def _element(tag: str, attrs: str, self_closing: bool) -> tuple[str, str]:
+    """(opening text, closing text) for one element, structural directives included."""
+    lname = tag.lower()
+    props, directives = _props(lname, attrs)
+    prefix = suffix = ""
+    for directive, spec in directives:
+        if directive == "ngFor":
+            before, after = _ng_for(spec)
+            props.insert(0, "key={$index}")
+        elif directive == "ngIf":
+            cond = _expr(spec.split(";")[0].split(" as ")[0])
+            before, after = "{(" + cond + ") ? (", ") : null}"
+        else:
+            continue
+        prefix, suffix = prefix + before, after + suffix
+    if lname == "ng-container":
+        props = [p for p in props if p.startswith("key=")]
+        tag = "React.Fragment" if props else ""
+    head = "<" + tag + "".join(" " + p for p in props)
+    if self_closing:
+        if not tag:
+            return prefix + "<></>" + suffix, ""
+        return prefix + head + " />" + suffix, ""
+    return prefix + head + ">", "</" + tag + ">" + suffix
+
+
+def template_to_jsx(html: str) -> Iterator[str]:
+    """
+    JSX for an Angular template, yielded in pieces as it is walked once.
+
+    Unbalanced markup is closed where the template ends; run the validator
+    first for real error messages.
+    """
+    # [kind, name, closer, quiet]: kind "el" or a block keyword; quiet entries
+    # (<ng-template>, @placeholder ...) suppress everything inside them
+    stack: list[list] = []
+    # Open element names per block scope, so a stray </x> is recognised
+    # without walking the stack (as in scanner.scan_template)
+    scopes: list[dict[str, int]] = [{}]
+    quiet = blocks = 0
+    implicit = [v for v in _LOOP_VARS if v != "$index" and re.search(re.escape(v) + r"\b", html)]
+    pos, end = 0, len(html)
+
+    while pos < end:
+        m = template_token(html, pos)
+        stop = end if m is None else m.start()
+        if stop > pos and not quiet and not (stack and stack[-1][0] == "switch"):
+            yield _text(html[pos:stop])
+        if m is None:
+            break
+        closing, tag, attrs, gt = m.groups()
+        pos = m.end()
+
+        if tag is not None:
+            if not gt:
+                break
+            lname = tag.lower()
+            if closing:
+                scope = scopes[-1]
+                if scope.get(lname):                # else a stray </x>: dropped
+                    while True:
+                        _, open_name, closer, is_quiet = stack.pop()
+                        scope[open_name] -= 1
+                        quiet -= is_quiet
+                        if not quiet and not is_quiet:
+                            yield closer
+                        if open_name == lname:
+                            break
+                continue
+            self_closing = lname in VOID_ELEMENTS or attrs.rstrip().endswith("/")
+            if self_closing:
+                attrs = attrs.rstrip().rstrip("/")
+            if lname in RAW_TEXT_ELEMENTS and not self_closing:
+                raw_end = raw_text_end(html, lname, pos)
+                body = html[pos:end if raw_end is None else raw_end.start()]
+                pos = end if raw_end is None else raw_end.end()
+                if quiet or lname in ("script", "style"):
+                    continue
+                opening, closer = _element(tag, attrs, lname == "textarea")
+                if lname == "textarea":
+                    if "defaultValue=" not in opening:      # a [(ngModel)] / [value] binding wins
+                        opening = opening.replace(" />", " defaultValue={" + json.dumps(body) + "} />", 1)
+                    yield opening
+                else:
+                    yield opening + "{" + json.dumps(body) + "}" + closer
+                continue
+            if lname in _QUIET_ELEMENTS or quiet:
+                if not self_closing:
+                    stack.append(["el", lname, "", int(lname in _QUIET_ELEMENTS)])
+                    scopes[-1][lname] = scopes[-1].get(lname, 0) + 1
+                    quiet += stack[-1][3]
+                continue
+            opening, closer = _element(tag, attrs, self_closing)
+            yield opening
+            if not self_closing:
+                stack.append(["el", lname, closer, 0])
+                scopes[-1][lname] = scopes[-1].get(lname, 0) + 1
+            continue
+
+        tok = m.group()
+        if tok == "<!--":
+            close = html.find("-->", pos)
+            if close == -1:
+                break
+            if not quiet:
+                yield "{/*" + html[pos:close].replace("*/", "* /") + "*/}"
+            pos = close + 3
+        elif tok == "<!":
+            close = html.find(">", pos)
+            pos = end if close == -1 else close + 1
+        elif tok == "{{":
+            close = html.find("}}", pos)
+            if close == -1:
+                break
+            if not quiet:
+                yield "{" + _expr(html[pos:close]) + "}"
+            pos = close + 2
+        elif tok == "}":
+            if not blocks:
+                if not quiet:
+                    yield _text(tok)
+                continue
+            while stack[-1][0] == "el":
+                _, _, closer, is_quiet = stack.pop()
+                quiet -= is_quiet
+                if not quiet and not is_quiet:
+                    yield closer
+            kind, _, closer, is_quiet = stack.pop()
+            scopes.pop()
+            blocks -= 1
+            quiet -= is_quiet
+            if quiet or is_quiet:
+                continue
+            follow = (_ELSE if kind == "if" else _EMPTY if kind == "for" else None)
+            follow = follow.match(html, pos) if follow is not None else None
+            if follow is None:
+                yield closer + ("null}" if kind in ("if", "for") else "")
+                continue
+            pos = follow.end()
+            if kind == "for":
+                yield closer + "(<>"
+                stack.append(["frag", "", "</>)}", 0])
+                scopes.append({})
+                blocks += 1
+                continue
+            header = block_header(html, pos, "else")
+            if header.missing:
+                break
+            pos = header.body
+            if header.else_if:
+                yield closer + "(" + _expr(header.params.split(";")[0]) + ") ? (<>"
+                stack.append(["if", "", closer, 0])
+            else:
+                yield closer + "(<>"
+                stack.append(["frag", "", "</>)}", 0])
+            scopes.append({})
+            blocks += 1
+        else:
+            keyword = block_keyword(html, m)
+            header = block_header(html, pos, keyword) if keyword is not None else None
+            if header is None or header.missing:
+                if not quiet:
+                    yield tok
+                continue
+            params, pos = header.params, header.body
+            is_quiet = int(keyword in _QUIET_BLOCKS)
+            if keyword == "if":
+                opener, closer = "{(" + _expr(params.split(";")[0].split(" as ")[0]) + ") ? (<>", "</>) : "
+            elif keyword == "for":
+                opener, closer = _for_block(params, implicit)
+            elif keyword == "switch":
+                opener, closer = "{(() => { switch (" + _expr(params) + ") {", "} return null; })()}"
+            elif keyword == "case":
+                opener, closer = "case " + _expr(params) + ": return (<>", "</>);"
+            elif keyword == "default":
+                opener, closer = "default: return (<>", "</>);"
+            else:                                  # @defer and the quiet companions
+                opener, closer = "<>", "</>"
+            stack.append([keyword, "", closer, is_quiet])
+            scopes.append({})
+            blocks += 1
+            quiet += is_quiet
+            if not quiet:
+                yield opener
+
+    while stack:                                  # unbalanced template: close what is open
+        kind, _, closer, is_quiet = stack.pop()
+        quiet -= is_quiet
+        if not quiet and not is_quiet:
+            yield closer + ("null}" if kind in ("if", "for") else "")
+
+
+# ---------------------------------------------------------------------------
+# Component state
+# ---------------------------------------------------------------------------
+
+_CLASS = re.compile(r"export\s+class\s+(\w+)[^{]*\{")
+_TS_SKIP = re.compile(r"""//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|`(?:\\.|[^`\\])*`|[{};]""", re.S)
+_DECORATOR = re.compile(r"\s*@\w+(?:\s*\([^)]*\))?")
+_MODIFIERS = re.compile(r"\s*(?:public|private|protected|readonly|static|override|declare|async)\s+")
+_MEMBER = re.compile(r"\s*(get\s+|set\s+)?([\w$]+)\s*([?!]?)\s*(<[^>]*>\s*)?(\()?")
+_LITERAL_START = re.compile(r"""\s*(?:['"`\[{\d.-]|true\b|false\b|null\b)""")
+_SIGNAL = re.compile(r"\s*(?:signal|input)\s*(?:<[^>]*>)?\s*\(([\s\S]*)\)\s*$")
+_RESERVED = frozenset({"React", "styles", "cx", "constructor"})
+
+
+def _bare(member: str) -> str:
+    """``member`` without its leading decorators and modifiers."""
+    while True:
+        m = _DECORATOR.match(member) or _MODIFIERS.match(member)
+        if m is None:
+            return member
+        member = member[m.end():]
+
+
+def _members(ts: str) -> Iterator[str]:
+    """Source text of each member of the first exported class, comments stripped."""
+    m = _CLASS.search(ts)
+    if m is None:
+        return
+    depth, pos, parts = 1, m.end(), []
+    for tok in _TS_SKIP.finditer(ts, m.end()):
+        text = tok.group()
+        if text.startswith(("//", "/*")):
+            parts.append(ts[pos:tok.start()])
+            pos = tok.end()
+            continue
+        if text == "{":
+            depth += 1
+        elif text == "}":
+            depth -= 1
+            if depth == 0:
+                return
+            member = _bare("".join(parts) + ts[pos:tok.end()])
+            if depth == 1 and "=" not in member.split("(")[0].split("{")[0]:   # end of a method body
+                yield member
+                parts, pos = [], tok.end()
+        elif text == ";" and depth == 1:
+            yield _bare("".join(parts) + ts[pos:tok.start()])
+            parts, pos = [], tok.end()
+
+
+def _state(ts: str) -> Iterator[str]:
+    """``let`` / no-op ``const`` declarations standing in for the component's members."""
+    for member in _members(ts):
+        m = _MEMBER.match(member)
+        if m is None or not member.strip() or m.group(2) in _RESERVED:
+            continue
+        accessor, name, is_call = m.group(1), m.group(2), m.group(5)
+        if accessor and accessor.startswith("set"):
+            continue
+        if is_call and not accessor:
+            yield "const " + name + " = (..._args) => undefined;"
+            continue
+        _, eq, value = member[m.end(2):].partition("=")
+        value = value.strip() if eq and not accessor and not value.startswith(">") else ""
+        signal = _SIGNAL.match(value)
+        if signal is not None:
+            inner = signal.group(1).strip()
+            yield "let " + name + " = () => (" + (inner if _literal(inner) else "undefined") + ");"
+        elif "=>" in value and value.startswith(("(", "async")):
+            yield "const " + name + " = (..._args) => undefined;"
+        else:
+            yield "let " + name + " = " + (value if _literal(value) else "undefined") + ";"
+
+
+def _literal(value: str) -> bool:
+    return bool(value) and _LITERAL_START.match(value) is not None and not any(
+        marker in value for marker in ("this.", "new ", "inject(", "=>"))
+
+
+# ---------------------------------------------------------------------------
+# Styles
+# ---------------------------------------------------------------------------
+
+# Module-level at-rules: Sass only accepts them outside every block
+_HOISTED = re.compile(r"\s*@(use|forward|import|charset)\b")
+_HOIST_ORDER = {"charset": 0, "use": 1, "forward": 1, "import": 2}     # the order Sass requires
+_SCSS_NOISE = re.compile(r""""[^"]*"|'[^']*'|//.*|/\*.*?(?:\*/|$)""")
+_HOST_CONTEXT = re.compile(r":host-context\(([^)]*)\)")
+_HOST = re.compile(r":host(?:\(([^)]*)\))?(?![-\w])")
+# A nested ":host(.x) &" / ":host-context(.x) &" selector, the only nested :host form with a CSS-module equivalent
+_NESTED_HOST = re.compile(r"(\s*):host(-context)?(?:\(([^)]*)\))?\s+&\s*\{(.*)$")
+
+
+def _scss_code(line: str, in_comment: bool) -> tuple[str, bool]:
+    """(``line`` without strings and comments, whether a /* comment is still open at its end)."""
+    if in_comment:
+        close = line.find("*/")
+        if close == -1:
+            return "", True
+        line = line[close + 2:]
+    code = _SCSS_NOISE.sub(lambda m: "" if m.group()[0] in "/" else '""', line)
+    opened = line.rfind("/*")
+    return code, opened != -1 and line.find("*/", opened) == -1 and "/*" not in code
+
+
+def _host_line(line: str, nested: bool, number: int) -> str:
+    """``line`` with ``:host`` selectors rewritten relative to the ``.host`` wrapper."""
+    if ":host" not in line:
+        return line
+    if not nested:
+        line = _HOST_CONTEXT.sub(r":global(\1) &", line)
+        return _HOST.sub(lambda m: "&" + (m.group(1) or ""), line)
+    m = _NESTED_HOST.match(line)
+    if m is None:
+        raise ValueError("SCSS line " + str(number) + ": :host inside a nested rule can only be "
+                         "used as ':host(...) &' in a CSS module export")
+    indent, context, arg, rest = m.groups()
+    if not arg:
+        return indent + "& {" + rest                # the host is already the outermost ancestor
+    replacement = ":global(" + arg + ") .host" if context else ".host" + arg
+    return (indent + "@at-root #{selector.replace(&, \".host\", " + json.dumps(replacement) + ")} {" + rest)
+
+
+def scss_module(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Component SCSS as a CSS module: @use/@forward/@import/@charset rules are
+    hoisted to the top wherever they appear, everything else is nested under
+    ``.host``. Raises ValueError for a nested ``:host`` selector that has no
+    CSS-module equivalent.
+    """
+    head: list[tuple[int, list[str]]] = []      # (order, lines) per hoisted statement
+    body: list[str] = []
+    pending: list[str] = []       # blank / comment lines, placed with whatever follows them
+    depth = 0
+    in_comment = in_hoist = uses_selector = False
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        code, in_comment_after = _scss_code(line, in_comment)
+        hoisted = None if in_hoist or depth else _HOISTED.match(code)
+        if hoisted is not None:
+            head.append((_HOIST_ORDER[hoisted.group(1)], pending + [line]))
+            pending = []
+            in_hoist = ";" not in code
+        elif in_hoist:
+            head[-1][1].append(line)
+            in_hoist = ";" not in code
+        elif depth == 0 and not code.strip():
+            pending.append(line)
+        else:
+            body += pending if body else [p for p in pending if p.strip()]
+            pending = []
+            rewritten = _host_line(line, depth > 0, number).replace("::ng-deep", ":global")
+            uses_selector = uses_selector or "selector.replace(" in rewritten
+            body.append(rewritten)
+        depth = max(0, depth + code.count("{") - code.count("}"))
+        in_comment = in_comment_after
+    body += pending
+
+    if uses_selector and not any("sass:selector" in line for _, lines in head for line in lines):
+        head.append((_HOIST_ORDER["use"], ['@use "sass:selector";']))
+    yield "// CSS module: every rule is scoped under .host (the Angular :host element)\n"
+    for _, statement in sorted(head, key=lambda h: h[0]):
+        for line in statement:
+            yield line + "\n"
+    yield ".host {\n"
+    for line in body:
+        yield ("  " + line if line.strip() else "") + "\n"
+    yield "}\n"
+
+
+# ---------------------------------------------------------------------------
+# TSX
+# ---------------------------------------------------------------------------
+
+_CX = (
+    "const cx = (...names: any[]): string =>\n"
+    "  names\n"
+    "    .flatMap((n) => (typeof n === \"string\" ? n.split(/\\s+/)\n"
+    "      : Array.isArray(n) ? n\n"
+    "      : n && typeof n === \"object\" ? Object.keys(n).filter((k) => n[k]) : []))\n"
+    "    .filter(Boolean)\n"
+    "    .map((n) => styles[n] ?? n)\n"
+    "    .join(\" \");\n"
+)
+
+
+def _pascal(slug: str) -> str:
+    name = "".join(part[:1].upper() + part[1:] for part in re.split(r"[^A-Za-z0-9]+", slug))
+    return name if name[:1].isalpha() else "Component" + name
+
+
+def render_tsx(slug: str, ts: str, html: str) -> Iterator[str]:
+    """The ``<slug>.tsx`` file, in chunks; it imports ``./<slug>.module.scss``."""
+    name = _pascal(slug)
+    cls = _CLASS.search(ts)
+    yield (
+        "// @ts-nocheck -- Angular template expressions are carried over as written\n"
+        "// AUTO-EXPORTED by Guided Component Architect from " + slug + ".component.*\n"
+        'import React from "react";\n'
+        'import styles from "./' + slug + '.module.scss";\n\n'
+        + _CX + "\n"
+        "export default function " + name + "() {\n"
+    )
+    if cls is not None:
+        yield "  // Initial state of " + cls.group(1) + "; methods are no-ops in the export\n"
+    for line in _state(ts):
+        yield "  " + line + "\n"
+    yield "\n  return (\n    <div className={styles.host}>\n      "
+    for chunk in template_to_jsx(html.strip()):
+        yield chunk.replace("\n", "\n      ")
+    yield "\n    </div>\n  );\n}\n"
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _component_files(output_dir: Path, slug: str | None) -> dict[str, Path]:
+    """ext -> path for ``slug`` (or the latest component), resolved via the output manifest."""
+    entry = manifest.lookup(output_dir, slug) if slug else manifest.latest(output_dir)
+    if entry is not None:
+        return {ext: output_dir / Path(path).name for ext, path in entry["files"].items()}
+    if slug:
+        files = {ext: output_dir / (slug + ".component." + ext) for ext in ("ts", "html", "scss")}
+        return {ext: path for ext, path in files.items() if path.exists()}
+    if manifest.manifest_path(output_dir).exists():
+        return {}
+    # Directory written before the manifest existed: newest TS and its own siblings
+    ts_files = sorted(output_dir.glob("*.component.ts"), key=lambda f: f.stat().st_mtime, reverse=True)
+    if not ts_files:
+        return {}
+    stem = ts_files[0].name[:-len(".ts")]
+    files = {ext: output_dir / (stem + "." + ext) for ext in ("ts", "html", "scss")}
+    return {ext: path for ext, path in files.items() if path.exists()}
+
+
+def _export(slug: str, files: dict[str, Path], dest: Path) -> list[Path]:
+    ts = files["ts"].read_text(encoding="utf-8")
+    inline = {}
+    if "html" not in files or "scss" not in files:
+        for kind, _, text in inline_sources(ts):
+            inline.setdefault(kind, []).append(text)
+    html = (files["html"].read_text(encoding="utf-8") if "html" in files
+            else "\n".join(inline.get("template", [])))
+
+    dest.mkdir(parents=True, exist_ok=True)
+    module, tsx = dest / (slug + ".module.scss"), dest / (slug + ".tsx")
+    if "scss" in files:
+        with open(files["scss"], encoding="utf-8") as f:
+            write_stream(module, scss_module(f))
+    else:
+        write_stream(module, scss_module("\n".join(inline.get("styles", [])).splitlines()))
+    write_stream(tsx, render_tsx(slug, ts, html))
+    return [tsx, module]
+
+
+def export_component(output_dir: str | Path, slug: str | None = None, dest: str | Path | None = None) -> list[Path]:
+    """
+    Export ``slug`` (default: the latest component) from ``output_dir`` as
+    ``<slug>.tsx`` + ``<slug>.module.scss`` in ``dest`` (default: ``output_dir``).
+    Returns [] when there is no such component; raises ValueError when its
+    SCSS uses :host in a way a CSS module cannot express.
+    """
+    out = Path(output_dir)
+    files = _component_files(out, slug)
+    if "ts" not in files:
+        return []
+    stem = files["ts"].name[:-len(".component.ts")] if files["ts"].name.endswith(".component.ts") else files["ts"].stem
+    return _export(stem, files, Path(dest) if dest is not None else out)
+
+
+def export_dir(output_dir: str | Path, dest: str | Path | None = None,
+               on_error: Callable[[str, ValueError], None] | None = None) -> list[Path]:
+    """
+    Export every component in ``output_dir`` in one pass; returns the files
+    produced. A component whose SCSS cannot become a CSS module is skipped
+    (its files are left untouched) and reported to ``on_error(slug, error)``;
+    the rest are still exported.
+    """
+    out = Path(output_dir)
+    target = Path(dest) if dest is not None else out
+    written: list[Path] = []
+    for component in manifest.components(out):
+        files = {ext: Path(path) for ext, path in component["files"].items()}
+        if "ts" not in files or not files["ts"].exists():
+            continue
+        try:
+            written += _export(component["slug"], files, target)
+        except ValueError as e:
+            if on_error is not None:
+                on_error(component["slug"], e)
+    return written
@@ -2,21 +2,51 @@
 validator.py
 ------------
 Linter-Agent that inspects generated Angular component code for:
-  1. Design-token compliance  -- only approved hex colors used
-  2. Border-radius compliance -- only approved radii used
-  3. Basic syntax validity    -- balanced braces, HTML tags, @Component decorator
+  1. Design-token compliance  -- only palette colors (hex, rgb(), hsl())
+  2. Token values             -- spacing, font-size, font-weight, radius
+                                 (shorthands too) and box-shadow must resolve
+                                 to a token, through var() where used
+  3. Basic syntax validity    -- balanced braces, @Component decorator, and the
+                                 template (HTML block and inline template:),
+                                 every tag / control-flow error with line:col
+
+TS and SCSS blocks are lexed once each by scanner.py; every check below reads
+its findings from that single pass. Declared values are resolved against the
+design system's token index (tokens.py).
 
 Public API:
-  validate(code_blocks, design_system_path)   -> ValidationResult
+  validate(code_blocks, design_system_path, memo)  -> ValidationResult
+  validate_many(components, design_system_path, memo) -> [ValidationResult]
+  validate_block(key, content, ...)           -> ValidationResult  # one block, e.g. mid-stream
+  BLOCK_KEYS                                  # ("ts", "html", "scss")
+  error_block(message)                        -> "ts" | "html" | "scss" | None
   validate_component(code_blocks, ...)        -> (errors, warnings)  # used by agent.py
+  revalidate_dir(output_dir, ..., check)      -> {slug: ValidationResult}  # relint.py builds on it
+  check_files(files, design_system_path)      -> {"contents", "outcomes", "digests", "stamps"}
+  ValidationMemo(path)                        # persistent per-block results
+
+Results are memoized per block by (content, design-system token version):
+blocks that did not change since the last check are not re-checked.
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
-import re
+import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable
+
+from design_system import DesignSystem, load_design_system
+from fsutil import atomic_write
+from scanner import (
+    Problem, ScanResult, hex_colors, inline_sources, line_col, scan_scss, scan_template, scan_typescript,
+)
+from tokens import color_findings
+from tracing import span
 
 
 # ---------------------------------------------------------------------------
@@ -38,93 +68,66 @@ class ValidationResult:
 
 
 # ---------------------------------------------------------------------------
-# Design-token helpers
+# Tables
 # ---------------------------------------------------------------------------
 
-def _extract_approved_colors(design_system: dict) -> set:
-    approved = set()
-    for value in design_system.get("colors", {}).values():
-        if isinstance(value, str) and value.startswith("#"):
-            approved.add(value.lower())
-    return approved
-
-
-def _extract_approved_radii(design_system: dict) -> set:
-    approved = set()
-    for key, value in design_system.get("borders", {}).items():
-        if "radius" in key and isinstance(value, str):
-            approved.add(value.lower())
-    # Always allow 0 and 0px -- valid CSS reset, not a design token violation
-    approved.add("0")
-    approved.add("0px")
-    return approved
+_MAX_TEMPLATE_PROBLEMS = 10   # beyond this a self-correction prompt only gets noisier
 
 
 # ---------------------------------------------------------------------------
 # Checks
 # ---------------------------------------------------------------------------
 
-def _check_color_compliance(code: str, approved: set, result: ValidationResult, src: str) -> None:
-    for raw in re.findall(r"#([0-9a-fA-F]{6}|[0-9a-fA-F]{3})\b", code):
-        short = "#" + raw.lower()
-        long_ = "#" + "".join(c * 2 for c in raw.lower()) if len(raw) == 3 else short
-        if short not in approved and long_ not in approved:
-            result.add_error("[" + src + "] Unauthorized color '" + short + "' — use a design system color.")
+# ``approved`` below is DesignSystem.approved_hex: lowercase digits without
+# '#', 3-digit shorthands of approved colors included.
+def _color_error(raw: str, approved: frozenset, result: ValidationResult, src: str) -> None:
+    digits = raw.lower()
+    if digits not in approved:
+        result.add_error("[" + src + "] Unauthorized color '#" + digits + "' — use a design system color.")
 
 
-def _check_border_radius(code: str, approved: set, result: ValidationResult, src: str) -> None:
-    for m in re.finditer(r"border-radius\s*:\s*([^;{]+)", code, re.IGNORECASE):
-        val = m.group(1).strip().lower()
-        # Skip CSS custom properties and shorthand (multiple values)
-        if val.startswith("var(") or " " in val:
-            continue
-        if val not in approved:
-            result.add_error(
-                "[" + src + "] Unauthorized border-radius '" + val +
-                "' — allowed: " + ", ".join(sorted(approved))
-            )
-
-
-def _check_balanced_brackets(code: str, result: ValidationResult, src: str) -> None:
-    pairs = {"}": "{", "]": "[", ")": "("}
-    stack = []
-    in_str = None
-    for i, ch in enumerate(code):
-        if ch in ('"', "'", "`") and in_str is None:
-            in_str = ch
-        elif in_str and ch == in_str and (i == 0 or code[i - 1] != "\\"):
-            in_str = None
-        elif in_str is None:
-            if ch in "{[(":
-                stack.append(ch)
-            elif ch in "}])":
-                if not stack or stack[-1] != pairs[ch]:
-                    result.add_error("[" + src + "] Mismatched bracket '" + ch + "' at position " + str(i) + ".")
-                    return
-                stack.pop()
-    if stack:
-        result.add_error("[" + src + "] Unclosed bracket(s): " + str(stack))
-
-
-def _check_html_tags(html: str, result: ValidationResult) -> None:
-    VOID = {"area","base","br","col","embed","hr","img","input","link","meta","param","source","track","wbr"}
-    stack = []
-    for m in re.finditer(r"<(/?)([a-zA-Z][a-zA-Z0-9-]*)([^>]*)>", html):
-        closing, tag, attrs = m.groups()
-        t = tag.lower()
-        if t in VOID or attrs.strip().endswith("/"):
-            continue
-        if not closing:
-            stack.append(t)
+def _check_color_compliance(code: str, approved: frozenset, result: ValidationResult, src: str) -> None:
+    for _, raw in hex_colors(code):
+        _color_error(raw, approved, result, src)
+
+
+def _report_colors(scan: ScanResult, approved: frozenset, result: ValidationResult, src: str) -> None:
+    for _, raw in scan.colors:
+        _color_error(raw, approved, result, src)
+
+
+def _report_brackets(scan: ScanResult, result: ValidationResult, src: str) -> None:
+    if scan.mismatch is not None:
+        ch, i = scan.mismatch
+        result.add_error("[" + src + "] Mismatched bracket '" + ch + "' at position " + str(i) + ".")
+    elif scan.unclosed:
+        result.add_error("[" + src + "] Unclosed bracket(s): " + str(scan.unclosed))
+
+
+def _report_findings(findings: list, result: ValidationResult, src: str) -> None:
+    for finding in findings:
+        if finding.error:
+            result.add_error("[" + src + "] " + finding.message)
         else:
-            if stack and stack[-1] == t:
-                stack.pop()
-            else:
-                expected = stack[-1] if stack else "none"
-                result.add_error("[HTML] Unexpected </" + t + "> — expected </" + expected + ">.")
-                return
-    if stack:
-        result.add_error("[HTML] Unclosed tag(s): " + str(stack))
+            result.add_warning("[" + src + "] " + finding.message)
+
+
+def _report_tokens(scan: ScanResult, ds: DesignSystem, result: ValidationResult, src: str) -> None:
+    """Every declared value against the token index; custom properties resolve var()."""
+    custom = {d.prop: d.value for d in scan.declarations if d.prop.startswith("--")}
+    for decl in scan.declarations:
+        _report_findings(ds.tokens.check(decl.prop, decl.value, custom), result, src)
+
+
+def _report_template(problems: list[Problem], code: str, result: ValidationResult, src: str,
+                     base: int = 0) -> None:
+    """Template problems as "[SRC line:col] ..." errors; ``base`` offsets an inline template in ``code``."""
+    for problem in problems[:_MAX_TEMPLATE_PROBLEMS]:
+        line, col = line_col(code, base + problem.offset)
+        result.add_error("[" + src + " " + str(line) + ":" + str(col) + "] " + problem.message)
+    if len(problems) > _MAX_TEMPLATE_PROBLEMS:
+        result.add_error("[" + src + "] ... and " + str(len(problems) - _MAX_TEMPLATE_PROBLEMS) +
+                         " more template problem(s).")
 
 
 def _check_decorator(ts: str, result: ValidationResult) -> None:
@@ -136,15 +139,214 @@ def _check_decorator(ts: str, result: ValidationResult) -> None:
         result.add_error("[TS] @Component missing 'template' or 'templateUrl'.")
 
 
-def _check_font(scss: str, ds: dict, result: ValidationResult) -> None:
-    ds_font = ds.get("typography", {}).get("font-family", "")
+def _report_font(scan: ScanResult, ds: DesignSystem, result: ValidationResult, src: str = "SCSS") -> None:
+    ds_font = ds.font_family
     if not ds_font:
         return
-    ds_clean = ds_font.lower().replace("'", "").replace('"', "").split(",")[0].strip()
-    for m in re.finditer(r"font-family\s*:\s*([^;]+)", scss, re.IGNORECASE):
-        used = m.group(1).strip().lower().replace("'", "").replace('"', "")
+    ds_clean = ds.font_clean
+    for decl in scan.declarations:
+        if decl.prop != "font-family":
+            continue
+        used = decl.value.lower().replace("'", "").replace('"', "")
         if ds_clean not in used:
-            result.add_warning("[SCSS] font-family '" + used + "' doesn't match design token '" + ds_font + "'.")
+            result.add_warning("[" + src + "] font-family '" + used + "' doesn't match design token '" + ds_font + "'.")
+
+
+def _validate_ts(ts: str, ds: DesignSystem, result: ValidationResult) -> None:
+    if not ts:
+        result.add_error("[TS] TypeScript block is empty.")
+        return
+    with span("check.decorator"):
+        _check_decorator(ts, result)
+    with span("scan.ts"):
+        scan = scan_typescript(ts)
+    _report_brackets(scan, result, "TS")
+    _report_colors(scan, ds.approved_hex, result, "TS")
+    # Inline template/styles; their hex colors were already covered by the TS scan
+    for kind, offset, text in inline_sources(ts):
+        if kind == "template":
+            with span("scan.template"):
+                problems = scan_template(text)
+            _report_template(problems, ts, result, "TS template", offset)
+            _report_findings(color_findings(ds.tokens, text), result, "TS template")
+        else:
+            styles = scan_scss(text)
+            _report_brackets(styles, result, "TS styles")
+            _report_tokens(styles, ds, result, "TS styles")
+            _report_font(styles, ds, result, "TS styles")
+
+
+def _validate_html(html: str, ds: DesignSystem, result: ValidationResult) -> None:
+    if not html:
+        result.add_warning("[HTML] HTML block empty — component may use inline template (ok).")
+        return
+    with span("scan.template"):
+        problems = scan_template(html)
+    _report_template(problems, html, result, "HTML")
+    with span("check.colors"):
+        _check_color_compliance(html, ds.approved_hex, result, "HTML")
+        _report_findings(color_findings(ds.tokens, html), result, "HTML")
+
+
+def _validate_scss(scss: str, ds: DesignSystem, result: ValidationResult) -> None:
+    if not scss:
+        result.add_warning("[SCSS] SCSS block empty — no styles generated.")
+        return
+    with span("scan.scss"):
+        scan = scan_scss(scss)
+    _report_brackets(scan, result, "SCSS")
+    _report_colors(scan, ds.approved_hex, result, "SCSS")
+    with span("check.tokens"):
+        _report_tokens(scan, ds, result, "SCSS")
+    _report_font(scan, ds, result)
+
+
+_BLOCK_VALIDATORS = {"ts": _validate_ts, "html": _validate_html, "scss": _validate_scss}
+BLOCK_KEYS = tuple(_BLOCK_VALIDATORS)     # the blocks of a component, in report order
+_ERROR_SOURCES = {"TS": "ts", "HTML": "html", "SCSS": "scss"}
+_SPAN_NAMES = {key: "validate." + key for key in _BLOCK_VALIDATORS}
+MEMO_NAME = ".validation_cache.json"
+
+
+# ---------------------------------------------------------------------------
+# Per-block memo
+# ---------------------------------------------------------------------------
+
+# Results depend only on (block, content, linted tokens), so a block that did
+# not change between iterations or follow-ups is never re-checked. Keys hold
+# the content itself (exact, and str hashes are cached by Python); the
+# persistent ValidationMemo uses content digests instead.
+_MEMO_SIZE = 2048
+_MEMO: OrderedDict = OrderedDict()
+_MEMO_LOCK = threading.Lock()
+
+
+def _digest(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+_EMPTY_DIGEST = _digest("")
+
+
+class ValidationMemo:
+    """
+    Per-block results persisted as JSON, keyed by (block, content sha256,
+    design-system token version), plus the (mtime, size) -> sha256 of files
+    validated from disk so unchanged files need not even be read. Meant to
+    live next to an output directory (see revalidate_dir).
+    """
+
+    FORMAT = 3        # bump whenever the checks change, so stored outcomes are dropped
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._results: dict[str, list] = {}
+        self._files: dict[str, list] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("format") == self.FORMAT:
+            self._results = data.get("results", {})
+            self._files = data.get("files", {})
+
+    @staticmethod
+    def _key(block: str, digest: str, token_version: str) -> str:
+        return block + ":" + token_version + ":" + digest
+
+    def get(self, block: str, digest: str, token_version: str) -> tuple | None:
+        hit = self._results.get(self._key(block, digest, token_version))
+        return (tuple(hit[0]), tuple(hit[1])) if hit is not None else None
+
+    def put(self, block: str, digest: str, token_version: str, outcome: tuple) -> None:
+        with self._lock:
+            self._results[self._key(block, digest, token_version)] = [list(outcome[0]), list(outcome[1])]
+            self._dirty = True
+
+    def file_digest(self, path: str | Path) -> tuple[str | None, tuple[int, int] | None]:
+        """(recorded sha256 or None, current (mtime_ns, size) or None if missing)."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None, None
+        stamp = (st.st_mtime_ns, st.st_size)
+        known = self._files.get(str(path))
+        return (known[2] if known is not None and tuple(known[:2]) == stamp else None), stamp
+
+    def remember_file(self, path: str | Path, stamp: tuple[int, int], digest: str) -> None:
+        with self._lock:
+            self._files[str(path)] = [stamp[0], stamp[1], digest]
+            self._dirty = True
+
+    def outcomes(self, files: dict, token_version: str) -> dict[str, tuple] | None:
+        """
+        Every block's (errors, warnings) when none of ``files`` (block key ->
+        path) changed since it was checked, else None. A block without a
+        file is an empty block, so it does not force a re-check.
+        """
+        found = {}
+        for key in BLOCK_KEYS:
+            path = files.get(key)
+            digest, stamp = self.file_digest(path) if path else (None, None)
+            if stamp is None:
+                digest = _EMPTY_DIGEST
+            elif digest is None:
+                return None
+            hit = self.get(key, digest, token_version)
+            if hit is None:
+                return None
+            found[key] = hit
+        return found
+
+    def record(self, files: dict, token_version: str, checked: dict) -> None:
+        """Remember a check_files() result for ``files``."""
+        for key, outcome in checked["outcomes"].items():
+            self.put(key, checked["digests"][key], token_version, outcome)
+            if key in checked["stamps"]:
+                self.remember_file(files[key], checked["stamps"][key], checked["digests"][key])
+
+    def save(self, token_version: str | None = None) -> None:
+        """Write atomically; with ``token_version``, results for other versions are dropped."""
+        with self._lock:
+            if not self._dirty:
+                return
+            if token_version is not None:
+                marker = ":" + token_version + ":"
+                self._results = {k: v for k, v in self._results.items() if marker in k}
+            payload = {"format": self.FORMAT, "results": self._results, "files": self._files}
+            atomic_write(self.path, json.dumps(payload, separators=(",", ":")))
+            self._dirty = False
+
+
+def _check_block(key: str, content: str, ds: DesignSystem, memo: ValidationMemo | None = None,
+                 digest: str | None = None) -> tuple:
+    """(errors, warnings) tuples for one block, from the memos when possible."""
+    memo_key = (key, content, ds.token_version)
+    with _MEMO_LOCK:
+        outcome = _MEMO.get(memo_key)
+        if outcome is not None:
+            _MEMO.move_to_end(memo_key)
+    if outcome is not None:
+        return outcome
+
+    if memo is not None:
+        digest = digest or _digest(content)
+        outcome = memo.get(key, digest, ds.token_version)
+    if outcome is None:
+        result = ValidationResult(passed=True)
+        with span(_SPAN_NAMES[key]):
+            _BLOCK_VALIDATORS[key](content, ds, result)
+        outcome = (tuple(result.errors), tuple(result.warnings))
+        if memo is not None:
+            memo.put(key, digest, ds.token_version, outcome)
+
+    with _MEMO_LOCK:
+        _MEMO[memo_key] = outcome
+        if len(_MEMO) > _MEMO_SIZE:
+            _MEMO.popitem(last=False)
+    return outcome
 
 
 # ---------------------------------------------------------------------------
@@ -154,41 +356,48 @@ def _check_font(scss: str, ds: dict, result: ValidationResult) -> None:
 def validate(
     code_blocks: dict,
     design_system_path: str = "design_system.json",
+    memo: ValidationMemo | None = None,
 ) -> ValidationResult:
-    """Run all checks. Returns ValidationResult."""
-    with open(design_system_path, "r", encoding="utf-8") as f:
-        ds = json.load(f)
-
-    approved_colors = _extract_approved_colors(ds)
-    approved_radii  = _extract_approved_radii(ds)
-    result = ValidationResult(passed=True)
+    """Run all checks. Returns ValidationResult. Unchanged blocks are answered from the memo."""
+    return validate_many([code_blocks], design_system_path, memo)[0]
 
-    ts   = code_blocks.get("ts", "")
-    html = code_blocks.get("html", "")
-    scss = code_blocks.get("scss", "")
 
-    if not ts:
-        result.add_error("[TS] TypeScript block is empty.")
-    else:
-        _check_decorator(ts, result)
-        _check_balanced_brackets(ts, result, "TS")
-        _check_color_compliance(ts, approved_colors, result, "TS")
-
-    if not html:
-        result.add_warning("[HTML] HTML block empty — component may use inline template (ok).")
-    else:
-        _check_html_tags(html, result)
-        _check_color_compliance(html, approved_colors, result, "HTML")
+def validate_many(
+    components: list[dict],
+    design_system_path: str = "design_system.json",
+    memo: ValidationMemo | None = None,
+) -> list[ValidationResult]:
+    """validate() over a batch; the design system is resolved once for all components."""
+    ds = load_design_system(design_system_path)
+    results = []
+    for code_blocks in components:
+        result = ValidationResult(passed=True)
+        for key in _BLOCK_VALIDATORS:
+            errors, warnings = _check_block(key, code_blocks.get(key, ""), ds, memo)
+            result.errors.extend(errors)
+            result.warnings.extend(warnings)
+        result.passed = not result.errors
+        results.append(result)
+    return results
+
+
+def validate_block(
+    key: str,
+    content: str,
+    design_system_path: str = "design_system.json",
+) -> ValidationResult:
+    """Run the checks for a single block ("ts", "html" or "scss")."""
+    ds = load_design_system(design_system_path)
+    errors, warnings = _check_block(key, content, ds)
+    return ValidationResult(passed=not errors, errors=list(errors), warnings=list(warnings))
 
-    if not scss:
-        result.add_warning("[SCSS] SCSS block empty — no styles generated.")
-    else:
-        _check_balanced_brackets(scss, result, "SCSS")
-        _check_color_compliance(scss, approved_colors, result, "SCSS")
-        _check_border_radius(scss, approved_radii, result, "SCSS")
-        _check_font(scss, ds, result)
 
-    return result
+def error_block(message: str) -> str | None:
+    """Block key ("ts", "html", "scss") an error message belongs to, from its "[SRC]" prefix."""
+    if not message.startswith("["):
+        return None
+    src = message[1:message.find("]")].split(" ")[0]
+    return _ERROR_SOURCES.get(src)
 
 
 def validate_component(
@@ -197,4 +406,85 @@ def validate_component(
 ) -> tuple:
     """Used by agent.py. Returns (errors: list, warnings: list)."""
     r = validate(code_blocks, design_system_path)
-    return r.errors, r.warnings
\ No newline at end of file
+    return r.errors, r.warnings
+
+
+def check_files(files: dict, design_system_path: str = "design_system.json") -> dict:
+    """
+    Validate a component from disk (``files``: block key -> path; a missing
+    file is an empty block). Returns {"contents", "outcomes", "digests",
+    "stamps"}, per block; stamps are (mtime_ns, size) of the files read.
+    """
+    ds = load_design_system(design_system_path)
+    checked: dict = {"contents": {}, "outcomes": {}, "digests": {}, "stamps": {}}
+    for key in BLOCK_KEYS:
+        path = files.get(key)
+        content = ""
+        if path:
+            try:
+                st = os.stat(path)      # before reading, so a later write changes the stamp
+                content = Path(path).read_text(encoding="utf-8")
+                checked["stamps"][key] = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                pass
+        checked["contents"][key] = content
+        checked["digests"][key] = _digest(content)
+        checked["outcomes"][key] = _check_block(key, content, ds)
+    return checked
+
+
+def revalidate_dir(
+    output_dir: str | Path,
+    design_system_path: str = "design_system.json",
+    memo_path: str | Path | None = None,
+    check: Callable[[list[dict]], list[dict]] | None = None,
+    recheck_failures: bool = False,
+) -> dict[str, ValidationResult]:
+    """
+    Re-validate every component in ``output_dir`` (manifest.components).
+
+    Results are kept in ``<output_dir>/.validation_cache.json`` (or
+    ``memo_path``). A component whose files' mtime/size are unchanged and
+    whose blocks were already checked under the current token version is
+    answered without reading anything. A change to the linted tokens
+    re-checks every block once; edits elsewhere in design_system.json
+    invalidate nothing.
+
+    ``check`` validates the rest: it gets the components ({"slug", "files"})
+    and returns them with check_files() results merged in (relint.py passes
+    one that uses a process pool and fixes files). ``recheck_failures`` also
+    hands it components whose remembered outcome has errors.
+    """
+    import manifest
+
+    ds = load_design_system(design_system_path)
+    memo = ValidationMemo(memo_path or Path(output_dir) / MEMO_NAME)
+    outcomes: dict[str, dict] = {}
+    pending = []
+    for component in manifest.components(output_dir, BLOCK_KEYS):
+        hit = memo.outcomes(component["files"], ds.token_version)
+        if hit is not None and not (recheck_failures and any(o[0] for o in hit.values())):
+            outcomes[component["slug"]] = hit
+        else:
+            pending.append(component)
+
+    if pending:
+        if check is None:
+            checked = [dict(c, **check_files(c["files"], design_system_path)) for c in pending]
+        else:
+            checked = check(pending)
+        for record in checked:
+            record.pop("contents", None)
+            memo.record(record["files"], ds.token_version, record)
+            outcomes[record["slug"]] = record["outcomes"]
+    memo.save(ds.token_version)
+
+    results: dict[str, ValidationResult] = {}
+    for slug in sorted(outcomes):
+        result = ValidationResult(passed=True)
+        for key in BLOCK_KEYS:
+            result.errors.extend(outcomes[slug][key][0])
+            result.warnings.extend(outcomes[slug][key][1])
+        result.passed = not result.errors
+        results[slug] = result
+    return results